@@ -0,0 +1,189 @@
+"""Automatic tower placement by simulating futures.
+
+For the towers on offer, every cell where place_tower would accept them is
+scored by placing the tower on a snapshot of the game and simulating the
+rest of the wave. The search is a two stage beam: short rollouts for all
+candidates, then full rollouts for the beam_width best ones. It stops when
+the time budget of the decision runs out and returns the best candidate
+scored so far.
+
+On a large board only the cells within BOT_PATH_RADIUS of the enemy path
+are tried, in random order, for at most half the time budget.
+
+With processes > 0 the rollouts run in forked worker processes, which get
+the game as it is at the time of the decision without pickling it. Forking
+needs a POSIX system; elsewhere, or with processes=0, the search runs in
+this process.
+"""
+import multiprocessing
+import random
+import time
+from recording import PLACE, apply_input
+from tower_defence import Game, Tower
+from config import BOT_PATH_RADIUS, LARGE_BOARD_CELLS
+from typing import Iterator, List, Optional, Tuple
+
+# a lost port hp weighs as much as this much score
+HP_LOST_PENALTY = 1000
+# score of a longer enemy path, per cell, to break ties
+PATH_CELL_BONUS = 1.0
+
+Candidate = Tuple[str, Tuple[int, int]]  # tower name, pos
+
+_game = None  # the game forked workers search from
+
+
+def rollout(game: Game, name: str, pos: Tuple[int, int],
+            horizon: int) -> Optional[float]:
+    """Value of placing tower name on pos: score gained less lost hp over
+    the rest of the wave, at most horizon ticks. None if place_tower
+    rejects it. game is left as it was.
+    """
+    snap = game.snapshot()
+    try:
+        if not apply_input(game, PLACE, name, *pos):
+            return None
+        score, hp, wave = game.score, game.port_hp, game.enemy_wave
+        path_cells = len(game.path)
+        game.skip_countdown()
+        end = game.ticks + horizon
+        while game.ticks < end and game.enemy_wave == wave \
+                and not game.is_over():
+            game.tick()
+        return (game.score - score - HP_LOST_PENALTY * (hp - game.port_hp)
+                + PATH_CELL_BONUS * path_cells)
+    finally:
+        game.restore(snap)
+
+
+def _rollout_task(task) -> Tuple[Candidate, Optional[float]]:
+    """Run in a worker, value None if the deadline passed."""
+    candidate, horizon, deadline = task
+    if time.monotonic() > deadline:
+        return candidate, None
+    return candidate, rollout(_game, *candidate, horizon)
+
+
+class AutoPlayer:
+    """
+    === Public Attributes ===
+    budget: seconds a decision may take
+    horizon: ticks simulated by a full rollout
+    beam_width: candidates given a full rollout after the short ones
+    processes: worker processes, 0 to search in this process
+    rng: order candidates are tried in, so a cut search is not biased
+    """
+    budget: float
+    horizon: int
+    beam_width: int
+    processes: int
+    rng: random.Random
+
+    def __init__(self, budget=1.0, horizon=1500, beam_width=8, processes=0,
+                 seed=0):
+        self.budget = budget
+        self.horizon = horizon
+        self.beam_width = beam_width
+        self.processes = processes
+        self.rng = random.Random(seed)
+
+    def cells(self, game: Game) -> List[Tuple[int, int]]:
+        """Cells to try towers on: all of a small board, the ones within
+        BOT_PATH_RADIUS of the enemy path, shuffled, on a large one.
+        """
+        size = game.board.size
+        if size * size < LARGE_BOARD_CELLS:
+            return [(row, col) for row in range(size) for col in range(size)]
+        near = set()
+        offsets = range(-BOT_PATH_RADIUS, BOT_PATH_RADIUS + 1)
+        for row, col in game.path:
+            near.update((row + dr, col + dc) for dr in offsets
+                        for dc in offsets)
+        cells = sorted((row, col) for row, col in near
+                       if 0 <= row < size and 0 <= col < size)
+        self.rng.shuffle(cells)
+        return cells
+
+    def candidates(self, game: Game, offers: List[Tower],
+                   deadline: Optional[float] = None) -> List[Candidate]:
+        """Offered tower and cell pairs that place_tower accepts, among the
+        cells tried before deadline if given. Pairs that would cut the
+        enemy path are pruned with Game.blocks_path, not by placing them.
+        """
+        result = []
+        if game.remaining_tower_to_place <= 0:
+            return result
+        towers = {str(tower): tower for tower in offers}
+        names = sorted(towers)
+        last = game.board.size - 1
+        for pos in self.cells(game):
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            if game.board.is_blocked(pos) or pos == (0, 0) \
+                    or pos == (last, last):
+                continue
+            for name in names:
+                if not game.blocks_path(towers[name], pos):
+                    result.append((name, pos))
+        self.rng.shuffle(result)
+        return result
+
+    def choose(self, game: Game,
+               offers: List[Tower]) -> Optional[Candidate]:
+        """Best (tower name, pos) to place within the time budget, None if
+        no offered tower can be placed.
+        """
+        deadline = time.monotonic() + self.budget
+        candidates = self.candidates(game, offers,
+                                     deadline - self.budget / 2)
+        if not candidates:
+            return None
+
+        short = max(1, self.horizon // 4)
+        scored = dict(self._search(game, candidates, short, deadline))
+        if not scored:
+            return candidates[0]
+        beam = sorted(scored, key=scored.get, reverse=True)
+        beam = beam[:self.beam_width]
+        full = dict(self._search(game, beam, self.horizon, deadline))
+        if full:
+            return max(full, key=full.get)
+        return beam[0]
+
+    def _search(self, game: Game, candidates: List[Candidate], horizon: int,
+                deadline: float) -> Iterator[Tuple[Candidate, float]]:
+        """(candidate, value) for the candidates rolled out before the
+        deadline.
+        """
+        if self.processes <= 0 or \
+                'fork' not in multiprocessing.get_all_start_methods():
+            for candidate in candidates:
+                if time.monotonic() > deadline:
+                    return
+                value = rollout(game, *candidate, horizon)
+                if value is not None:
+                    yield candidate, value
+            return
+
+        global _game
+        _game = game
+        tasks = [(candidate, horizon, deadline) for candidate in candidates]
+        ctx = multiprocessing.get_context('fork')
+        with ctx.Pool(self.processes) as pool:
+            for candidate, value in pool.imap_unordered(
+                    _rollout_task, tasks):
+                if value is not None:
+                    yield candidate, value
+        _game = None
+
+    def play(self, game: Game, offers: List[Tower], log=None) -> bool:
+        """Place the best offered tower, through log (an InputLog) if given.
+        Return whether a tower was placed.
+        """
+        choice = self.choose(game, offers)
+        if choice is None:
+            return False
+        name, pos = choice
+        if log is not None:
+            return log.play(game, PLACE, name, *pos)
+        return apply_input(game, PLACE, name, *pos)
@@ -0,0 +1,154 @@
+"""Micro-benchmark of the path finders on 12x12 and 256x256 boards.
+
+Compares pathfinding.bfs_path against the list based BFS that
+tower_defence.enemy_path used before (kept below as list_queue_bfs) and
+against enemy_path_dfs, and checks that both BFS versions agree. The
+passability mask is built once per board, as the game does per board
+change, so only the search is timed.
+
+Then times building a flow field from scratch on 256x256 and 1024x1024
+boards against repairing the field of the board after a tower is placed
+on the enemy path, and checks that both give the same field.
+
+Last, times building the cut map of 12x12 and 48x48 boards against
+searching the board again with each cell of the enemy path blocked, and
+checks that both find the same cells. Usage:
+
+    python benchmarks/bench_pathfinding.py
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('TD_HEADLESS', '1')
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import random
+import timeit
+from board import Board
+from tower_defence import Cannon, enemy_path_dfs, next_move_extensions
+from pathfinding import CutMap, FlowField, bfs_path
+
+SIZES = [12, 256]
+FIELD_SIZES = [256, 1024]
+CUT_SIZES = [12, 48]
+
+
+def list_queue_bfs(board: Board, pos=(0, 0)):
+    """The BFS enemy_path ran before bfs_path, for comparison."""
+    size = board.size
+    if pos == (size - 1, size - 1):
+        return [pos]
+    visited = {pos}
+    queue = [[pos]]
+    while queue:
+        path = queue.pop(0)
+        for ext in next_move_extensions(path[-1], board):
+            if ext == (size - 1, size - 1):
+                return path + [ext]
+            if ext not in visited:
+                queue.append(path + [ext])
+                visited.add(ext)
+    return []
+
+
+def gen_boards(size: int):
+    """An empty board, a board with random towers and a serpentine
+    board whose only path zigzags through every other row.
+    """
+    tower = Cannon()
+    empty = Board(size)
+
+    rng = random.Random(size)
+    while True:
+        scattered = Board(size)
+        for row in range(size):
+            for col in range(size):
+                if rng.random() < 0.25:
+                    scattered.set((row, col), tower)
+        scattered.clear((0, 0))
+        scattered.clear((size - 1, size - 1))
+        if bfs_path(scattered.passable(), 0, size):
+            break
+
+    serpentine = Board(size)
+    for row in range(1, size - 1, 2):
+        gap = size - 1 if row % 4 == 1 else 0
+        for col in range(size):
+            if col != gap:
+                serpentine.set((row, col), tower)
+    return [('empty', empty), ('scattered', scattered),
+            ('serpentine', serpentine)]
+
+
+def bench(stmt, number: int) -> float:
+    """Best time of one call, in ms."""
+    return min(timeit.repeat(stmt, number=number, repeat=3)) / number * 1000
+
+
+def bench_flow_fields():
+    print(f'{"board":<18}{"build":>12}{"repair":>12}{"speedup":>10}'
+          f'  same field')
+    tower = Cannon()
+    for size in FIELD_SIZES:
+        for name, board in gen_boards(size):
+            field = FlowField(board)
+            path = bfs_path(board.passable(), 0, size)
+            placed = board.copy()
+            placed.set(path[len(path) // 2], tower)
+            built = FlowField(placed)
+            repaired = FlowField(placed, field)
+            same = built.dist == repaired.dist and \
+                built.next_cell == repaired.next_cell
+            t_build = bench(lambda: FlowField(placed), 1)
+            t_repair = bench(lambda: FlowField(placed, field), 5)
+            print(f'{f"{size}x{size} {name}":<18}{t_build:>10.1f}ms'
+                  f'{t_repair:>10.1f}ms{t_build / t_repair:>9.1f}x  {same}')
+
+
+def cuts_by_search(board: Board):
+    """Cells of the enemy path whose tower would cut it, one search per
+    cell, for comparison with CutMap.
+    """
+    size = board.size
+    cells = set()
+    for row, col in bfs_path(board.passable(), 0, size)[1:-1]:
+        mask = board.passable()[:]
+        mask[row * size + col] = 0
+        if not bfs_path(mask, 0, size):
+            cells.add(row * size + col)
+    return cells
+
+
+def bench_cut_maps():
+    print(f'{"board":<18}{"cut map":>12}{"searches":>12}{"speedup":>10}'
+          f'  same cells')
+    for size in CUT_SIZES:
+        number = 50 if size <= 16 else 2
+        for name, board in gen_boards(size):
+            same = set(CutMap(board).cuts) == cuts_by_search(board)
+            t_map = bench(lambda: CutMap(board), number)
+            t_search = bench(lambda: cuts_by_search(board), number)
+            print(f'{f"{size}x{size} {name}":<18}{t_map:>10.2f}ms'
+                  f'{t_search:>10.2f}ms{t_search / t_map:>9.1f}x  {same}')
+
+
+if __name__ == '__main__':
+    sys.setrecursionlimit(1000000)
+    print(f'{"board":<16}{"bfs_path":>12}{"list BFS":>12}'
+          f'{"DFS":>12}{"speedup":>10}  same path')
+    for size in SIZES:
+        number = 200 if size <= 16 else 2
+        for name, board in gen_boards(size):
+            mask = board.passable()
+            new = bfs_path(mask, 0, size)
+            old = list_queue_bfs(board)
+            t_new = bench(lambda: bfs_path(mask, 0, size), number)
+            t_old = bench(lambda: list_queue_bfs(board), number)
+            t_dfs = bench(lambda: enemy_path_dfs(board), number)
+            print(f'{f"{size}x{size} {name}":<16}{t_new:>10.3f}ms'
+                  f'{t_old:>10.3f}ms{t_dfs:>10.3f}ms'
+                  f'{t_old / t_new:>9.1f}x  {new == old}')
+    print()
+    bench_flow_fields()
+    print()
+    bench_cut_maps()
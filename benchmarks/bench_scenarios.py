@@ -0,0 +1,285 @@
+"""Scenario benchmarks of the simulation hot paths.
+
+Runs scripted headless games and times every tick, Game.update_all_towers,
+Game.update_enemies, Game.place_tower, check_merge_tower and enemy_path
+separately. The results (ticks/s and p50/p99 latencies per scenario and
+phase) are written as JSON, so two builds can be compared. Usage:
+
+    python benchmarks/bench_scenarios.py --out bench.json
+    python benchmarks/bench_scenarios.py --scenario empty --scenario storm
+    python benchmarks/bench_scenarios.py --load wave80.sav --scenario saved
+
+Scenarios:
+    empty         waves spawning onto an empty board
+    full          a serpentine board of level 4 towers, waves spawning
+    max_enemies   MAX_ENEMY_NUM tough enemies spread along the full board
+    waves         waves 1 to 200 with a scripted placement policy
+    storm         placement attempts on random cells until the board fills
+    saved         ticks from the game saved in --load (see savegame.py)
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('TD_HEADLESS', '1')
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import argparse
+import functools
+import json
+import platform
+import random
+import time
+from typing import Callable, Dict, List
+import tower_defence
+from tower_defence import (Game, Cannon, Sniper, Crusher, Circle, CELL_COORD,
+                           enemy_path)
+from pathfinding import flow_field
+from savegame import load_game
+from config import BOARD_SIZE, MAX_ENEMY_NUM, TOWER_MAX_LVL
+
+PHASES = ['tick', 'update_all_towers', 'update_enemies', 'place_tower',
+          'check_merge_tower', 'enemy_path']
+
+
+class Timings:
+    """
+    === Public Attributes ===
+    samples: seconds taken by every call, by phase
+    """
+    samples: Dict[str, List[float]]
+
+    def __init__(self):
+        self.samples = {phase: [] for phase in PHASES}
+
+    def wrap(self, phase: str, func: Callable) -> Callable:
+        samples = self.samples[phase]
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = clock()
+            result = func(*args, **kwargs)
+            samples.append(clock() - start)
+            return result
+        return timed
+
+    def instrument(self, game: Game):
+        """Time the phases game.tick calls, from the next tick on."""
+        game.update_all_towers = self.wrap('update_all_towers',
+                                           game.update_all_towers)
+        game.update_enemies = self.wrap('update_enemies',
+                                        game.update_enemies)
+        game.place_tower = self.wrap('place_tower', game.place_tower)
+
+    def tick(self, game: Game, ticks: int, on_tick=None):
+        samples = self.samples['tick']
+        clock = time.perf_counter
+        for _ in range(ticks):
+            if game.is_over():
+                break
+            if on_tick is not None:
+                on_tick(game)
+            start = clock()
+            game.tick()
+            samples.append(clock() - start)
+
+    def report(self) -> Dict[str, dict]:
+        result = {}
+        for phase, samples in self.samples.items():
+            if samples:
+                result[phase] = summarize(samples)
+        ticks = self.samples['tick']
+        if ticks:
+            result['tick']['ticks_per_s'] = len(ticks) / sum(ticks)
+        return result
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(samples: List[float]) -> dict:
+    ordered = sorted(samples)
+    return {'calls': len(samples),
+            'total_ms': sum(samples) * 1000,
+            'p50_us': percentile(ordered, 0.5) * 1e6,
+            'p99_us': percentile(ordered, 0.99) * 1e6,
+            'max_us': ordered[-1] * 1e6}
+
+
+def new_game(seed: int) -> Game:
+    """A game that is already spawning and cannot be lost."""
+    g = Game(seed)
+    g.port_hp = 10 ** 9
+    g.skip_countdown()
+    return g
+
+
+def max_level(cls):
+    tower = cls()
+    for _ in range(TOWER_MAX_LVL - 1):
+        tower.upgrade_tower()
+    return tower
+
+
+def fill_serpentine(g: Game, rng: random.Random):
+    """Level 4 towers on every other row, leaving a gap at alternating
+    ends, so the path zigzags past all of them. Merges are skipped.
+    """
+    for row in range(1, BOARD_SIZE - 1, 2):
+        gap = BOARD_SIZE - 1 if row % 4 == 1 else 0
+        for col in range(BOARD_SIZE):
+            if col != gap:
+                tower = max_level(rng.choice([Cannon, Sniper, Crusher]))
+                tower.place((row, col))
+                g.board.set((row, col), tower)
+    g.refresh_tower_list()
+    g.flow_field = flow_field(g.board)
+    g.path = g.flow_field.path_from((0, 0))
+
+
+def scenario_empty(timings: Timings, seed: int, ticks: int):
+    g = new_game(seed)
+    timings.instrument(g)
+    timings.tick(g, ticks)
+
+
+def scenario_full(timings: Timings, seed: int, ticks: int):
+    g = new_game(seed)
+    fill_serpentine(g, random.Random(seed))
+    timings.instrument(g)
+    timings.tick(g, ticks)
+
+
+def scenario_max_enemies(timings: Timings, seed: int, ticks: int):
+    g = new_game(seed)
+    fill_serpentine(g, random.Random(seed))
+    g.new_enemy_list = []
+    g.spawning = False
+    path = g.path
+    for i in range(MAX_ENEMY_NUM):
+        e = Circle(10 ** 12, 1, g.flow_field, g.enemy_store)
+        row, col = path[i * len(path) // MAX_ENEMY_NUM]
+        g.enemy_store.pos[e.slot] = CELL_COORD[row * BOARD_SIZE + col]
+        e.update_path(g.flow_field)
+        g.add_enemy(e)
+    timings.instrument(g)
+    timings.tick(g, ticks)
+
+
+def placement_policy(rng: random.Random, every: int):
+    def policy(g: Game):
+        if g.ticks % every == 0 and g.remaining_tower_to_place > 0:
+            tower = rng.choice([Cannon, Sniper, Crusher])()
+            pos = (rng.randrange(BOARD_SIZE), rng.randrange(BOARD_SIZE))
+            if g.place_tower(tower, pos):
+                g.game_update_enemy_path()
+        if g.countdown > 0:
+            g.skip_countdown()
+    return policy
+
+
+def scenario_waves(timings: Timings, seed: int, waves: int):
+    g = new_game(seed)
+    timings.instrument(g)
+    policy = placement_policy(random.Random(seed), 90)
+    while g.enemy_wave < waves:
+        timings.tick(g, 1000, policy)
+
+
+def scenario_storm(timings: Timings, seed: int, attempts: int):
+    """Placement attempts on random cells, one per tick, with the path
+    also searched by enemy_path after each one.
+    """
+    g = new_game(seed)
+    g.remaining_tower_to_place = 10 ** 9
+    timings.instrument(g)
+    rng = random.Random(seed)
+    timed_path = timings.wrap('enemy_path', enemy_path)
+
+    def policy(g: Game):
+        tower = rng.choice([Cannon, Sniper, Crusher])()
+        pos = (rng.randrange(BOARD_SIZE), rng.randrange(BOARD_SIZE))
+        if g.place_tower(tower, pos):
+            g.game_update_enemy_path()
+        timed_path(g.board)
+    timings.tick(g, attempts, policy)
+
+
+def scenario_saved(path: str, timings: Timings, seed: int, ticks: int):
+    """Ticks from a saved game, which cannot be lost."""
+    g = load_game(path)
+    g.port_hp = 10 ** 9
+    timings.instrument(g)
+    timings.tick(g, ticks)
+
+
+SCENARIOS = {
+    'empty': (scenario_empty, 5000),
+    'full': (scenario_full, 5000),
+    'max_enemies': (scenario_max_enemies, 500),
+    'waves': (scenario_waves, 200),
+    'storm': (scenario_storm, 2000),
+}
+
+
+def run(names: List[str], seed: int, scale: float) -> Dict[str, dict]:
+    results = {}
+    check_merge = tower_defence.check_merge_tower
+    for name in names:
+        func, size = SCENARIOS[name]
+        timings = Timings()
+        # place_tower looks check_merge_tower up in the module
+        tower_defence.check_merge_tower = timings.wrap('check_merge_tower',
+                                                       check_merge)
+        start = time.perf_counter()
+        try:
+            func(timings, seed, max(1, round(size * scale)))
+        finally:
+            tower_defence.check_merge_tower = check_merge
+        results[name] = timings.report()
+        results[name]['wall_s'] = time.perf_counter() - start
+    return results
+
+
+def print_results(results: Dict[str, dict]):
+    print(f'{"scenario":<13}{"phase":<19}{"calls":>8}{"p50 us":>10}'
+          f'{"p99 us":>10}{"ticks/s":>10}')
+    for name, phases in results.items():
+        for phase in PHASES:
+            if phase not in phases:
+                continue
+            stats = phases[phase]
+            rate = stats.get('ticks_per_s')
+            print(f'{name:<13}{phase:<19}{stats["calls"]:>8}'
+                  f'{stats["p50_us"]:>10.1f}{stats["p99_us"]:>10.1f}'
+                  f'{"" if rate is None else f"{rate:.0f}":>10}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scenario benchmarks.')
+    parser.add_argument('--scenario', action='append',
+                        choices=list(SCENARIOS) + ['saved'],
+                        help='scenario to run, can be repeated (default all)')
+    parser.add_argument('--load', metavar='FILE', default=None,
+                        help='saved game the saved scenario starts from')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiply the length of every scenario')
+    parser.add_argument('--label', default='',
+                        help='name of the build, stored in the results')
+    parser.add_argument('--out', default='bench_scenarios.json')
+    args = parser.parse_args()
+    if args.load is not None:
+        SCENARIOS['saved'] = (functools.partial(scenario_saved, args.load),
+                              5000)
+    elif 'saved' in (args.scenario or []):
+        parser.error('the saved scenario needs --load FILE')
+
+    results = run(args.scenario or list(SCENARIOS), args.seed, args.scale)
+    print_results(results)
+    with open(args.out, 'w') as f:
+        json.dump({'label': args.label, 'seed': args.seed,
+                   'scale': args.scale, 'python': platform.python_version(),
+                   'machine': platform.machine(), 'time': time.time(),
+                   'scenarios': results}, f, indent=2)
+    print(f'results written to {args.out}')
@@ -0,0 +1,351 @@
+"""Compact board model.
+
+A board is an occupancy bitmask plus one byte per cell for the tower type
+and one for its level, with the Tower objects kept in a side table. Copies
+are cheap, "is this cell blocked" is a byte test and the path finder reads
+the passability mask straight off the type bytes.
+
+The bytes are stored in chunks of CHUNK_CELLS cells that copies of a board
+share until one of them writes to the chunk, so copying a 1024x1024 board
+before placing a tower does not copy its megabytes of cells.
+
+The board also indexes merges: for every free cell, the length of the run of
+equal towers (same type and level) next to it in each direction, and for
+every type and level, the free cells where placing such a tower would
+merge. Both are updated around the cell a placement or removal changes,
+so whether a placement merges is a set lookup, and how far it cascades
+only reads the cells around it.
+"""
+from config import BOARD_SIZE, TOWER_MAX_LVL
+import numpy as np
+from typing import Dict, List, Optional, Set, Tuple
+
+# tower type codes stored in Board.kind
+EMPTY = 0
+CANNON = 1
+SNIPER = 2
+CRUSHER = 3
+
+# bytes.translate table turning type codes into 1 for free, 0 for blocked
+_PASSABLE = bytes([1] + [0] * 255)
+
+CHUNK_BITS = 12
+CHUNK_CELLS = 1 << CHUNK_BITS
+_CHUNK_MASK = CHUNK_CELLS - 1
+
+# Board.runs packs a run length (0 to 2) for each direction, left, right,
+# up and down, RUN_BITS bits each
+RUN_BITS = 2
+_RUN_MASK = (1 << RUN_BITS) - 1
+
+
+class ChunkedBytes:
+    """A byte per cell, indexed by flat index like a bytearray, stored in
+    chunks of CHUNK_CELLS bytes. A copy shares every chunk until either
+    side writes to it.
+
+    === Public Attributes ===
+    chunks: the bytes, in order, not to be written to directly
+    """
+    chunks: List[bytearray]
+    _owned: List[bool]
+
+    def __init__(self, n: int):
+        self.chunks = [bytearray(min(CHUNK_CELLS, n - start))
+                       for start in range(0, n, CHUNK_CELLS)]
+        self._owned = [True] * len(self.chunks)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'ChunkedBytes':
+        result = cls(0)
+        result.chunks = [bytearray(data[start:start + CHUNK_CELLS])
+                         for start in range(0, len(data), CHUNK_CELLS)]
+        result._owned = [True] * len(result.chunks)
+        return result
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self.chunks)
+
+    def __getitem__(self, i: int) -> int:
+        return self.chunks[i >> CHUNK_BITS][i & _CHUNK_MASK]
+
+    def __setitem__(self, i: int, value: int):
+        c = i >> CHUNK_BITS
+        if not self._owned[c]:
+            self.chunks[c] = self.chunks[c][:]
+            self._owned[c] = True
+        self.chunks[c][i & _CHUNK_MASK] = value
+
+    def __bytes__(self):
+        return b''.join(self.chunks)
+
+    def copy(self) -> 'ChunkedBytes':
+        result = ChunkedBytes.__new__(ChunkedBytes)
+        result.chunks = self.chunks[:]
+        result._owned = [False] * len(self.chunks)
+        self._owned = [False] * len(self.chunks)
+        return result
+
+
+class Board:
+    """
+    === Public Attributes ===
+    size: number of rows (and columns)
+    occupancy: bitmask with bit row * size + col set for every tower
+    kind: tower type code of every cell, EMPTY if there is no tower
+    level: tower level of every cell, 0 if there is no tower
+    towers: tower on every occupied cell, by flat index
+    runs: for every free cell, how many towers equal to its neighbour
+        follow each other from that neighbour on, in each direction (see
+        RUN_BITS), 0 for every tower
+    merge_spots: free cells, by flat index, where a tower would merge, by
+        (type code, level) of the tower
+    """
+    size: int
+    occupancy: int
+    kind: ChunkedBytes
+    level: ChunkedBytes
+    towers: Dict[int, object]
+    runs: ChunkedBytes
+    merge_spots: Dict[Tuple[int, int], Set[int]]
+    _spot_codes: Dict[int, List[Tuple[int, int]]]
+
+    def __init__(self, size=BOARD_SIZE):
+        self.size = size
+        self.occupancy = 0
+        self.kind = ChunkedBytes(size * size)
+        self.level = ChunkedBytes(size * size)
+        self.towers = {}
+        self.runs = ChunkedBytes(size * size)
+        self.merge_spots = {}
+        self._spot_codes = {}  # keys of merge_spots each cell is in
+        self._passable = None
+        self._passable_chunks = [None] * len(self.kind.chunks)
+
+    def copy(self) -> 'Board':
+        board = Board.__new__(Board)
+        board.size = self.size
+        board.occupancy = self.occupancy
+        board.kind = self.kind.copy()
+        board.level = self.level.copy()
+        board.towers = self.towers.copy()
+        board.runs = self.runs.copy()
+        board.merge_spots = {code: cells.copy()
+                             for code, cells in self.merge_spots.items()}
+        board._spot_codes = self._spot_codes.copy()
+        board._passable = self._passable
+        board._passable_chunks = self._passable_chunks[:]
+        return board
+
+    @classmethod
+    def from_occupancy(cls, size: int, occupancy: int) -> 'Board':
+        """A board blocked where occupancy has a bit set, for path finding
+        only: blocked cells have a type code but no tower, and merges are
+        not indexed.
+        """
+        board = cls(size)
+        board.occupancy = occupancy
+        n = size * size
+        bits = np.unpackbits(np.frombuffer(
+            occupancy.to_bytes((n + 7) // 8, 'little'), dtype=np.uint8),
+            bitorder='little')[:n]
+        board.kind = ChunkedBytes.from_bytes((bits * CANNON).tobytes())
+        return board
+
+    def index(self, pos: Tuple[int, int]) -> int:
+        return pos[0] * self.size + pos[1]
+
+    def get(self, pos: Tuple[int, int]):
+        """Tower on pos, None if the cell is free."""
+        return self.towers.get(pos[0] * self.size + pos[1])
+
+    def is_blocked(self, pos: Tuple[int, int]) -> bool:
+        return self.kind[pos[0] * self.size + pos[1]] != EMPTY
+
+    def set(self, pos: Tuple[int, int], tower):
+        i = pos[0] * self.size + pos[1]
+        self.occupancy |= 1 << i
+        self.kind[i] = tower.kind
+        self.level[i] = tower.level
+        self.towers[i] = tower
+        self._passable = None
+        self._passable_chunks[i >> CHUNK_BITS] = None
+        self._reindex(i)
+
+    def clear(self, pos: Tuple[int, int]):
+        i = pos[0] * self.size + pos[1]
+        if self.kind[i] == EMPTY:
+            return
+        self.occupancy &= ~(1 << i)
+        self.kind[i] = EMPTY
+        self.level[i] = 0
+        del self.towers[i]
+        self._passable = None
+        self._passable_chunks[i >> CHUNK_BITS] = None
+        self._reindex(i)
+
+    def will_merge(self, pos: Tuple[int, int], kind: int, level: int) -> bool:
+        """Whether a tower of kind and level placed on free cell pos would
+        merge with its neighbours.
+        """
+        spots = self.merge_spots.get((kind, level))
+        return spots is not None and pos[0] * self.size + pos[1] in spots
+
+    def merge_plan(self, pos: Tuple[int, int], kind: int,
+                   level: int) -> List[List[int]]:
+        """The two towers, by flat index, each merge clears if a tower of
+        kind and level is placed on free cell pos, one pair for each level
+        the tower gains, in the order check_merge_tower merges them. Empty
+        if the tower would not merge. The board is not changed.
+        """
+        if not self.will_merge(pos, kind, level):
+            return []
+        size = self.size
+        i = pos[0] * size + pos[1]
+        plan = []
+        cleared = set()
+        while level < TOWER_MAX_LVL:
+            # the leftmost 3 in a row first, then the topmost 3 in a column
+            left, right, up, down = self._arms(i, kind, level, cleared)
+            if left + right >= 2:
+                start, step = i - left, 1
+            elif up + down >= 2:
+                start, step = i - up * size, size
+            else:
+                break
+            pair = [j for j in (start, start + step, start + 2 * step)
+                    if j != i]
+            plan.append(pair)
+            cleared.update(pair)
+            level += 1
+        return plan
+
+    def merge_preview(self, kind: int,
+                      level: int) -> Dict[Tuple[int, int], int]:
+        """Level a tower of kind and level would end up at on every free
+        cell where it merges.
+        """
+        size = self.size
+        preview = {}
+        for i in self.merge_spots.get((kind, level), ()):
+            pos = divmod(i, size)
+            preview[pos] = level + len(self.merge_plan(pos, kind, level))
+        return preview
+
+    def _arms(self, i: int, kind: int, level: int,
+              cleared: Set[int]) -> List[int]:
+        """How many towers of kind and level follow each other from cell
+        i on (0 to 2) to the left, right, up and down, as if the cleared
+        cells were free.
+        """
+        size = self.size
+        row, col = divmod(i, size)
+        kinds = self.kind
+        levels = self.level
+        runs = self.runs[i]
+        arms = []
+        for shift, room, step in ((0, col, -1), (RUN_BITS, size - 1 - col, 1),
+                                  (2 * RUN_BITS, row, -size),
+                                  (3 * RUN_BITS, size - 1 - row, size)):
+            j = i + step
+            if not room or j in cleared or kinds[j] != kind \
+                    or levels[j] != level:
+                arms.append(0)
+            elif not cleared:
+                arms.append(runs >> shift & _RUN_MASK)
+            else:
+                j += step
+                arms.append(2 if room > 1 and j not in cleared and
+                            kinds[j] == kind and levels[j] == level else 1)
+        return arms
+
+    def _reindex(self, i: int):
+        """Update runs and merge_spots for the free cells whose runs start
+        at cell i, which changed, or go through it: the free cells next to
+        i, and the ones past a tower next to i.
+        """
+        size = self.size
+        row, col = divmod(i, size)
+        kinds = self.kind
+        self._index_cell(i)
+        for room, step in ((col, -1), (size - 1 - col, 1), (row, -size),
+                           (size - 1 - row, size)):
+            if not room:
+                continue
+            j = i + step
+            if kinds[j] == EMPTY:
+                self._index_cell(j)
+            elif room > 1 and kinds[j + step] == EMPTY:
+                self._index_cell(j + step)
+
+    def _index_cell(self, i: int):
+        spots = self.merge_spots
+        codes = self._spot_codes.pop(i, None)
+        if codes:
+            for code in codes:
+                spots[code].discard(i)
+        if self.kind[i] != EMPTY:
+            self.runs[i] = 0
+            return
+        size = self.size
+        row, col = divmod(i, size)
+        left, n_left = self._run(i, -1, col)
+        right, n_right = self._run(i, 1, size - 1 - col)
+        up, n_up = self._run(i, -size, row)
+        down, n_down = self._run(i, size, size - 1 - row)
+        self.runs[i] = (n_left | n_right << RUN_BITS | n_up << 2 * RUN_BITS |
+                        n_down << 3 * RUN_BITS)
+
+        codes = []
+        for code in {left, right, up, down}:
+            if code is None or code[1] >= TOWER_MAX_LVL:
+                continue
+            if (n_left if left == code else 0) + \
+                    (n_right if right == code else 0) >= 2 or \
+                    (n_up if up == code else 0) + \
+                    (n_down if down == code else 0) >= 2:
+                codes.append(code)
+                spots.setdefault(code, set()).add(i)
+        if codes:
+            self._spot_codes[i] = codes
+
+    def _run(self, i: int, step: int,
+             room: int) -> Tuple[Optional[Tuple[int, int]], int]:
+        """(type code, level) of the tower next to cell i in the direction
+        of step, with room cells left that way, and how many such towers
+        follow each other from there on (up to 2). (None, 0) if that
+        cell is free or off the board.
+        """
+        if not room:
+            return None, 0
+        kinds = self.kind
+        j = i + step
+        kind = kinds[j]
+        if kind == EMPTY:
+            return None, 0
+        level = self.level[j]
+        j += step
+        if room > 1 and kinds[j] == kind and self.level[j] == level:
+            return (kind, level), 2
+        return (kind, level), 1
+
+    def passable(self) -> bytearray:
+        """1 for every free cell, 0 for every tower. Do not mutate."""
+        if self._passable is None:
+            chunks = self._passable_chunks
+            for c, chunk in enumerate(self.kind.chunks):
+                if chunks[c] is None:
+                    chunks[c] = chunk.translate(_PASSABLE)
+            self._passable = bytearray().join(chunks)
+        return self._passable
+
+    def tower_list(self) -> List:
+        """Towers in row-major order."""
+        return [self.towers[i] for i in sorted(self.towers)]
+
+    def rows(self) -> List[List[Optional[object]]]:
+        """The board as nested lists of towers and None."""
+        get = self.towers.get
+        size = self.size
+        return [[get(row * size + col) for col in range(size)]
+                for row in range(size)]
@@ -0,0 +1,55 @@
+"""Bounded least-recently-used cache with hit and miss counters."""
+from collections import OrderedDict
+from typing import Hashable
+
+
+class LRUCache:
+    """Mapping of at most maxsize entries that evicts the least recently
+    used one, counting hits and misses.
+
+    === Public Attributes ===
+    maxsize: number of entries kept
+    hits: lookups that found their key
+    misses: lookups that did not
+    """
+    maxsize: int
+    hits: int
+    misses: int
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __str__(self):
+        return (f'{self.hits} hits, {self.misses} misses '
+                f'({self.hit_rate():.1%}), {len(self)}/{self.maxsize} entries')
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key: Hashable):
+        """Value stored for key, None if there is none."""
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
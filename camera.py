@@ -0,0 +1,79 @@
+"""Part of the board shown on screen.
+
+A board small enough to fit the board area of the window is shown whole
+and the camera never moves. A larger board is seen through a view the size
+of that area, which the arrow keys scroll, and only the cells in view are
+drawn. The game keeps positions in board pixels, the camera only shifts
+them to screen pixels when drawing.
+"""
+from config import BOARD_SIZE, grid_size, margin
+from typing import Optional, Tuple
+import pygame
+
+
+class Camera:
+    """
+    === Public Attributes ===
+    view: screen area the board is drawn in
+    size: number of rows (and columns) of the board
+    x: board pixel shown at the left edge of view
+    y: board pixel shown at the top edge of view
+    """
+    view: pygame.Rect
+    size: int
+    x: int
+    y: int
+
+    def __init__(self, view: pygame.Rect, size=BOARD_SIZE):
+        self.view = view
+        self.size = size
+        self.x = 0
+        self.y = 0
+
+    @property
+    def offset(self) -> Tuple[int, int]:
+        """What to add to a board pixel to get its screen pixel."""
+        return self.view.x - self.x, self.view.y - self.y
+
+    def scrolls(self) -> bool:
+        """Whether the board is larger than the view."""
+        side = self.size * grid_size + margin
+        return side > self.view.width or side > self.view.height
+
+    def move_to(self, x: float, y: float):
+        """Show board pixel (x, y) at the top left of view, as close as the
+        edges of the board allow.
+        """
+        side = self.size * grid_size + margin
+        self.x = int(min(max(x, 0), max(side - self.view.width, 0)))
+        self.y = int(min(max(y, 0), max(side - self.view.height, 0)))
+
+    def pan(self, dx: float, dy: float):
+        self.move_to(self.x + dx, self.y + dy)
+
+    def center_on(self, pos: Tuple[int, int]):
+        """Scroll so that cell pos is in the middle of view."""
+        self.move_to(grid_size * pos[1] + grid_size // 2 -
+                     self.view.width // 2,
+                     grid_size * pos[0] + grid_size // 2 -
+                     self.view.height // 2)
+
+    def cell_at(self, pos: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        """Cell under screen pixel pos, None if it is not on the board."""
+        if not self.view.collidepoint(pos):
+            return None
+        row = (pos[1] - self.view.y + self.y) // grid_size
+        col = (pos[0] - self.view.x + self.x) // grid_size
+        if 0 <= row < self.size and 0 <= col < self.size:
+            return row, col
+        return None
+
+    def visible(self) -> Tuple[range, range]:
+        """Rows and columns with a cell at least partly in view."""
+        rows = range(max(self.y // grid_size, 0),
+                     min((self.y + self.view.height) // grid_size + 1,
+                         self.size))
+        cols = range(max(self.x // grid_size, 0),
+                     min((self.x + self.view.width) // grid_size + 1,
+                         self.size))
+        return rows, cols
@@ -0,0 +1,280 @@
+"""Enemy simulation state kept as NumPy arrays, one row per live enemy.
+
+Positions, targets, speeds, hp and the cell each enemy is walking to sit in
+contiguous arrays, so the whole wave moves in one vectorized step per tick.
+Enemy sprites only own a slot in the store and read it when they are drawn
+or targeted.
+"""
+import numpy as np
+from config import MAX_ENEMY_NUM, grid_size
+from pathfinding import FlowField, UNREACHABLE
+from typing import Dict, List, Tuple
+
+
+class FieldTables:
+    """A flow field as arrays: next cell and distance to the port (in
+    pixels) for every cell, blocked cells included.
+    """
+    next_cell: np.ndarray
+    dist: np.ndarray
+
+    def __init__(self, field: FlowField):
+        self.next_cell = np.array(field.next_cell, dtype=np.intp)
+        dist = np.array(field.dist, dtype=np.float64)
+        # FlowField.steps: a blocked cell is left through its best neighbour
+        left = (dist == UNREACHABLE) & (self.next_cell != UNREACHABLE)
+        dist[left] = dist[self.next_cell[left]] + 1
+        self.dist = dist * grid_size
+
+
+class EnemyStore:
+    """
+    === Public Attributes ===
+    n: number of live enemies, they use slots 0 to n - 1
+    owners: enemy sprite using each slot
+    pos: position of each enemy
+    prev_pos: position of each enemy before the last step, for drawing
+        between two ticks
+    target: pixel center of the cell each enemy walks to
+    target_cell: flat index of the cell each enemy walks to
+    target_dist: distance from the target cell to the port
+    remaining: distance left to the port
+    speed: distance moved per tick
+    hp: hp left
+    remove: whether the enemy reached the port
+    kind: type code of each enemy, for per-type lookup tables
+    field_key: key in fields of the flow field each enemy follows
+    fields: flow fields in use, as arrays
+    """
+    n: int
+    owners: list
+    pos: np.ndarray
+    prev_pos: np.ndarray
+    target: np.ndarray
+    target_cell: np.ndarray
+    target_dist: np.ndarray
+    remaining: np.ndarray
+    speed: np.ndarray
+    hp: np.ndarray
+    remove: np.ndarray
+    kind: np.ndarray
+    field_key: np.ndarray
+    fields: Dict[int, FieldTables]
+
+    def __init__(self, cell_coord: List[Tuple[int, int]],
+                 capacity=MAX_ENEMY_NUM):
+        self.n = 0
+        self.owners = []
+        self.coord = np.array(cell_coord, dtype=np.float64)
+        self.fields = {}
+        self._field_keys = {}
+        self._next_key = 0
+        self._lists = None
+        self._alloc(capacity)
+
+    def _alloc(self, capacity: int):
+        self.pos = np.zeros((capacity, 2))
+        self.target = np.zeros((capacity, 2))
+        self.target_cell = np.zeros(capacity, dtype=np.intp)
+        self.target_dist = np.zeros(capacity)
+        self.remaining = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.hp = np.zeros(capacity)
+        self.remove = np.zeros(capacity, dtype=bool)
+        self.field_key = np.zeros(capacity, dtype=np.intp)
+        self.prev_pos = np.zeros((capacity, 2))
+        self.kind = np.zeros(capacity, dtype=np.uint8)
+
+    def _arrays(self) -> List[np.ndarray]:
+        return [self.pos, self.target, self.target_cell, self.target_dist,
+                self.remaining, self.speed, self.hp, self.remove,
+                self.field_key, self.prev_pos, self.kind]
+
+    def _grow(self):
+        old = self._arrays()
+        self._alloc(len(self.pos) * 2)
+        for new, arr in zip(self._arrays(), old):
+            new[:len(arr)] = arr
+
+    def add(self, owner, pos: Tuple[float, float], hp: float,
+            speed: float, kind=0) -> int:
+        """Give owner a slot and return it."""
+        if self.n == len(self.pos):
+            self._grow()
+        slot = self.n
+        self.n += 1
+        self.owners.append(owner)
+        self.pos[slot] = pos
+        self.prev_pos[slot] = pos
+        self.hp[slot] = hp
+        self.speed[slot] = speed
+        self.remove[slot] = False
+        self.kind[slot] = kind
+        self._lists = None
+        return slot
+
+    def free(self, slot: int):
+        """Release slot, moving the last enemy into it to stay contiguous."""
+        last = self.n - 1
+        if slot != last:
+            for arr in self._arrays():
+                arr[slot] = arr[last]
+            owner = self.owners[last]
+            self.owners[slot] = owner
+            owner.slot = slot
+        self.owners.pop()
+        self.n -= 1
+        self._lists = None
+
+    def snapshot(self) -> tuple:
+        """Copy of the live rows, their owners and the fields in use."""
+        n = self.n
+        return (n, [arr[:n].copy() for arr in self._arrays()],
+                self.owners[:], self.fields.copy(), self._field_keys.copy(),
+                self._next_key)
+
+    def restore(self, state: tuple):
+        """Go back to a snapshot, giving every owner its slot back."""
+        n, arrays, owners, fields, field_keys, next_key = state
+        while len(self.pos) < n:
+            self._grow()
+        for arr, saved in zip(self._arrays(), arrays):
+            arr[:n] = saved
+        self.n = n
+        self.owners = owners[:]
+        for slot, owner in enumerate(self.owners):
+            owner.slot = slot
+        self.fields = fields.copy()
+        self._field_keys = field_keys.copy()
+        self._next_key = next_key
+        self._lists = None
+
+    def load(self, owners: list, columns: List[np.ndarray],
+             fields: List[FlowField]):
+        """Replace every row at once: owners[i] gets slot i, the columns
+        (pos, target, target_cell, target_dist, remaining, speed, hp and
+        remove, one row per owner) are copied in and row i follows
+        fields[i].
+        """
+        n = len(owners)
+        while len(self.pos) < n:
+            self._grow()
+        for arr, column in zip(self._arrays(), columns):
+            arr[:n] = column
+        self.prev_pos[:n] = self.pos[:n]
+        self.kind[:n] = [owner.kind for owner in owners]
+        self.n = n
+        self.owners = list(owners)
+        self.fields = {}
+        self._field_keys = {}
+        for slot, (owner, field) in enumerate(zip(owners, fields)):
+            owner.slot = slot
+            self.field_key[slot] = self.key_of(field)
+        self._lists = None
+
+    def key_of(self, field: FlowField) -> int:
+        if field not in self._field_keys:
+            self._field_keys[field] = self._next_key
+            self.fields[self._next_key] = FieldTables(field)
+            self._next_key += 1
+        return self._field_keys[field]
+
+    def prune_fields(self):
+        """Forget flow fields no enemy follows any more."""
+        used = set(self.field_key[:self.n].tolist())
+        for field, key in list(self._field_keys.items()):
+            if key not in used:
+                del self._field_keys[field]
+                del self.fields[key]
+
+    def set_target(self, slot: int, field: FlowField, cell: int):
+        key = self.key_of(field)
+        self.field_key[slot] = key
+        self.target_cell[slot] = cell
+        self.target[slot] = self.coord[cell]
+        self.target_dist[slot] = self.fields[key].dist[cell]
+        dx, dy = self.pos[slot] - self.target[slot]
+        self.remaining[slot] = self.target_dist[slot] + np.sqrt(dx * dx + dy * dy)
+
+    def step(self):
+        """Move every enemy towards its target cell, advance the ones that
+        reached it and flag the ones that reached the port.
+        """
+        n = self.n
+        if n == 0:
+            return
+        pos = self.pos[:n]
+        self.prev_pos[:n] = pos
+        target = self.target[:n]
+        speed = self.speed[:n]
+
+        heading = target - pos
+        distance = np.sqrt(heading[:, 0] * heading[:, 0] +
+                           heading[:, 1] * heading[:, 1])
+        moving = distance > 0
+        heading[moving] /= distance[moving, None]  # length 1 vec
+        reached = np.flatnonzero(distance < speed)
+        if len(reached):
+            self._advance(reached)
+
+        pos += heading * speed[:, None]
+        dx = pos[:, 0] - target[:, 0]
+        dy = pos[:, 1] - target[:, 1]
+        self.remaining[:n] = self.target_dist[:n] + np.sqrt(dx * dx + dy * dy)
+        self._lists = None
+
+    def _advance(self, slots: np.ndarray):
+        cells = self.target_cell[slots]
+        keys = self.field_key[slots]
+        for key, tables in self.fields.items():
+            mine = keys == key
+            if not mine.any():
+                continue
+            next_cell = tables.next_cell[cells[mine]]
+            done = next_cell == UNREACHABLE
+            self.remove[slots[mine][done]] = True  # enemy reach dest
+            go = slots[mine][~done]
+            next_cell = next_cell[~done]
+            self.target_cell[go] = next_cell
+            self.target[go] = self.coord[next_cell]
+            self.target_dist[go] = tables.dist[next_cell]
+
+    def splash(self, centers: np.ndarray, ranges: np.ndarray,
+               damage: np.ndarray) -> Tuple[np.ndarray, List[int]]:
+        """Area attacks, one per row of centers: every enemy within
+        ranges[j] of centers[j] loses damage[j, kind] hp, attack after
+        attack. Return whether each attack hit anything and the slots of
+        the enemies it left with no hp.
+        """
+        n = self.n
+        d = self.pos[None, :n] - centers[:, None]
+        d *= d
+        hit = d[..., 0] + d[..., 1] <= ranges[:, None] * ranges[:, None]
+        dealt = damage[:, self.kind[:n]]
+        dealt *= hit
+        hp = self.hp[:n]
+        for row in dealt:  # in order, as separate attacks would
+            hp -= row
+        low = hp <= 0
+        defeated = np.flatnonzero(low & hit.any(axis=0)).tolist() \
+            if low.any() else []
+        return hit.any(axis=1), defeated
+
+    def lists(self) -> Tuple[List[float], List[float]]:
+        """x and y of every slot as Python lists, for per-enemy lookups
+        that would be slow on NumPy scalars.
+        """
+        if self._lists is None:
+            self._lists = (self.pos[:self.n, 0].tolist(),
+                           self.pos[:self.n, 1].tolist())
+        return self._lists
+
+    def lerp_lists(self, alpha: float) -> Tuple[List[float], List[float]]:
+        """x and y of every slot alpha of the way from the last step's
+        start to its end, for drawing between two ticks.
+        """
+        if alpha >= 1:
+            return self.lists()
+        n = self.n
+        pos = self.prev_pos[:n] + (self.pos[:n] - self.prev_pos[:n]) * alpha
+        return pos[:, 0].tolist(), pos[:, 1].tolist()
@@ -0,0 +1,148 @@
+"""Per-phase frame timing kept in ring buffers.
+
+The main loop marks the end of every phase of a frame (drawing, events,
+simulation, display update...). Each mark costs one clock read and one
+array store, and only the last FRAME_TIMING_SIZE frames are kept. The
+buffers can be drawn as an overlay or written to CSV or JSON lines.
+"""
+import json
+import time
+import numpy as np
+import pygame
+from array import array
+from config import FRAME_TIMING_SIZE
+from typing import Callable, Dict, List, Tuple
+
+
+class FrameTimer:
+    """
+    === Public Attributes ===
+    phases: names of the phases of a frame, in the order they run
+    size: number of frames kept
+    frames: number of frames recorded so far
+    """
+    phases: List[str]
+    size: int
+    frames: int
+
+    def __init__(self, phases: List[str], size=FRAME_TIMING_SIZE):
+        self.phases = list(phases)
+        self.size = size
+        self.frames = 0
+        self._index = {phase: i for i, phase in enumerate(self.phases)}
+        # one more row for the frame being recorded
+        self._rows = size + 1
+        self._times = array('d', bytes(8 * self._rows * len(self.phases)))
+        self._row = 0
+        self._last = time.perf_counter()
+        self._nested = 0.0
+
+    def mark(self, phase: str):
+        """phase ended now: record the time since the last mark, less the
+        time of wrapped calls made in between.
+        """
+        now = time.perf_counter()
+        self._add(phase, now - self._last - self._nested)
+        self._last = now
+        self._nested = 0.0
+
+    def wrap(self, phase: str, func: Callable) -> Callable:
+        """func, recording each call's time as phase."""
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = clock()
+            result = func(*args, **kwargs)
+            spent = clock() - start
+            self._add(phase, spent)
+            self._nested += spent
+            return result
+        return timed
+
+    def _add(self, phase: str, seconds: float):
+        self._times[self._row + self._index[phase]] += seconds
+
+    def end_frame(self):
+        """Start recording the next frame, overwriting the oldest one."""
+        self.frames += 1
+        n = len(self.phases)
+        self._row = self.frames % self._rows * n
+        self._times[self._row:self._row + n] = array('d', bytes(8 * n))
+
+    def recent(self) -> np.ndarray:
+        """Seconds spent in every phase, one row per kept frame, oldest
+        first. The frame being recorded is not included.
+        """
+        table = np.frombuffer(self._times, dtype=np.float64).reshape(
+            self._rows, len(self.phases))
+        count = min(self.frames, self.size)
+        end = self.frames % self._rows
+        order = np.arange(end - count, end) % self._rows
+        return table[order]
+
+    def rows(self) -> List[Dict[str, float]]:
+        first = self.frames - min(self.frames, self.size)
+        return [{'frame': first + i,
+                 **{phase: float(t) for phase, t in zip(self.phases, row)}}
+                for i, row in enumerate(self.recent())]
+
+    def dump(self, path: str):
+        """Write the kept frames, in ms, as CSV or, for a .jsonl path, as
+        one JSON object per frame.
+        """
+        rows = self.rows()
+        with open(path, 'w') as f:
+            if path.endswith('.jsonl'):
+                for row in rows:
+                    f.write(json.dumps(ms_row(row)) + '\n')
+            else:
+                f.write(','.join(['frame'] + self.phases) + '\n')
+                for row in rows:
+                    row = ms_row(row)
+                    f.write(','.join(str(row[key]) for key in
+                                     ['frame'] + self.phases) + '\n')
+
+
+def ms_row(row: Dict[str, float]) -> Dict[str, float]:
+    return {key: value if key == 'frame' else round(value * 1000, 4)
+            for key, value in row.items()}
+
+
+def draw_overlay(surface: pygame.Surface, timer: FrameTimer,
+                 topleft: Tuple[int, int], render: Callable,
+                 skip=('wait',), bins=25, bin_ms=2.0) -> pygame.Rect:
+    """Draw the mean time of every phase and a histogram of frame times
+    (all phases but skip) and return the rect drawn on. render(text, size,
+    fg, bg) makes text surfaces.
+    """
+    fg, bg, bar = (255, 255, 255), (20, 20, 20), (3, 192, 74)
+    width, line = 240, 14
+    times = timer.recent()
+    rect = pygame.Rect(topleft, (width, line * (len(timer.phases) + 1) + 70))
+    pygame.draw.rect(surface, bg, rect)
+    x, y = rect.x + 5, rect.y + 4
+    if len(times) == 0:
+        return rect
+
+    means = times.mean(axis=0) * 1000
+    for phase, mean in zip(timer.phases, means):
+        surface.blit(render(f'{phase}: {mean:.2f} ms', line - 1, fg, bg),
+                     (x, y))
+        y += line
+
+    work = [i for i, phase in enumerate(timer.phases) if phase not in skip]
+    frame_ms = times[:, work].sum(axis=1) * 1000
+    counts, _ = np.histogram(np.minimum(frame_ms, bins * bin_ms - 1e-9),
+                             bins=bins, range=(0, bins * bin_ms))
+    surface.blit(render(f'frame p50 {np.percentile(frame_ms, 50):.1f} '
+                        f'p99 {np.percentile(frame_ms, 99):.1f} ms, '
+                        f'{bin_ms:g} ms bins', line - 1, fg, bg), (x, y))
+    y += line + 50
+    bar_width = (width - 10) // bins
+    top = counts.max()
+    for i, count in enumerate(counts):
+        height = round(48 * count / top)
+        if height:
+            pygame.draw.rect(surface, bar, pygame.Rect(
+                x + i * bar_width, y - height, bar_width - 1, height))
+    return rect
@@ -0,0 +1,154 @@
+"""Run the game simulation without a window.
+
+Importing this module before config (or tower_defence) switches the game to
+headless mode, so Game only advances enemies, bullets, cool downs, merges and
+score, and never touches the display. Usage:
+
+    python headless.py --waves 10 --seed 1
+    python headless.py --replay game.json
+    python headless.py --autoplay --waves 200 --processes 4 --record soak.json
+    python headless.py --waves 80 --save wave80.sav
+    python headless.py --load wave80.sav --ticks 50000
+    TD_BOARD_SIZE=1024 python headless.py --autoplay --budget 2 --waves 20
+"""
+import os
+os.environ.setdefault('TD_HEADLESS', '1')
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import argparse
+import time
+from typing import Callable, Optional
+from config import BOARD_SIZE
+from tower_defence import Game
+from pathfinding import FIELD_CACHE
+from recording import InputLog, SKIP, apply_input, game_result
+from autoplay import AutoPlayer
+from savegame import load_game, save_game
+from tower_defence import AVAIL_TOWER_LST, random_towers
+
+
+def run_headless(game: Optional[Game] = None,
+                 max_ticks: Optional[int] = None,
+                 max_wave: Optional[int] = None,
+                 on_tick: Optional[Callable[[Game], None]] = None) -> Game:
+    """Tick game as fast as possible until it is over, max_ticks ticks have
+    run or wave max_wave is reached. on_tick is called before every tick,
+    e.g. to place towers.
+    """
+    if game is None:
+        game = Game()
+    while not game.is_over():
+        if max_ticks is not None and game.ticks >= max_ticks:
+            break
+        if max_wave is not None and game.enemy_wave >= max_wave:
+            break
+        if on_tick is not None:
+            on_tick(game)
+        game.tick()
+    return game
+
+
+def replay(log: InputLog) -> Game:
+    """Re-run a recorded game, applying every input on the tick it was
+    given, until the tick the recording ended on.
+    """
+    if log.board_size != BOARD_SIZE:
+        raise ValueError(f'recorded on a {log.board_size}x{log.board_size} '
+                         f'board, set TD_BOARD_SIZE={log.board_size} to '
+                         f'replay it')
+    inputs = iter(log.inputs)
+    pending = next(inputs, None)
+
+    def apply_due(game: Game):
+        nonlocal pending
+        while pending is not None and pending[0] <= game.ticks:
+            apply_input(game, *pending[1:])
+            pending = next(inputs, None)
+
+    game = run_headless(Game(log.seed), max_ticks=log.ticks,
+                        on_tick=apply_due)
+    apply_due(game)  # inputs given after the last tick
+    return game
+
+
+def autoplay(game: Game, bot: AutoPlayer, log: InputLog,
+             max_wave: Optional[int] = None, verbose=True) -> Game:
+    """Let bot place every offered tower while the countdown runs, then
+    skip it, until the game is over or wave max_wave is reached. Inputs
+    go through log so a soak run that fails can be replayed.
+    """
+    offers = random_towers(AVAIL_TOWER_LST, game.offer_rng)
+    wave, start = game.enemy_wave, time.perf_counter()
+
+    def decide(g: Game):
+        nonlocal offers, wave, start
+        while g.countdown > 0 and g.remaining_tower_to_place > 0:
+            if not bot.play(g, offers, log):
+                break
+            offers = random_towers(AVAIL_TOWER_LST, g.offer_rng)
+        if g.countdown > 0:
+            log.play(g, SKIP)
+        if verbose and g.enemy_wave != wave:
+            print(f'wave {g.enemy_wave}  score {round(g.score)}  '
+                  f'hp {g.port_hp}  towers {len(g.tower_list)}  '
+                  f'ticks {g.ticks}  {time.perf_counter() - start:.1f}s',
+                  flush=True)
+            wave, start = g.enemy_wave, time.perf_counter()
+
+    return run_headless(game, max_wave=max_wave, on_tick=decide)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a game without display.')
+    parser.add_argument('--ticks', type=int, default=None)
+    parser.add_argument('--waves', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--replay', metavar='FILE', default=None,
+                        help='re-run a game recorded by playTD.py --record')
+    parser.add_argument('--autoplay', action='store_true',
+                        help='let the placement bot play')
+    parser.add_argument('--budget', type=float, default=1.0,
+                        help='seconds the bot may think per tower')
+    parser.add_argument('--processes', type=int, default=0,
+                        help='worker processes of the bot')
+    parser.add_argument('--record', metavar='FILE', default=None,
+                        help='save the inputs of the bot to FILE')
+    parser.add_argument('--load', metavar='FILE', default=None,
+                        help='start from a game saved by --save')
+    parser.add_argument('--save', metavar='FILE', default=None,
+                        help='save the game to FILE when the run ends')
+    args = parser.parse_args()
+    if args.load is not None and (args.replay or args.record):
+        parser.error('--load cannot be used with --replay or --record, '
+                     'recordings start from a new game')
+
+    start = time.perf_counter()
+    first_tick = 0
+    if args.replay is not None:
+        log = InputLog.load(args.replay)
+        g = replay(log)
+    elif args.autoplay:
+        g = Game(args.seed) if args.load is None else load_game(args.load)
+        first_tick = g.ticks
+        log = InputLog(g.seed)
+        try:
+            autoplay(g, AutoPlayer(args.budget, processes=args.processes,
+                                   seed=g.seed), log, max_wave=args.waves)
+        finally:
+            log.finish(g)
+            if args.record is not None:
+                log.save(args.record)
+    else:
+        g = Game(args.seed) if args.load is None else load_game(args.load)
+        first_tick = g.ticks
+        g = run_headless(g, max_ticks=args.ticks, max_wave=args.waves)
+    elapsed = time.perf_counter() - start
+    print(f'seed: {g.seed}  wave: {g.enemy_wave}  score: {round(g.score)}  '
+          f'hp: {g.port_hp}  ticks: {g.ticks}')
+    if args.replay is not None:
+        same = game_result(g) == log.result
+        print(f'recorded: {log.result}  {"same" if same else "DIFFERENT"}')
+    if args.save is not None:
+        save_game(g, args.save)
+    print(f'{(g.ticks - first_tick) / elapsed:.0f} ticks/s')
+    print(f'flow field cache: {FIELD_CACHE}')
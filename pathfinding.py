@@ -0,0 +1,574 @@
+"""Path finding on the board.
+
+Cells are flat indices (row * size + col) into a passability mask, so the
+searches below work on a bytearray and a flat parent/distance array and
+never copy paths. bfs_path finds the same path as the forward BFS in
+tower_defence.enemy_path used to.
+
+The flow field is a BFS run backwards from the exit, so it knows for every
+cell how many steps are left to the exit and which cell to move to next. It
+is built once per board change; spawning or repathing an enemy is a lookup.
+Fields are cached by board occupancy, because placing and merging towers
+often brings back an occupancy seen before.
+
+Large boards (LARGE_BOARD_CELLS cells or more) keep their fields in
+array('i') and pick every next cell at once with NumPy. A field for a
+board that differs from the last one in a few cells is repaired instead
+of searched from scratch: only the cells whose distance went through a
+changed cell are searched again, so placing a tower stays interactive on
+1024x1024.
+
+The cut map lists the free cells where a tower would leave no path from
+the spawn to the exit, found by one depth-first search per board
+occupancy instead of a search per cell tried.
+"""
+from config import (BOARD_SIZE, CUT_MAP_CACHE_SIZE, FLOW_FIELD_CACHE_CELLS,
+                    FLOW_FIELD_CACHE_SIZE, LARGE_BOARD_CELLS)
+from board import Board
+from array import array
+from cache import LRUCache
+from collections import deque
+import heapq
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+UNREACHABLE = -1
+# cells that may change between a field and the one repaired from it
+REPAIR_MAX_CHANGES = 64
+
+
+class FlowField:
+    """
+    === Public Attributes ===
+    size: number of rows (and columns) of the board
+    exit: flat index (row * size + col) of the exit cell
+    dist: steps from each free cell to the exit, UNREACHABLE if there is
+    no path or the cell is blocked
+    next_cell: flat index of the cell to move to from each cell,
+    UNREACHABLE on the exit or if there is no path
+    occupancy: Board.occupancy of the board the field was built for
+    """
+    size: int
+    exit: int
+    dist: Sequence[int]
+    next_cell: Sequence[int]
+    occupancy: int
+
+    def __init__(self, board: Board, base: Optional['FlowField'] = None):
+        """Field of board. On a large board, base (a field of a board of
+        the same size) is repaired rather than searching from scratch if
+        the boards differ in a few cells.
+        """
+        size = board.size
+        self.size = size
+        self.occupancy = board.occupancy
+        self.exit = size * size - 1
+        passable = board.passable()
+        if size * size < LARGE_BOARD_CELLS:
+            self.dist = reverse_bfs(passable, self.exit, size)
+            self.next_cell = next_steps(self.dist, self.exit, size)
+        elif base is None or base.size != size or \
+                not self._repair(base, passable):
+            self.dist = array('i', reverse_bfs(passable, self.exit, size))
+            self.next_cell = next_steps_np(self.dist, self.exit, size)
+
+    def _repair(self, base: 'FlowField', passable: bytearray) -> bool:
+        changed = set_bits(base.occupancy ^ self.occupancy,
+                           REPAIR_MAX_CHANGES)
+        if changed is None:
+            return False
+        dist = base.dist[:]
+        cells = repair_dist(dist, passable, changed, self.size,
+                            len(dist) // 32)
+        if cells is None:
+            return False
+        self.dist = dist
+        self.next_cell = base.next_cell[:]
+        refresh_next_steps(self.next_cell, dist, cells.union(changed),
+                           self.exit, self.size)
+        return True
+
+    def index(self, row: int, col: int) -> int:
+        return row * self.size + col
+
+    def cell(self, i: int) -> Tuple[int, int]:
+        return divmod(i, self.size)
+
+    def steps(self, i: int) -> int:
+        """Steps from cell i to the exit. A blocked cell (e.g. a tower just
+        placed under an enemy) is left through its best neighbour.
+        """
+        if self.dist[i] != UNREACHABLE or i == self.exit:
+            return self.dist[i]
+        nxt = self.next_cell[i]
+        if nxt == UNREACHABLE:
+            return UNREACHABLE
+        return self.dist[nxt] + 1
+
+    def reachable(self, pos: Tuple[int, int]) -> bool:
+        return self.steps(self.index(pos[0], pos[1])) != UNREACHABLE
+
+    def path_from(self, pos=(0, 0)) -> List[Tuple[int, int]]:
+        """Same path enemy_path(board, pos) finds, read off the field."""
+        i = self.index(pos[0], pos[1])
+        if self.steps(i) == UNREACHABLE:
+            return []
+        path = [pos]
+        while i != self.exit:
+            i = self.next_cell[i]
+            path.append(self.cell(i))
+        return path
+
+
+FIELD_CACHE = LRUCache(max(2, min(FLOW_FIELD_CACHE_SIZE,
+                                  FLOW_FIELD_CACHE_CELLS //
+                                  (BOARD_SIZE * BOARD_SIZE))))
+
+
+def flow_field(board: Board, base: Optional[FlowField] = None
+               ) -> FlowField:
+    """Flow field of board, from FIELD_CACHE if its occupancy was seen
+    recently, else built from base if given (see FlowField).
+    """
+    key = (board.size, board.occupancy)
+    field = FIELD_CACHE.get(key)
+    if field is None:
+        field = FlowField(board, base)
+        FIELD_CACHE.put(key, field)
+    return field
+
+
+class CutMap:
+    """Free cells where a tower would leave no path from the spawn (the
+    first cell) to the exit (the last one).
+
+    One depth-first search from the spawn over the free cells, as for
+    articulation points: disc numbers the cells in the order the search
+    reaches them, and low is the smallest number a cell's subtree reaches
+    through one edge out of it. A cell c on the search tree path to the
+    exit cuts the exit off iff the next cell w on that path has
+    low[w] >= disc[c], i.e. nothing under w gets around c.
+
+    A tower that merges on c clears other towers, which may join the two
+    sides again. The side of c every free neighbour of a cleared cell is
+    on follows from the search numbers, so this is checked without
+    searching the board again.
+
+    === Public Attributes ===
+    size: number of rows (and columns) of the board
+    occupancy: Board.occupancy of the board the map was built for
+    connected: whether the exit can be reached from the spawn at all
+    cuts: flat index of every free cell that cuts the exit off, with the
+        children of the cell in the search tree that only reach the spawn
+        through it, the one on the path to the exit first
+    """
+    size: int
+    occupancy: int
+    connected: bool
+    cuts: Dict[int, List[int]]
+    _pockets: Dict[int, int]
+
+    def __init__(self, board: Board):
+        size = board.size
+        n = size * size
+        passable = board.passable()
+        self.size = size
+        self.occupancy = board.occupancy
+        self._passable = passable
+        self._pockets = {}  # label of the free cells the search missed
+        disc = array('i', [UNREACHABLE]) * n
+        low = array('i', [0]) * n
+        end = array('i', [0]) * n  # disc of the first cell after a subtree
+        parent = array('i', [UNREACHABLE]) * n
+        tried = bytearray(n)  # neighbours of each cell tried so far
+        last_col = size - 1
+        disc[0] = 0
+        count = 1
+        stack = [0]
+        while stack:
+            i = stack[-1]
+            d = tried[i]
+            j = UNREACHABLE
+            # next neighbour not reached yet, right, down, left then up
+            while d < 4:
+                if d == 0:
+                    j = i + 1 if i % size != last_col else UNREACHABLE
+                elif d == 1:
+                    j = i + size if i + size < n else UNREACHABLE
+                elif d == 2:
+                    j = i - 1 if i % size else UNREACHABLE
+                else:
+                    j = i - size
+                d += 1
+                if j >= 0 and passable[j]:
+                    if disc[j] == UNREACHABLE:
+                        break
+                    if disc[j] < low[i] and j != parent[i]:
+                        low[i] = disc[j]
+                j = UNREACHABLE
+            tried[i] = d
+            if j != UNREACHABLE:
+                disc[j] = low[j] = count
+                count += 1
+                parent[j] = i
+                stack.append(j)
+                continue
+            stack.pop()
+            end[i] = count
+            p = parent[i]
+            if p != UNREACHABLE and low[i] < low[p]:
+                low[p] = low[i]
+        self._disc = disc
+        self._end = end
+
+        exit_ = n - 1
+        self.connected = disc[exit_] != UNREACHABLE
+        self.cuts = {}
+        if not self.connected:
+            return
+        w = exit_
+        c = parent[w]
+        while c != 0:
+            if low[w] >= disc[c]:
+                self.cuts[c] = [w] + [
+                    j for j in neighbours(c, size)
+                    if j != w and parent[j] == c and low[j] >= disc[c]]
+            w = c
+            c = parent[c]
+
+    def blocks(self, board: Board, pos: Tuple[int, int], kind: int,
+               level: int) -> bool:
+        """Whether a tower of kind and level placed on free cell pos of
+        board, whose occupancy the map was built for, would leave no path
+        from the spawn to the exit once it merged.
+        """
+        i = pos[0] * self.size + pos[1]
+        sides = self.cuts.get(i)
+        if sides is None:
+            return False
+        plan = board.merge_plan(pos, kind, level)
+        return not plan or not self._rejoined(
+            i, sides, [j for pair in plan for j in pair])
+
+    def blocking(self, board: Board, kind: int,
+                 level: int) -> Set[Tuple[int, int]]:
+        """Every free cell where blocks is True."""
+        size = self.size
+        cells = set()
+        for i in self.cuts:
+            pos = divmod(i, size)
+            if self.blocks(board, pos, kind, level):
+                cells.add(pos)
+        return cells
+
+    def _rejoined(self, c: int, sides: List[int],
+                  cleared: List[int]) -> bool:
+        """Whether freeing the cleared cells, with a tower on cut c, joins
+        the exit's side of c to the spawn's again.
+        """
+        joined = {}  # union find over cleared cells and side labels
+
+        def find(x: int) -> int:
+            while x in joined:
+                x = joined[x]
+            return x
+
+        for f in cleared:
+            for j in neighbours(f, self.size):
+                if j == c:
+                    continue
+                if j in cleared:
+                    other = j
+                elif self._passable[j]:
+                    other = self._side(j, sides)
+                else:
+                    continue
+                a, b = find(f), find(other)
+                if a != b:
+                    joined[a] = b
+        return find(0) == find(sides[0])
+
+    def _side(self, i: int, sides: List[int]) -> int:
+        """Label of the part free cell i is in once a tower is on the cut
+        whose sides are given: the side's first cell, 0 for the spawn's,
+        or a negative pocket number for cells the search did not reach.
+        """
+        d = self._disc[i]
+        if d == UNREACHABLE:
+            return self._pocket(i)
+        for w in sides:
+            if self._disc[w] <= d < self._end[w]:
+                return w
+        return 0
+
+    def _pocket(self, i: int) -> int:
+        if i not in self._pockets:
+            label = -2 - i
+            size = self.size
+            passable = self._passable
+            pockets = self._pockets
+            pockets[i] = label
+            queue = deque([i])
+            while queue:
+                for j in neighbours(queue.popleft(), size):
+                    if passable[j] and j not in pockets:
+                        pockets[j] = label
+                        queue.append(j)
+        return self._pockets[i]
+
+
+CUT_MAP_CACHE = LRUCache(max(2, min(CUT_MAP_CACHE_SIZE,
+                                    FLOW_FIELD_CACHE_CELLS //
+                                    (BOARD_SIZE * BOARD_SIZE))))
+
+
+def cut_map(board: Board) -> CutMap:
+    """Cut map of board, from CUT_MAP_CACHE if its occupancy was seen
+    recently.
+    """
+    key = (board.size, board.occupancy)
+    cuts = CUT_MAP_CACHE.get(key)
+    if cuts is None:
+        cuts = CutMap(board)
+        CUT_MAP_CACHE.put(key, cuts)
+    return cuts
+
+
+def bfs_path(passable: bytearray, start: int,
+             size=BOARD_SIZE, visited: Optional[Set[int]] = None
+             ) -> List[Tuple[int, int]]:
+    """Shortest path of (row, col) cells from flat index start to the exit,
+    [] if there is none. Neighbours are tried right, down, left, up, so the
+    path is the same one enemy_path always found.
+    """
+    exit_ = size * size - 1
+    if start == exit_:
+        return [divmod(start, size)]
+    last_col = size - 1
+    parent = array('l', [UNREACHABLE]) * (size * size)
+    if visited is not None:
+        for i in visited:
+            parent[i] = i
+    parent[start] = start
+    queue = deque()
+    push = queue.append
+    pop = queue.popleft
+    i = start
+    while True:
+        col = i % size
+        j = i + 1
+        if col < last_col and passable[j] and parent[j] == UNREACHABLE:
+            parent[j] = i
+            if j == exit_:
+                break
+            push(j)
+        j = i + size
+        if j <= exit_ and passable[j] and parent[j] == UNREACHABLE:
+            parent[j] = i
+            if j == exit_:
+                break
+            push(j)
+        j = i - 1
+        if col > 0 and passable[j] and parent[j] == UNREACHABLE:
+            parent[j] = i
+            push(j)
+        j = i - size
+        if j >= 0 and passable[j] and parent[j] == UNREACHABLE:
+            parent[j] = i
+            push(j)
+        if not queue:
+            return []
+        i = pop()
+
+    path = [divmod(exit_, size)]
+    i = exit_
+    while i != start:
+        i = parent[i]
+        path.append(divmod(i, size))
+    path.reverse()
+    return path
+
+
+def reverse_bfs(passable: bytearray, exit_: int, size: int) -> List[int]:
+    """Steps from every free cell to exit_, UNREACHABLE if none."""
+    last_col = size - 1
+    dist = [UNREACHABLE] * (size * size)
+    dist[exit_] = 0
+    queue = deque([exit_])
+    push = queue.append
+    pop = queue.popleft
+    while queue:
+        i = pop()
+        d = dist[i] + 1
+        col = i % size
+        j = i + 1
+        if col < last_col and passable[j] and dist[j] == UNREACHABLE:
+            dist[j] = d
+            push(j)
+        j = i + size
+        if j <= exit_ and passable[j] and dist[j] == UNREACHABLE:
+            dist[j] = d
+            push(j)
+        j = i - 1
+        if col > 0 and passable[j] and dist[j] == UNREACHABLE:
+            dist[j] = d
+            push(j)
+        j = i - size
+        if j >= 0 and passable[j] and dist[j] == UNREACHABLE:
+            dist[j] = d
+            push(j)
+    return dist
+
+
+def next_steps(dist: List[int], exit_: int, size: int) -> List[int]:
+    """Next cell for every cell: the closest neighbour to the exit, ties
+    broken right, down, left, up like next_move_extensions, so following
+    the field gives the same path as the forward BFS.
+    """
+    next_cell = [UNREACHABLE] * (size * size)
+    for i in range(size * size):
+        if i != exit_:
+            next_cell[i] = next_step(dist, i, size)
+    return next_cell
+
+
+def next_step(dist: Sequence[int], i: int, size: int) -> int:
+    """Closest neighbour of cell i to the exit, see next_steps."""
+    row, col = divmod(i, size)
+    best = UNREACHABLE
+    for ok, j in ((col < size - 1, i + 1), (row < size - 1, i + size),
+                  (col > 0, i - 1), (row > 0, i - size)):
+        if ok and dist[j] != UNREACHABLE and \
+                (best == UNREACHABLE or dist[j] < dist[best]):
+            best = j
+    return best
+
+
+def neighbours(i: int, size: int) -> List[int]:
+    row, col = divmod(i, size)
+    cells = []
+    if col < size - 1:
+        cells.append(i + 1)
+    if row < size - 1:
+        cells.append(i + size)
+    if col > 0:
+        cells.append(i - 1)
+    if row > 0:
+        cells.append(i - size)
+    return cells
+
+
+def set_bits(x: int, limit: int) -> Optional[List[int]]:
+    """Indices of the bits set in x, None if there are more than limit."""
+    bits = []
+    while x:
+        if len(bits) == limit:
+            return None
+        low = x & -x
+        bits.append(low.bit_length() - 1)
+        x ^= low
+    return bits
+
+
+def _to_array(values: np.ndarray) -> array:
+    result = array('i')
+    result.frombytes(values.astype(np.int32).tobytes())
+    return result
+
+
+def _padded(values: np.ndarray, size: int, fill) -> np.ndarray:
+    """values of a size x size board with a border of fill around it,
+    flattened, so neighbours are i + 1, i + size + 2, i - 1 and
+    i - size - 2 without bound checks.
+    """
+    grid = np.full((size + 2, size + 2), fill, dtype=values.dtype)
+    grid[1:-1, 1:-1] = values.reshape(size, size)
+    return grid.ravel()
+
+
+def next_steps_np(dist: Sequence[int], exit_: int, size: int) -> array:
+    """next_steps comparing all cells with one neighbour at a time."""
+    width = size + 2
+    far = np.int32(size * size)
+    flat = np.frombuffer(dist, dtype=np.int32) if isinstance(dist, array) \
+        else np.array(dist, dtype=np.int32)
+    padded = _padded(np.where(flat == UNREACHABLE, far, flat), size, far)
+    inner = ((np.arange(size) + 1)[:, None] * width +
+             np.arange(1, size + 1)).ravel()
+    # right, down, left, up: argmin keeps the first of equal neighbours
+    steps = np.array([1, size, -1, -size])
+    around = np.stack([padded[inner + 1], padded[inner + width],
+                       padded[inner - 1], padded[inner - width]])
+    best = around.argmin(axis=0)
+    next_cell = np.arange(size * size) + steps[best]
+    next_cell[around[best, np.arange(size * size)] == far] = UNREACHABLE
+    next_cell[exit_] = UNREACHABLE
+    return _to_array(next_cell)
+
+
+def repair_dist(dist: array, passable: bytearray, changed: List[int],
+                size: int, limit: int) -> Optional[Set[int]]:
+    """Update dist in place for a board on which the cells in changed were
+    blocked or freed. Only cells whose shortest path went through a newly
+    blocked cell, and cells a freed cell brings closer, are searched
+    again. Return the cells whose distance changed, or None, leaving dist
+    half updated, once more than limit cells would be searched.
+    """
+    # cells left with no neighbour one step closer to the exit, in order
+    # of distance so that every closer cell is settled first
+    lost = set()
+    heap = []
+    for i in changed:
+        if not passable[i] and dist[i] != UNREACHABLE:
+            lost.add(i)
+            for j in neighbours(i, size):
+                if dist[j] == dist[i] + 1:
+                    heapq.heappush(heap, (dist[j], j))
+    while heap:
+        d, i = heapq.heappop(heap)
+        if i in lost:
+            continue
+        if any(dist[j] == d - 1 and j not in lost
+               for j in neighbours(i, size)):
+            continue
+        lost.add(i)
+        if len(lost) > limit:
+            return None
+        for j in neighbours(i, size):
+            if dist[j] == d + 1:
+                heapq.heappush(heap, (d + 1, j))
+
+    # search again from the cells around the lost and freed ones
+    for i in lost:
+        dist[i] = UNREACHABLE
+    heap = []
+    for i in list(lost) + changed:
+        if passable[i]:
+            around = [dist[j] for j in neighbours(i, size)
+                      if dist[j] != UNREACHABLE]
+            if around:
+                heapq.heappush(heap, (min(around) + 1, i))
+    updated = set(lost)
+    while heap:
+        d, i = heapq.heappop(heap)
+        if dist[i] != UNREACHABLE and dist[i] <= d:
+            continue
+        dist[i] = d
+        updated.add(i)
+        if len(updated) > limit:
+            return None
+        for j in neighbours(i, size):
+            if passable[j] and (dist[j] == UNREACHABLE or dist[j] > d + 1):
+                heapq.heappush(heap, (d + 1, j))
+    return updated
+
+
+def refresh_next_steps(next_cell: array, dist: Sequence[int],
+                       cells: Set[int], exit_: int, size: int):
+    """Recompute next_cell around cells, whose distance changed."""
+    todo = set(cells)
+    for i in cells:
+        todo.update(neighbours(i, size))
+    todo.discard(exit_)
+    for i in todo:
+        next_cell[i] = next_step(dist, i, size)
@@ -1,355 +1,504 @@
-import pygame
-import pygame.gfxdraw
-from config import *
-from tower_defence import *
-from pygame.locals import (MOUSEBUTTONDOWN,
-                           QUIT)
-from typing import List, Tuple, Optional
-import random
-
-
-# don't change, haven't updated yet
-DEVELOPER_MODE = 0  # if developer_mode is 1, all towers spawns are snipers
-
-
-def gen_text_window(text, font_size, centered_pos, font_color, bg_color):
-    font = pygame.font.SysFont('calibri', font_size)
-    text = font.render(text, True, font_color, bg_color)
-    textrect = text.get_rect()
-    textrect.center = centered_pos
-    screen.blit(text, textrect)
-
-
-def gen_text_window_left_align(text, font_size, topleft, font_color, bg_color,
-                               textrect_info_only=False):
-    font = pygame.font.SysFont('calibri', font_size)
-    text = font.render(text, True, font_color, bg_color)
-    textrect = text.get_rect()
-    if textrect_info_only:
-        return textrect.width, textrect.height
-    textrect.topleft = topleft
-    screen.blit(text, textrect)
-
-
-def tower_options(lst, num_tower=AVAIL_SLOTS_NUM) -> List[Tower]:
-    if DEVELOPER_MODE == 1:
-        s1 = Sniper()
-        s2 = Sniper()
-        s3 = Sniper()
-        s2.upgrade_tower()
-        s3.upgrade_tower()
-        s3.upgrade_tower()
-        return [s1, s2, s3][:num_tower]
-
-    r_lst = []  # return lst
-    lst_copy = lst[:]
-    len_ = len(lst) - 1
-    for t in range(num_tower):
-        index_ = random.randint(0, len_)
-        tower = lst_copy.pop(index_)()  # Tower obj
-        r_lst.append(tower)
-        len_ -= 1
-
-    return r_lst
-
-
-def render_board(lst: List[List[Optional[Tower]]],
-                 pos: Tuple[int, int]):
-    for y in range(BOARD_SIZE):
-        for x in range(BOARD_SIZE):
-            bg_color = get_tower_color(lst[y][x])
-            pygame.draw.rect(screen, bg_color,
-                             pygame.Rect(margin + grid_size * x,
-                                         margin + grid_size * y,
-                                         grid_size - margin,
-                                         grid_size - margin))
-            if lst[y][x] is not None:
-                center = (margin + grid_size * x + (grid_size - margin) // 2,
-                          margin + grid_size * y + (grid_size - margin) // 2)
-                gen_text_window(str(lst[y][x]), tower_font_size,
-                                center, black, bg_color)
-
-    if pos is not None:
-        x, y = pos[1], pos[0]
-        bg_color = get_tower_color(lst[y][x])
-        pygame.draw.rect(screen, lighter_green,
-                         pygame.Rect(grid_size * x,
-                                     grid_size * y,
-                                     grid_size + margin,
-                                     grid_size + margin))
-        pygame.draw.rect(screen, bg_color,
-                         pygame.Rect(margin + grid_size * x,
-                                     margin + grid_size * y,
-                                     grid_size - margin,
-                                     grid_size - margin))
-
-        if lst[y][x] is not None:
-            center = (margin + grid_size * x + (grid_size - margin) // 2,
-                      margin + grid_size * y + (grid_size - margin) // 2)
-            tower = lst[y][x]
-            gen_text_window(str(tower), tower_font_size,
-                            center, black, bg_color)
-            pygame.gfxdraw.aacircle(screen, center[0], center[1],
-                                    tower.atk_range, ATK_RANGE_COLOR)
-            # pygame.gfxdraw.aacircle(screen, center[0], center[1],
-            #                         tower.atk_range - 1, ATK_RANGE_COLOR)
-
-
-def get_grid(pos):
-    """Get pos on lst from mouse position.
-    """
-    x, y = pos[0], pos[1]
-    row, col = y // grid_size, x // grid_size  # row and col in lst
-    # print(row, col)
-
-    return row, col
-
-
-def within_square(pos: Tuple[int, int], pos_rect: Tuple[int, int],
-                  width: int, height: int) -> bool:
-    x, y = pos[0], pos[1]
-    rect_x, rect_y = pos_rect[0], pos_rect[1]
-    return (rect_x <= x <= rect_x + width) and (rect_y <= y <= rect_y + height)
-
-
-slots_sep = 20
-slots_distance = int((WIDTH - HEIGHT - slots_sep) // 3)
-slot_width = slots_distance - slots_sep
-slot_height = slot_width
-slots_init_x = HEIGHT + slots_sep
-slots_y = HEIGHT - slots_sep - 5 - slot_height
-
-slot1_pos = (slots_init_x, slots_y)
-slot2_pos = (slots_init_x + slots_distance, slots_y)
-slot3_pos = (slots_init_x + slots_distance * 2, slots_y)
-slots_lst = [slot1_pos, slot2_pos, slot3_pos]
-
-
-def display_slots(tower_slot_lst):
-    for i in range(AVAIL_SLOTS_NUM):
-        curr_slot = slots_lst[i]
-        tower = tower_slot_lst[i]
-        bg_color = get_tower_color(tower)
-        pygame.draw.rect(screen, bg_color,
-                         pygame.Rect(curr_slot[0],
-                                     curr_slot[1],
-                                     slot_width,
-                                     slot_height))
-        center = (curr_slot[0] + slot_width // 2,
-                  curr_slot[1] + slot_height // 2)
-        gen_text_window(str(tower), slot_font_size,
-                        center, black, bg_color)
-
-
-def display_enemy_path(path_lst: List[Tuple[int, int]]):
-    for pos in path_lst:
-        x, y = pos[1], pos[0]
-        center = (margin + grid_size * x + (grid_size - margin) // 2,
-                  margin + grid_size * y + (grid_size - margin) // 2)
-        gen_text_window('.', path_dot_size,
-                        center, light_grey, white)
-
-
-def select_slot(tower_lst: List[Tower], pos_on_lst, pos) -> Optional[Tower]:
-    if pos_on_lst is None:
-        return None
-    # pos_on_lst is not None
-    for i in range(AVAIL_SLOTS_NUM):
-        if within_square(pos, slots_lst[i], slot_width, slot_height):
-            return tower_lst[i]
-
-
-def display_game_text(g: Game):
-    wave_loc = (HEIGHT + 10, 10)
-    score_loc = (HEIGHT + 10, 70)
-    multiplier_loc = (HEIGHT + 10, 100)
-    hp_loc = (HEIGHT + 10, 130)
-
-    remaining_tower_num_loc = (HEIGHT + 10, slots_y - 35)
-
-    gen_text_window_left_align(f'Wave {g.enemy_wave}', 30, wave_loc,
-                               white, (0, 75, 100))
-    gen_text_window_left_align(f'Score: {round(g.score)}', 30, score_loc,
-                               white, (0, 75, 100))
-    gen_text_window_left_align(f'Multiplier: {round(g.score_multiplier, 2)}',
-                               18, multiplier_loc, white, (0, 75, 100))
-    gen_text_window_left_align(f'HP: {g.port_hp}', 30, hp_loc,
-                               lighter_green, (0, 75, 100))
-    gen_text_window_left_align(f'{g.remaining_tower_to_place} '
-                               f'towers can be placed', 22,
-                               remaining_tower_num_loc,
-                               white, (0, 75, 100))
-
-    wave_info_x, wave_info_y = HEIGHT + 10, 310
-    gen_text_window_left_align(f'Next wave:', 30, (wave_info_x, wave_info_y),
-                               white, (0, 75, 100))
-    wave_info_y += 30
-    for i in g.wave_info:
-        if g.wave_info[i] != 0:
-            gen_text_window_left_align(f'{str(i)}: {g.wave_info[i]}', 20,
-                                       (wave_info_x, wave_info_y),
-                                       white, (0, 75, 100))
-            wave_info_y += 20
-
-
-def display_tower_info(t: Tower):
-    name_loc = (HEIGHT + 10, 175)
-    gen_text_window_left_align(f'{str(t)}', 30, name_loc,
-                               white, (0, 75, 100))
-
-    tw_atk_loc = (HEIGHT + 10, 210)
-    tw_range_loc = (HEIGHT + 10, 232)
-    tw_int_loc = (HEIGHT + 10, 254)
-    gen_text_window_left_align(f'ATK: {t.atk}', 20, tw_atk_loc,
-                               white, (0, 75, 100))
-    gen_text_window_left_align(f'range: {t.atk_range}', 20, tw_range_loc,
-                               white, (0, 75, 100))
-    gen_text_window_left_align(f'interval: {t.atk_interval}s', 20, tw_int_loc,
-                               white, (0, 75, 100))
-
-
-def display_game_over():
-    gen_text_window(f'You Lose', 120, (HEIGHT // 2, HEIGHT // 2),
-                    white, black)
-
-
-def check_click_go_next_wave(pos, topleft, size, count: int) -> int:
-    if count > 0:
-        width = size[0]
-        height = size[1]
-        left = topleft[0]
-        top = topleft[1]
-        x = pos[0]
-        y = pos[1]
-        if left <= x <= left + width and top < y < top + height:
-            return 0
-
-    return count
-
-
-g = Game()
-g.gen_random_enemies()  # generate for the first wave
-# text, position
-pygame.init()
-
-pygame.display.set_caption('千万记住三消位置在最后！！！')
-programIcon = pygame.image.load('leafy-green_32x32.png')
-pygame.display.set_icon(programIcon)
-
-skip_font_size = 25
-skip_waiting_topleft = (HEIGHT + 120, 35)
-skip_waiting_size = gen_text_window_left_align('Go!', skip_font_size,
-                                               skip_waiting_topleft,
-                                               white, green,
-                                               textrect_info_only=True)
-
-screen.fill((0, 75, 100))
-tower_in_slot = tower_options(AVAIL_TOWER_LST)
-
-running = True
-pos_selected = None
-wave_wait_time = 1000
-spawn = False
-game_over = False
-next_level = 1
-counter = FIRST_WAVE_DELAY // 1000
-
-SPAWN_ENEMY = pygame.USEREVENT + 1
-NEXT_WAVE = pygame.USEREVENT + 2
-pygame.time.set_timer(SPAWN_ENEMY, ENEMY_SPAWN_INTERVAL)
-pygame.time.set_timer(NEXT_WAVE, wave_wait_time)
-
-while running:
-    screen.fill((0, 75, 100))
-    render_board(g.board, pos_selected)  # render the game board
-    display_slots(tower_in_slot)  # display towers on the slots on the right
-    display_enemy_path(g.path)  # display enemy path
-
-    g.update_enemy_pygame()
-    g.update_all_towers()
-    g.display_aim_line_pygame()
-    display_game_text(g)
-
-    for event in pygame.event.get():
-
-        if event.type == NEXT_WAVE:
-            print(f'count_down: {counter}')
-            if counter == 0:
-                wave_wait_time = 0
-                spawn = True
-                next_level += 1
-            else:
-                counter -= 1
-                spawn = False
-
-        if event.type == SPAWN_ENEMY:
-            if spawn:
-                # print(1)
-                if not g.spawn_time_based():
-                    spawn = False
-                next_level = g.enemy_wave + 1
-
-        if event.type == MOUSEBUTTONDOWN:
-            pos = pygame.mouse.get_pos()
-            counter = check_click_go_next_wave(pos,
-                                               skip_waiting_topleft,
-                                               skip_waiting_size,
-                                               counter)
-            if pos[0] < HEIGHT - margin:  # guarantee x in g.board
-                # x <= BOARD_SIZE * grid_size - margin - 1
-                temp = get_grid(pos)
-                # select twice ==> deselect
-                if pos_selected == temp:
-                    pos_selected = None
-                # otherwise select
-                else:
-                    pos_selected = temp
-
-            # select tower on slots, if none, return None
-            # if no grid selected on the board, return None
-            tower = select_slot(tower_in_slot, pos_selected, pos)
-            if tower:
-                if g.place_tower(tower, pos_selected):
-                    g.game_update_enemy_path()
-                    tower_in_slot = tower_options(AVAIL_TOWER_LST)
-            print(pos_selected)
-
-        if event.type == QUIT:
-            running = False
-    # show tower info if tower on the grid
-    if pos_selected is not None:
-        tw = g.board[pos_selected[0]][pos_selected[1]]
-        if isinstance(tw, Tower):
-            display_tower_info(tw)
-
-    if g.port_hp <= 0:
-        game_over = True
-        running = False
-
-    if len(g.enemy_list) == 0 and not spawn:
-        if next_level != g.enemy_wave:
-            wave_wait_time = 1000
-            counter = WAVE_DELAY // 1000
-            g.next_wave()
-
-    # Wave text
-    if counter > 0:
-        gen_text_window_left_align(f'Next in: {counter}s', 20,
-                                   (HEIGHT + 10, 40),
-                                   white, (0, 75, 100))
-        gen_text_window_left_align('Go!', skip_font_size,
-                                   skip_waiting_topleft,
-                                   white, indigo)
-
-    fps = round(1000 / fpsClock.tick(FPS))
-    gen_text_window_left_align(f'fps: {fps}', 30, (HEIGHT + 185, 10),
-                               white, (0, 75, 100))
-    pygame.display.update()
-
-
-while game_over:
-    display_game_over()
-    fpsClock.tick(5)
-    pygame.display.update()
-
-pygame.quit()
+import pygame
+import pygame.gfxdraw
+from config import *
+from tower_defence import *
+from pathfinding import FIELD_CACHE
+from text_render import TextRenderer
+from recording import InputLog, PLACE, SKIP
+from frame_timing import FrameTimer, draw_overlay
+from autoplay import AutoPlayer
+from sim_clock import SimClock
+from camera import Camera
+from pygame.locals import (KEYDOWN, K_1, K_2, K_4, K_8, K_DOWN, K_END,
+                           K_F3, K_F4, K_HOME, K_LEFT, K_RIGHT, K_TAB, K_UP,
+                           MOUSEBUTTONDOWN, QUIT)
+from typing import List, Tuple, Optional
+import argparse
+import random
+
+
+# don't change, haven't updated yet
+DEVELOPER_MODE = 0  # if developer_mode is 1, all towers spawns are snipers
+
+
+text_renderer = TextRenderer('calibri')
+
+
+def gen_text_window(text, font_size, centered_pos, font_color, bg_color,
+                    surface=screen):
+    text = text_renderer.render(text, font_size, font_color, bg_color)
+    textrect = text.get_rect()
+    textrect.center = centered_pos
+    surface.blit(text, textrect)
+
+
+def gen_text_window_left_align(text, font_size, topleft, font_color, bg_color,
+                               textrect_info_only=False):
+    text = text_renderer.render(text, font_size, font_color, bg_color)
+    textrect = text.get_rect()
+    if textrect_info_only:
+        return textrect.width, textrect.height
+    textrect.topleft = topleft
+    screen.blit(text, textrect)
+
+
+def tower_options(lst, rng: random.Random,
+                  num_tower=AVAIL_SLOTS_NUM) -> List[Tower]:
+    if DEVELOPER_MODE == 1:
+        s1 = Sniper()
+        s2 = Sniper()
+        s3 = Sniper()
+        s2.upgrade_tower()
+        s3.upgrade_tower()
+        s3.upgrade_tower()
+        return [s1, s2, s3][:num_tower]
+
+    return random_towers(lst, rng, num_tower)
+
+
+def render_board(board: Board, pos: Tuple[int, int], camera: Camera,
+                 surface=screen):
+    """Draw the cells of board in view of camera."""
+    ox, oy = camera.offset
+    rows, cols = camera.visible()
+    for y in rows:
+        for x in cols:
+            tower = board.get((y, x))
+            bg_color = get_tower_color(tower)
+            pygame.draw.rect(surface, bg_color,
+                             pygame.Rect(ox + margin + grid_size * x,
+                                         oy + margin + grid_size * y,
+                                         grid_size - margin,
+                                         grid_size - margin))
+            if tower is not None:
+                center = (ox + margin + grid_size * x +
+                          (grid_size - margin) // 2,
+                          oy + margin + grid_size * y +
+                          (grid_size - margin) // 2)
+                gen_text_window(str(tower), tower_font_size,
+                                center, black, bg_color, surface)
+
+    if pos is not None:
+        x, y = pos[1], pos[0]
+        tower = board.get(pos)
+        bg_color = get_tower_color(tower)
+        pygame.draw.rect(surface, lighter_green,
+                         pygame.Rect(ox + grid_size * x,
+                                     oy + grid_size * y,
+                                     grid_size + margin,
+                                     grid_size + margin))
+        pygame.draw.rect(surface, bg_color,
+                         pygame.Rect(ox + margin + grid_size * x,
+                                     oy + margin + grid_size * y,
+                                     grid_size - margin,
+                                     grid_size - margin))
+
+        if tower is not None:
+            center = (ox + margin + grid_size * x + (grid_size - margin) // 2,
+                      oy + margin + grid_size * y + (grid_size - margin) // 2)
+            gen_text_window(str(tower), tower_font_size,
+                            center, black, bg_color, surface)
+            pygame.gfxdraw.aacircle(surface, center[0], center[1],
+                                    tower.atk_range, ATK_RANGE_COLOR)
+            # pygame.gfxdraw.aacircle(surface, center[0], center[1],
+            #                         tower.atk_range - 1, ATK_RANGE_COLOR)
+
+
+def within_square(pos: Tuple[int, int], pos_rect: Tuple[int, int],
+                  width: int, height: int) -> bool:
+    x, y = pos[0], pos[1]
+    rect_x, rect_y = pos_rect[0], pos_rect[1]
+    return (rect_x <= x <= rect_x + width) and (rect_y <= y <= rect_y + height)
+
+
+slots_sep = 20
+slots_distance = int((WIDTH - HEIGHT - slots_sep) // 3)
+slot_width = slots_distance - slots_sep
+slot_height = slot_width
+slots_init_x = HEIGHT + slots_sep
+slots_y = HEIGHT - slots_sep - 5 - slot_height
+
+slot1_pos = (slots_init_x, slots_y)
+slot2_pos = (slots_init_x + slots_distance, slots_y)
+slot3_pos = (slots_init_x + slots_distance * 2, slots_y)
+slots_lst = [slot1_pos, slot2_pos, slot3_pos]
+
+
+def display_slots(tower_slot_lst, surface=screen):
+    for i in range(AVAIL_SLOTS_NUM):
+        curr_slot = slots_lst[i]
+        tower = tower_slot_lst[i]
+        bg_color = get_tower_color(tower)
+        pygame.draw.rect(surface, bg_color,
+                         pygame.Rect(curr_slot[0],
+                                     curr_slot[1],
+                                     slot_width,
+                                     slot_height))
+        center = (curr_slot[0] + slot_width // 2,
+                  curr_slot[1] + slot_height // 2)
+        gen_text_window(str(tower), slot_font_size,
+                        center, black, bg_color, surface)
+
+
+def display_merge_preview(board: Board, tower_slot_lst, camera: Camera,
+                          surface=screen):
+    """Mark the free cells in view where a tower on the slots would merge
+    with the level it would end up at, in the corner of the cell matching
+    the slot: top left, top right, then bottom left.
+    """
+    ox, oy = camera.offset
+    rows, cols = camera.visible()
+    side = (grid_size - margin) // 3
+    corners = [(0, 0), (grid_size - margin - side, 0),
+               (0, grid_size - margin - side)]
+    for tower, (cx, cy) in zip(tower_slot_lst, corners):
+        bg_color = get_tower_color(tower)
+        for (y, x), level in board.merge_preview(tower.kind,
+                                                 tower.level).items():
+            if y not in rows or x not in cols:
+                continue
+            rect = pygame.Rect(ox + margin + grid_size * x + cx,
+                               oy + margin + grid_size * y + cy, side, side)
+            pygame.draw.rect(surface, bg_color, rect)
+            gen_text_window(str(level), merge_font_size, rect.center,
+                            black, bg_color, surface)
+
+
+def display_forbidden_cell(pos: Tuple[int, int], camera: Camera,
+                           surface=screen):
+    """Shade cell pos, where an offered tower would cut the enemy path."""
+    ox, oy = camera.offset
+    pygame.draw.rect(surface, FORBIDDEN_COLOR,
+                     pygame.Rect(ox + margin + grid_size * pos[1],
+                                 oy + margin + grid_size * pos[0],
+                                 grid_size - margin, grid_size - margin))
+
+
+def display_enemy_path(path_lst: List[Tuple[int, int]], camera: Camera,
+                       surface=screen):
+    ox, oy = camera.offset
+    rows, cols = camera.visible()
+    for pos in path_lst:
+        if pos[0] not in rows or pos[1] not in cols:
+            continue
+        x, y = pos[1], pos[0]
+        center = (ox + margin + grid_size * x + (grid_size - margin) // 2,
+                  oy + margin + grid_size * y + (grid_size - margin) // 2)
+        gen_text_window('.', path_dot_size,
+                        center, light_grey, white, surface)
+
+
+def render_background(surface: pygame.Surface, board: Board,
+                      pos: Tuple[int, int], path_lst: List[Tuple[int, int]],
+                      tower_slot_lst, camera: Camera,
+                      forbidden: Optional[Tuple[int, int]] = None):
+    """Draw everything that only changes when the board, the selection,
+    the slots, the camera or the forbidden cell under the mouse change:
+    board, enemy path, forbidden cell, merges the slots' towers would make
+    and slots.
+    """
+    surface.fill((0, 75, 100))
+    surface.set_clip(camera.view)
+    render_board(board, pos, camera, surface)  # render the game board
+    display_enemy_path(path_lst, camera, surface)  # display enemy path
+    if forbidden is not None:
+        display_forbidden_cell(forbidden, camera, surface)
+    display_merge_preview(board, tower_slot_lst, camera, surface)
+    surface.set_clip(None)
+    display_slots(tower_slot_lst, surface)  # towers on the slots on the right
+
+
+def select_slot(tower_lst: List[Tower], pos_on_lst, pos) -> Optional[Tower]:
+    if pos_on_lst is None:
+        return None
+    # pos_on_lst is not None
+    for i in range(AVAIL_SLOTS_NUM):
+        if within_square(pos, slots_lst[i], slot_width, slot_height):
+            return tower_lst[i]
+
+
+def display_game_text(g: Game):
+    wave_loc = (HEIGHT + 10, 10)
+    score_loc = (HEIGHT + 10, 70)
+    multiplier_loc = (HEIGHT + 10, 100)
+    hp_loc = (HEIGHT + 10, 130)
+
+    remaining_tower_num_loc = (HEIGHT + 10, slots_y - 35)
+
+    gen_text_window_left_align(f'Wave {g.enemy_wave}', 30, wave_loc,
+                               white, (0, 75, 100))
+    gen_text_window_left_align(f'Score: {round(g.score)}', 30, score_loc,
+                               white, (0, 75, 100))
+    gen_text_window_left_align(f'Multiplier: {round(g.score_multiplier, 2)}',
+                               18, multiplier_loc, white, (0, 75, 100))
+    gen_text_window_left_align(f'HP: {g.port_hp}', 30, hp_loc,
+                               lighter_green, (0, 75, 100))
+    gen_text_window_left_align(f'{g.remaining_tower_to_place} '
+                               f'towers can be placed', 22,
+                               remaining_tower_num_loc,
+                               white, (0, 75, 100))
+
+    wave_info_x, wave_info_y = HEIGHT + 10, 310
+    gen_text_window_left_align(f'Next wave:', 30, (wave_info_x, wave_info_y),
+                               white, (0, 75, 100))
+    wave_info_y += 30
+    for i in g.wave_info:
+        if g.wave_info[i] != 0:
+            gen_text_window_left_align(f'{str(i)}: {g.wave_info[i]}', 20,
+                                       (wave_info_x, wave_info_y),
+                                       white, (0, 75, 100))
+            wave_info_y += 20
+
+
+def display_tower_info(t: Tower):
+    name_loc = (HEIGHT + 10, 175)
+    gen_text_window_left_align(f'{str(t)}', 30, name_loc,
+                               white, (0, 75, 100))
+
+    tw_atk_loc = (HEIGHT + 10, 210)
+    tw_range_loc = (HEIGHT + 10, 232)
+    tw_int_loc = (HEIGHT + 10, 254)
+    gen_text_window_left_align(f'ATK: {t.atk}', 20, tw_atk_loc,
+                               white, (0, 75, 100))
+    gen_text_window_left_align(f'range: {t.atk_range}', 20, tw_range_loc,
+                               white, (0, 75, 100))
+    gen_text_window_left_align(f'interval: {t.atk_interval}s', 20, tw_int_loc,
+                               white, (0, 75, 100))
+
+
+def display_game_over():
+    gen_text_window(f'You Lose', 120, (HEIGHT // 2, HEIGHT // 2),
+                    white, black)
+
+
+def check_click_go_next_wave(pos, topleft, size, count: int) -> bool:
+    if count > 0:
+        width = size[0]
+        height = size[1]
+        left = topleft[0]
+        top = topleft[1]
+        x = pos[0]
+        y = pos[1]
+        if left <= x <= left + width and top < y < top + height:
+            return True
+
+    return False
+
+
+parser = argparse.ArgumentParser(description='Play the game.')
+parser.add_argument('--seed', type=int, default=None,
+                    help='seed of the game, random if not given')
+parser.add_argument('--record', metavar='FILE', default=None,
+                    help='save the inputs to FILE to replay the game with '
+                         'headless.py --replay FILE')
+parser.add_argument('--timings', metavar='FILE', default=None,
+                    help='dump the frame timings to FILE on quitting and on '
+                         'F4 (default frame_times.csv for F4 only), CSV '
+                         'or, for a .jsonl name, JSON lines')
+parser.add_argument('--autoplay', metavar='SECONDS', type=float,
+                    default=None,
+                    help='let the bot place the offered towers while the '
+                         'countdown runs, thinking SECONDS per tower')
+args = parser.parse_args()
+
+g = Game(args.seed)
+log = InputLog(g.seed)
+bot = None if args.autoplay is None else AutoPlayer(args.autoplay,
+                                                    seed=g.seed)
+# text, position
+pygame.init()
+
+pygame.display.set_caption('千万记住三消位置在最后！！！')
+programIcon = pygame.image.load('leafy-green_32x32.png')
+pygame.display.set_icon(programIcon)
+build_sprite_atlas()  # shared enemy and bullet images
+
+skip_font_size = 25
+skip_waiting_topleft = (HEIGHT + 120, 35)
+skip_waiting_size = gen_text_window_left_align('Go!', skip_font_size,
+                                               skip_waiting_topleft,
+                                               white, green,
+                                               textrect_info_only=True)
+
+screen.fill((0, 75, 100))
+tower_in_slot = tower_options(AVAIL_TOWER_LST, g.offer_rng)
+
+running = True
+pos_selected = None
+game_over = False
+
+# the static layer is redrawn only when its key changes, otherwise each
+# frame restores the rects the last frame drew on and updates only those
+layer = pygame.Surface(screen.get_size()).convert()
+layer_key = None
+hud_rect = pygame.Rect(HEIGHT, 0, WIDTH - HEIGHT, slots_y)
+dirty = []
+
+# time spent in every phase of the last frames, F3 shows it, F4 dumps it
+timer = FrameTimer(['background', 'render_board', 'display_merge_preview',
+                    'display_slots', 'display_enemy_path', 'update_enemies',
+                    'update_all_towers', 'tick', 'draw', 'hud', 'events',
+                    'autoplay', 'wait', 'display_update'])
+render_board = timer.wrap('render_board', render_board)
+display_merge_preview = timer.wrap('display_merge_preview',
+                                   display_merge_preview)
+display_slots = timer.wrap('display_slots', display_slots)
+display_enemy_path = timer.wrap('display_enemy_path', display_enemy_path)
+g.update_enemies = timer.wrap('update_enemies', g.update_enemies)
+g.update_all_towers = timer.wrap('update_all_towers', g.update_all_towers)
+show_timings = False
+
+# the game runs on its own clock, Tab or 1/2/4/8 change its speed
+clock = SimClock()
+speed_keys = {K_1: 1, K_2: 2, K_4: 4, K_8: 8}
+frame_ms = 0
+
+# a board larger than the window scrolls with the arrow keys, Home and End
+# jump to the spawn and the exit
+camera = Camera(pygame.Rect(0, 0, HEIGHT, HEIGHT))
+
+while running:
+    if camera.scrolls():
+        pressed = pygame.key.get_pressed()
+        step = CAMERA_PAN_SPEED * frame_ms / 1000
+        camera.pan((pressed[K_RIGHT] - pressed[K_LEFT]) * step,
+                   (pressed[K_DOWN] - pressed[K_UP]) * step)
+    # shade the free cell under the mouse if an offered tower placed there
+    # would leave the enemies no path
+    hover = camera.cell_at(pygame.mouse.get_pos())
+    if hover is not None and (g.board.is_blocked(hover) or not any(
+            g.blocks_path(tower, hover) for tower in tower_in_slot)):
+        hover = None
+    key = (g.board_version, pos_selected, tuple(map(id, tower_in_slot)),
+           camera.x, camera.y, hover)
+    full_update = key != layer_key
+    if full_update:
+        render_background(layer, g.board, pos_selected, g.path,
+                          tower_in_slot, camera, hover)
+        layer_key = key
+        screen.blit(layer, (0, 0))
+    else:
+        for rect in dirty + [hud_rect]:
+            screen.blit(layer, rect, rect)
+    timer.mark('background')
+
+    # the game only simulates, at a fixed step however long frames take,
+    # drawing is done here as an observer between two ticks
+    for _ in range(clock.advance(frame_ms)):
+        if g.is_over():
+            break
+        g.tick()
+    timer.mark('tick')
+    screen.set_clip(camera.view)
+    new_dirty = g.draw(screen, alpha=clock.alpha, offset=camera.offset)
+    screen.set_clip(None)
+    timer.mark('draw')
+    display_game_text(g)
+    timer.mark('hud')
+
+    for event in pygame.event.get():
+
+        if event.type == KEYDOWN:
+            if event.key == K_F3:
+                show_timings = not show_timings
+            elif event.key == K_F4:
+                timings_path = args.timings or 'frame_times.csv'
+                timer.dump(timings_path)
+                print(f'frame timings written to {timings_path}')
+            elif event.key == K_TAB:
+                clock.next_speed()
+            elif event.key in speed_keys:
+                clock.speed = speed_keys[event.key]
+            elif event.key == K_HOME:
+                camera.center_on((0, 0))
+            elif event.key == K_END:
+                camera.center_on((BOARD_SIZE - 1, BOARD_SIZE - 1))
+
+        if event.type == MOUSEBUTTONDOWN:
+            pos = pygame.mouse.get_pos()
+            if check_click_go_next_wave(pos, skip_waiting_topleft,
+                                        skip_waiting_size, g.countdown):
+                log.play(g, SKIP)
+            temp = camera.cell_at(pos)
+            if temp is not None:  # a cell of g.board was clicked
+                # select twice ==> deselect
+                if pos_selected == temp:
+                    pos_selected = None
+                # otherwise select
+                else:
+                    pos_selected = temp
+
+            # select tower on slots, if none, return None
+            # if no grid selected on the board, return None
+            tower = select_slot(tower_in_slot, pos_selected, pos)
+            if tower:
+                if log.play(g, PLACE, str(tower), *pos_selected):
+                    tower_in_slot = tower_options(AVAIL_TOWER_LST, g.offer_rng)
+            print(pos_selected)
+
+        if event.type == QUIT:
+            running = False
+    timer.mark('events')
+
+    if bot is not None and g.countdown > 0 \
+            and g.remaining_tower_to_place > 0:
+        if bot.play(g, tower_in_slot, log):
+            tower_in_slot = tower_options(AVAIL_TOWER_LST, g.offer_rng)
+    timer.mark('autoplay')
+    # show tower info if tower on the grid
+    if pos_selected is not None:
+        tw = g.board.get(pos_selected)
+        if tw is not None:
+            display_tower_info(tw)
+
+    if g.is_over():
+        game_over = True
+        running = False
+
+    # Wave text
+    if g.countdown > 0:
+        gen_text_window_left_align(f'Next in: {g.countdown}s', 20,
+                                   (HEIGHT + 10, 40),
+                                   white, (0, 75, 100))
+        gen_text_window_left_align('Go!', skip_font_size,
+                                   skip_waiting_topleft,
+                                   white, indigo)
+
+    if show_timings:
+        new_dirty.append(draw_overlay(screen, timer, (10, 10),
+                                      text_renderer.render))
+    timer.mark('hud')
+
+    frame_ms = fpsClock.tick(RENDER_FPS)
+    fps = round(1000 / max(frame_ms, 1))
+    timer.mark('wait')
+    gen_text_window_left_align(f'fps: {fps}', 30, (HEIGHT + 185, 10),
+                               white, (0, 75, 100))
+    gen_text_window_left_align(f'speed: {clock.speed}x', 20,
+                               (HEIGHT + 185, 40), white, (0, 75, 100))
+    timer.mark('hud')
+    if full_update:
+        pygame.display.update()
+    else:
+        pygame.display.update(dirty + new_dirty + [hud_rect])
+    dirty = new_dirty
+    timer.mark('display_update')
+    timer.end_frame()
+
+
+log.finish(g)
+if args.timings is not None:
+    timer.dump(args.timings)
+    print(f'frame timings written to {args.timings}')
+if args.record is not None:
+    log.save(args.record)
+    print(f'seed {g.seed}, inputs saved to {args.record}')
+
+while game_over:
+    display_game_over()
+    fpsClock.tick(5)
+    pygame.display.update()
+
+pygame.quit()
+print(f'flow field cache: {FIELD_CACHE}')
+print(f'text cache: {text_renderer}')
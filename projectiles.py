@@ -0,0 +1,161 @@
+"""Bullets of every tower, updated and drawn by one system owned by Game.
+
+Bullets come from a pool allocated up front: a shot takes a free bullet and
+resets it, a bullet that hits or loses its target goes back to the pool, so
+steady firing allocates nothing.
+"""
+import pygame
+import pygame.gfxdraw
+from pygame.math import Vector2
+from config import BULLET_POOL_SIZE, BULLET_SIZE
+from sprites import ATLAS
+from typing import List, Optional, Tuple
+
+
+class Bullet:
+    """
+    Bullet class
+
+    === Public Attributes ===
+    pos: position of the bullet
+    prev_pos: position of the bullet before its last update
+    rect: where the bullet is drawn
+    dmg: damage dealt on hit
+    bs: bullet speed
+    color: color of the tower that fired it
+    target: enemy the bullet is targeting on, None while in the pool
+    remove: whether the bullet hit or lost its target
+    """
+    pos: Vector2
+    prev_pos: Vector2
+    rect: pygame.Rect
+    dmg: float
+    bs: float
+    color: Tuple[int, int, int]
+    target: Optional[object]
+    remove: bool
+
+    def __init__(self):
+        self.pos = Vector2()
+        self.prev_pos = Vector2()
+        self.rect = pygame.Rect(0, 0, BULLET_SIZE, BULLET_SIZE)
+        self.dmg = 0
+        self.bs = 0
+        self.color = None
+        self.target = None
+        self.remove = True
+        self._image = None
+
+    def reset(self, pos, dmg, bs, color, target):
+        """Fire the bullet from pos at target."""
+        self.pos.update(pos)
+        self.prev_pos.update(pos)
+        self.rect.center = pos
+        self.dmg = dmg
+        self.bs = bs
+        if color != self.color:
+            self._image = None
+        self.color = color
+        self.target = target
+        self.remove = False
+
+    @property
+    def image(self) -> pygame.Surface:
+        """Sprite image, shared by all bullets of this colour."""
+        if self._image is None:
+            self._image = ATLAS.get(('Bullet', self.color),
+                                    lambda: gen_bullet_image(self.color))
+        return self._image
+
+    def update(self):
+        if self.target.remove:
+            self.remove = True
+            return
+
+        heading = self.target.pos - self.pos
+        distance = heading.length()  # Distance to the target.
+        if distance < self.bs:
+            self.target.lose_hp(self.dmg)
+            self.remove = True
+        else:
+            heading.normalize_ip()
+            self.prev_pos.update(self.pos)
+            self.pos += heading * self.bs
+
+
+def gen_bullet_image(color: Tuple[int, int, int]) -> pygame.Surface:
+    image = pygame.Surface((BULLET_SIZE, BULLET_SIZE), pygame.SRCALPHA)
+    pygame.gfxdraw.aacircle(image,
+                            BULLET_SIZE // 2,
+                            BULLET_SIZE // 2,
+                            BULLET_SIZE // 2 - 1, color)
+    pygame.gfxdraw.filled_circle(image,
+                                 BULLET_SIZE // 2,
+                                 BULLET_SIZE // 2,
+                                 BULLET_SIZE // 2 - 2, color)
+    return image
+
+
+class Projectiles:
+    """
+    === Public Attributes ===
+    active: bullets in flight, in the order they were fired
+    pool: bullets ready to be fired again
+    """
+    active: List[Bullet]
+    pool: List[Bullet]
+
+    def __init__(self, capacity=BULLET_POOL_SIZE):
+        self.active = []
+        self.pool = [Bullet() for _ in range(capacity)]
+
+    def __len__(self):
+        return len(self.active)
+
+    def fire(self, pos, dmg, bs, color, target) -> Bullet:
+        bullet = self.pool.pop() if self.pool else Bullet()
+        bullet.reset(pos, dmg, bs, color, target)
+        self.active.append(bullet)
+        return bullet
+
+    def update(self):
+        """Move every bullet and return the spent ones to the pool."""
+        spent = False
+        for b in self.active:
+            b.update()
+            spent = spent or b.remove
+        if spent:
+            active = []
+            for b in self.active:
+                if b.remove:
+                    b.target = None
+                    self.pool.append(b)
+                else:
+                    active.append(b)
+            self.active = active
+
+    def snapshot(self) -> list:
+        return [(b.pos.x, b.pos.y, b.dmg, b.bs, b.color, b.target)
+                for b in self.active]
+
+    def restore(self, state: list):
+        """Put the bullets in flight back to a snapshot, reusing pooled
+        bullets.
+        """
+        for b in self.active:
+            b.target = None
+            self.pool.append(b)
+        self.active = []
+        for x, y, dmg, bs, color, target in state:
+            self.fire((x, y), dmg, bs, color, target)
+
+    def draw(self, surface: pygame.Surface, alpha=1.0,
+             offset=(0, 0)) -> List[pygame.Rect]:
+        """Blit every bullet in one call, alpha of the way through its last
+        move and shifted by offset, return the rects drawn on.
+        """
+        for b in self.active:
+            b.rect.center = b.prev_pos.lerp(b.pos, alpha)
+            if offset != (0, 0):
+                b.rect.move_ip(offset)
+        return surface.blits([(b.image, b.rect) for b in self.active])
@@ -0,0 +1,94 @@
+"""Player input recording, so a game can be replayed exactly.
+
+A game is fully determined by its seed and by the inputs the player gave
+on each tick: tower placements and skipping the countdown. InputLog keeps
+those with the tick they happened on and saves them as JSON, and
+headless.replay re-runs them without a display.
+"""
+import json
+from config import BOARD_SIZE
+from tower_defence import Game, Tower, AVAIL_TOWER_LST
+from typing import Dict, List, Optional
+
+PLACE = 'place'  # args: tower name (e.g. 'Cannon2'), row, col
+SKIP = 'skip'  # no args, skip the countdown to the next wave
+
+TOWER_CLASSES = {cls.__name__: cls for cls in AVAIL_TOWER_LST}
+
+
+class InputLog:
+    """
+    === Public Attributes ===
+    seed: seed of the recorded game
+    board_size: number of rows (and columns) of the board played on
+    inputs: [tick, action, *args] of every input, in the order given
+    ticks: ticks the game ran for, set by finish
+    result: wave, score and hp at the end, set by finish
+    """
+    seed: int
+    board_size: int
+    inputs: List[list]
+    ticks: Optional[int]
+    result: Optional[Dict[str, float]]
+
+    def __init__(self, seed: int, board_size=BOARD_SIZE):
+        self.seed = seed
+        self.board_size = board_size
+        self.inputs = []
+        self.ticks = None
+        self.result = None
+
+    def play(self, game: Game, action: str, *args) -> bool:
+        """Record an input on the current tick of game and apply it."""
+        self.inputs.append([game.ticks, action, *args])
+        return apply_input(game, action, *args)
+
+    def finish(self, game: Game):
+        self.ticks = game.ticks
+        self.result = game_result(game)
+
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            json.dump({'version': 1, 'seed': self.seed,
+                       'board_size': self.board_size, 'ticks': self.ticks,
+                       'result': self.result, 'inputs': self.inputs}, f)
+
+    @classmethod
+    def load(cls, path: str) -> 'InputLog':
+        with open(path) as f:
+            data = json.load(f)
+        # recordings without a board size were all played on 12x12
+        log = cls(data['seed'], data.get('board_size', 12))
+        log.inputs = data['inputs']
+        log.ticks = data['ticks']
+        log.result = data['result']
+        return log
+
+
+def tower_from_name(name: str) -> Tower:
+    """A new tower from its str, e.g. 'Sniper3'."""
+    tower = TOWER_CLASSES[name[:-1]]()
+    for _ in range(int(name[-1]) - 1):
+        tower.upgrade_tower()
+    return tower
+
+
+def apply_input(game: Game, action: str, *args) -> bool:
+    """Apply an input to game as playTD does, return whether it took effect."""
+    if action == PLACE:
+        name, row, col = args
+        if game.place_tower(tower_from_name(name), (row, col)):
+            game.game_update_enemy_path()
+            return True
+        return False
+    if action == SKIP:
+        if game.countdown > 0:
+            game.skip_countdown()
+            return True
+        return False
+    raise ValueError(f'unknown input {action!r}')
+
+
+def game_result(game: Game) -> Dict[str, float]:
+    return {'wave': game.enemy_wave, 'score': game.score,
+            'hp': game.port_hp}
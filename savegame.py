@@ -0,0 +1,331 @@
+"""Save and load a whole game in a compact, versioned binary format.
+
+The file is a header (magic and version) followed by sections packed with
+struct: game counters, the two RNG states, wave info, enemies still to
+spawn, the flow fields in use (as board occupancies), towers, live
+enemies, the enemy index buckets and bullets in flight. The enemy store
+columns are written and read as whole arrays, so loading is a handful of
+bulk reads and no object is pickled. Usage:
+
+    save_game(g, 'wave80.sav')
+    g = load_game('wave80.sav')
+"""
+import struct
+import numpy as np
+from pygame.math import Vector2
+from board import Board
+from pathfinding import flow_field
+from tower_defence import (Game, Enemy, Crusher, Circle, Square, Triangle,
+                           AVAIL_TOWER_LST, TOWER_COLOR)
+from typing import Dict, List, Tuple
+
+MAGIC = b'TDSV'
+VERSION = 2  # 2: cells are 32 bit, for boards larger than 256x256
+
+ENEMY_CLASSES = [Circle, Square, Triangle]  # index is the type code
+ENEMY_CODES = {cls.__name__: code for code, cls in enumerate(ENEMY_CLASSES)}
+TOWER_CLASSES = {cls.kind: cls for cls in AVAIL_TOWER_LST}
+COLOR_KINDS = {color: kind for kind, color in TOWER_COLOR.items()}
+
+_HEADER = struct.Struct('<4sH')
+# seed, board size, ticks, port hp, score, score multiplier, wave, enemy
+# types, enemy num, towers to place, board version, countdown, spawning
+_GAME = struct.Struct('<qHqiddiiiiiiB')
+# version, has gauss_next, gauss_next, 624 words and the index
+_RNG = struct.Struct('<iBd625I')
+_COUNT = struct.Struct('<I')
+_WAVE_INFO = struct.Struct('<Bi')  # enemy type, count
+# cell, type, level, cool down, attacked, target
+_TOWER = struct.Struct('<IBBiBi')
+# enemy type, max hp, speed, defeated, field
+_ENEMY = struct.Struct('<BddBH')
+_BUCKET = struct.Struct('<IH')  # cell, enemies in it
+_RELEASED = struct.Struct('<ddBB')  # pos, remove, defeated
+# pos, damage, speed, tower type, target
+_BULLET = struct.Struct('<ddddBi')
+NO_TARGET = -(2 ** 31)
+
+# EnemyStore columns in file order, with their dtype in the file
+_COLUMNS = [('pos', '<f8', 2), ('target', '<f8', 2),
+            ('target_cell', '<i8', 1), ('target_dist', '<f8', 1),
+            ('remaining', '<f8', 1), ('speed', '<f8', 1), ('hp', '<f8', 1),
+            ('remove', '<u1', 1)]
+
+
+class ReleasedEnemy:
+    """Stand-in for an enemy that already left the game but is still the
+    target of a bullet or a tower.
+    """
+    pos: Vector2
+    remove: bool
+    defeated: bool
+
+    def __init__(self, pos: Tuple[float, float], remove: bool,
+                 defeated: bool):
+        self.pos = Vector2(pos)
+        self.remove = remove
+        self.defeated = defeated
+
+    def lose_hp(self, i: float):
+        pass
+
+
+class _Targets:
+    """Numbers targets: a live enemy is its store slot, an enemy already
+    released is -1 - its index in released, no target is NO_TARGET.
+    """
+
+    def __init__(self, slot_of: Dict[Enemy, int]):
+        self.slot_of = slot_of
+        self.released = []
+        self._index = {}
+
+    def ref(self, target) -> int:
+        if target is None:
+            return NO_TARGET
+        if target in self.slot_of:
+            return self.slot_of[target]
+        if target not in self._index:
+            self._index[target] = len(self.released)
+            self.released.append(target)
+        return -1 - self._index[target]
+
+
+def dumps(game: Game) -> bytes:
+    """game as bytes that loads reads back."""
+    out = bytearray(_HEADER.pack(MAGIC, VERSION))
+    size = game.board.size
+    out += _GAME.pack(game.seed, size, game.ticks, game.port_hp, game.score,
+                      game.score_multiplier, game.enemy_wave,
+                      game.enemy_types, game.enemy_num,
+                      game.remaining_tower_to_place, game.board_version,
+                      game.countdown, game.spawning)
+    for rng in (game.rng, game.offer_rng):
+        version, words, gauss = rng.getstate()
+        out += _RNG.pack(version, gauss is not None, gauss or 0.0, *words)
+
+    out += _COUNT.pack(len(game.wave_info))
+    for name, count in game.wave_info.items():
+        out += _WAVE_INFO.pack(ENEMY_CODES[name], count)
+    out += _COUNT.pack(len(game.new_enemy_list))
+    out += bytes(ENEMY_CODES[name] for name in game.new_enemy_list)
+
+    # enemies are saved in store slot order, which later ticks depend on
+    store = game.enemy_store
+    enemies = store.owners[:store.n]
+    slot_of = {e: slot for slot, e in enumerate(enemies)}
+    targets = _Targets(slot_of)
+    fields = [game.flow_field]
+    field_index = {game.flow_field: 0}
+    for e in enemies:
+        if e.field not in field_index:
+            field_index[e.field] = len(fields)
+            fields.append(e.field)
+    occupancy_bytes = (size * size + 7) // 8
+    out += _COUNT.pack(len(fields))
+    for field in fields:
+        out += field.occupancy.to_bytes(occupancy_bytes, 'little')
+
+    cell_of_tower = {}
+    out += _COUNT.pack(len(game.board.towers))
+    for cell, tw in game.board.towers.items():
+        cell_of_tower[tw] = cell
+        cool_down = max(0, tw.ready_tick - game.ticks - 1)
+        out += _TOWER.pack(cell, tw.kind, tw.level, cool_down,
+                           getattr(tw, 'attacked', False),
+                           targets.ref(tw.target))
+    out += _COUNT.pack(len(game.tower_list))
+    out += struct.pack(f'<{len(game.tower_list)}I',
+                       *(cell_of_tower[tw] for tw in game.tower_list))
+
+    out += _COUNT.pack(len(enemies))
+    for e in enemies:
+        out += _ENEMY.pack(ENEMY_CODES[str(e)], e.max_hp, e.ms, e.defeated,
+                           field_index[e.field])
+    for name, dtype, _ in _COLUMNS:
+        out += getattr(store, name)[:store.n].astype(dtype).tobytes()
+    out += _indices([slot_of[e] for e in game.enemy_list])
+
+    cell_of, buckets = game.enemy_index.snapshot()
+    out += _indices([slot_of[e] for e in cell_of])
+    out += _COUNT.pack(len(buckets))
+    for cell, members in buckets:
+        out += _BUCKET.pack(cell, len(members))
+        out += struct.pack(f'<{len(members)}H',
+                           *(slot_of[e] for e in members))
+
+    bullets = [_BULLET.pack(x, y, dmg, bs, COLOR_KINDS[color],
+                            targets.ref(target))
+               for x, y, dmg, bs, color, target in
+               game.projectiles.snapshot()]
+    out += _COUNT.pack(len(targets.released))
+    for e in targets.released:
+        out += _RELEASED.pack(e.pos.x, e.pos.y, e.remove, e.defeated)
+    out += _COUNT.pack(len(bullets))
+    out += b''.join(bullets)
+    return bytes(out)
+
+
+def _indices(values: List[int]) -> bytes:
+    return _COUNT.pack(len(values)) + struct.pack(f'<{len(values)}H',
+                                                  *values)
+
+
+class _Reader:
+    """Unpacks consecutive sections of a buffer."""
+
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def read(self, fmt: struct.Struct) -> tuple:
+        values = fmt.unpack_from(self.data, self.offset)
+        self.offset += fmt.size
+        return values
+
+    def count(self) -> int:
+        return self.read(_COUNT)[0]
+
+    def raw(self, n: int) -> memoryview:
+        chunk = self.data[self.offset:self.offset + n]
+        if len(chunk) < n:
+            raise ValueError('saved game is truncated')
+        self.offset += n
+        return chunk
+
+    def array(self, dtype: str, n: int) -> np.ndarray:
+        dtype = np.dtype(dtype)
+        return np.frombuffer(self.raw(dtype.itemsize * n), dtype=dtype)
+
+    def indices(self, n=None) -> Tuple[int, ...]:
+        if n is None:
+            n = self.count()
+        return tuple(self.array('<u2', n).tolist())
+
+
+def loads(data: bytes) -> Game:
+    """The game saved by dumps. Raise ValueError if data is not a saved
+    game this build can read.
+    """
+    r = _Reader(data)
+    try:
+        magic, version = r.read(_HEADER)
+    except struct.error:
+        raise ValueError('not a saved game')
+    if magic != MAGIC:
+        raise ValueError('not a saved game')
+    if version != VERSION:
+        raise ValueError(f'saved game version {version}, '
+                         f'this build reads version {VERSION}')
+    try:
+        return _load(r)
+    except (struct.error, IndexError, KeyError):
+        raise ValueError('saved game is corrupt')
+
+
+def _load(r: _Reader) -> Game:
+    (seed, size, ticks, port_hp, score, multiplier, wave, enemy_types,
+     enemy_num, to_place, board_version, countdown, spawning) = r.read(_GAME)
+    g = Game(seed)
+    if size != g.board.size:
+        raise ValueError(f'saved on a {size}x{size} board, the board is '
+                         f'{g.board.size}x{g.board.size}')
+    g.ticks, g.port_hp, g.score = ticks, port_hp, score
+    g.score_multiplier, g.enemy_wave = multiplier, wave
+    g.enemy_types, g.enemy_num = enemy_types, enemy_num
+    g.remaining_tower_to_place, g.board_version = to_place, board_version
+    g.countdown, g.spawning = countdown, bool(spawning)
+    for rng in (g.rng, g.offer_rng):
+        version, has_gauss, gauss, *words = r.read(_RNG)
+        rng.setstate((version, tuple(words), gauss if has_gauss else None))
+
+    g.wave_info = {}
+    for _ in range(r.count()):
+        code, count = r.read(_WAVE_INFO)
+        g.wave_info[ENEMY_CLASSES[code].__name__] = count
+    g.new_enemy_list = [ENEMY_CLASSES[code].__name__
+                        for code in bytes(r.raw(r.count()))]
+
+    occupancy_bytes = (size * size + 7) // 8
+    fields = []
+    for _ in range(r.count()):
+        occupancy = int.from_bytes(r.raw(occupancy_bytes), 'little')
+        # on a large board, repaired from a field with few towers different
+        fields.append(flow_field(Board.from_occupancy(size, occupancy),
+                                 fields[0] if fields else g.flow_field))
+
+    board = Board(size)
+    towers = []
+    for _ in range(r.count()):
+        cell, kind, level, cool_down, attacked, target = r.read(_TOWER)
+        tw = TOWER_CLASSES[kind]()
+        for _ in range(level - 1):
+            tw.upgrade_tower()
+        pos = divmod(cell, size)
+        tw.place(pos)
+        tw.ready_tick = ticks + cool_down + 1
+        if isinstance(tw, Crusher):
+            tw.attacked = bool(attacked)
+        board.set(pos, tw)
+        towers.append((tw, target))
+    g.board = board
+    g.tower_list = [board.towers[cell]
+                    for cell in r.array('<u4', r.count()).tolist()]
+    g.reschedule_towers()
+    g.flow_field = fields[0]
+    g.path = g.flow_field.path_from((0, 0))
+
+    n = r.count()
+    store = g.enemy_store
+    enemies = []
+    for slot in range(n):
+        code, max_hp, ms, defeated, field = r.read(_ENEMY)
+        e = ENEMY_CLASSES[code].in_slot(store, slot, fields[field],
+                                        max_hp, ms)
+        e.defeated = bool(defeated)
+        enemies.append(e)
+    columns = [r.array(dtype, n * width).reshape((n, width) if width > 1
+                                                 else (n,))
+               for _, dtype, width in _COLUMNS]
+    store.load(enemies, columns, [e.field for e in enemies])
+    g.enemy_list.empty()
+    g.enemy_list.add(*(enemies[slot] for slot in r.indices()))
+
+    order = [enemies[slot] for slot in r.indices()]
+    buckets = []
+    cell_of = {}
+    for _ in range(r.count()):
+        cell, k = r.read(_BUCKET)
+        members = [enemies[slot] for slot in r.indices(k)]
+        buckets.append((cell, members))
+        for e in members:
+            cell_of[e] = cell
+    g.enemy_index.restore(({e: cell_of[e] for e in order}, buckets))
+
+    released = [ReleasedEnemy((x, y), bool(remove), bool(defeated))
+                for x, y, remove, defeated in
+                (r.read(_RELEASED) for _ in range(r.count()))]
+
+    def target_of(ref: int):
+        if ref == NO_TARGET:
+            return None
+        return enemies[ref] if ref >= 0 else released[-1 - ref]
+
+    for tw, target in towers:
+        tw.target = target_of(target)
+    bullets = []
+    for _ in range(r.count()):
+        x, y, dmg, bs, kind, target = r.read(_BULLET)
+        bullets.append((x, y, dmg, bs, TOWER_COLOR[kind], target_of(target)))
+    g.projectiles.restore(bullets)
+    return g
+
+
+def save_game(game: Game, path: str):
+    with open(path, 'wb') as f:
+        f.write(dumps(game))
+
+
+def load_game(path: str) -> Game:
+    with open(path, 'rb') as f:
+        return loads(f.read())
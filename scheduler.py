@@ -0,0 +1,140 @@
+"""Tower updates on the ticks a tower can act on, instead of every tick.
+
+A tower is in one of three states:
+
+- cooling down: it sits in a heap keyed on the tick it next needs an
+  update, the tick before it is ready (when it aims, see
+  Cannon.attack_enemy) or the tick it is ready;
+- ready with enemies in the cells its range covers: it is updated every
+  tick, as the enemies may walk into range without changing cell;
+- ready with no enemy in those cells: it sleeps until an enemy enters one
+  of them, which EnemyGrid reports through its watched cells.
+
+Towers due on a tick are updated in tower list order, so the game plays
+exactly as if every tower was updated on every tick. Towers whose type is
+batched (Crusher) are held back and attack together, right before a tower
+that is ready to fire, which may look at the damage they dealt, and at the
+end of the tick.
+"""
+import heapq
+from spatial import EnemyGrid
+from typing import Dict, List, Set, Tuple
+
+
+class TowerScheduler:
+    """
+    === Public Attributes ===
+    grid: enemy index, whose cells sleeping towers watch
+    towers: towers in update order
+    """
+    grid: EnemyGrid
+    towers: list
+    _heap: List[Tuple[int, int]]
+    _awake: Set[int]
+    _watchers: Dict[int, Set[int]]
+    _attacked: list
+    _stale: bool
+
+    def __init__(self, grid: EnemyGrid):
+        self.grid = grid
+        self.towers = []
+        self._heap = []  # (tick, index of the tower in towers)
+        self._awake = set()
+        self._watchers = {}  # sleeping towers by watched cell
+        self._attacked = []
+        self._stale = True
+
+    def reset(self, towers: list):
+        """Schedule towers, whose order or cool downs changed, from scratch
+        on the next update: every tower is updated once, then sorted into
+        its state.
+        """
+        self.towers = towers
+        self._stale = True
+
+    def _rebuild(self):
+        grid = self.grid
+        for cell in self._watchers:
+            grid.watched[cell] = 0
+        grid.entered.clear()
+        self._watchers = {}
+        self._heap = []
+        self._awake = set(range(len(self.towers)))
+        self._attacked = [tw for tw in self.towers
+                          if getattr(tw, 'attacked', False)]
+        self._stale = False
+
+    def update(self, tick: int, enemies: EnemyGrid, bullets):
+        """Update the towers due on tick, as Game.update_all_towers did
+        for every tower.
+        """
+        if self._stale:
+            self._rebuild()
+        for tw in self._attacked:  # flags of the last tick only
+            tw.attacked = False
+        self._attacked = []
+
+        grid = self.grid
+        if grid.entered:
+            for cell in grid.entered:
+                for i in list(self._watchers.get(cell, ())):
+                    self._wake(i)
+            grid.entered.clear()
+        heap = self._heap
+        while heap and heap[0][0] <= tick:
+            self._awake.add(heapq.heappop(heap)[1])
+
+        # batched towers (crushers) attack together, before the next tower
+        # whose attack could see the damage they deal and at the end
+        pending = []
+        for i in sorted(self._awake):
+            tw = self.towers[i]
+            if tw.batched:
+                pending.append(i)
+                continue
+            if pending and tick >= tw.ready_tick:
+                self._attack_batch(pending, enemies, tick)
+                pending = []
+            tw.target_out_of_range()
+            tw.attack_enemy(enemies, bullets, tick)
+            self._reschedule(i, tick)
+        if pending:
+            self._attack_batch(pending, enemies, tick)
+
+    def _attack_batch(self, indices: List[int], enemies: EnemyGrid,
+                      tick: int):
+        batches = {}
+        for i in indices:
+            batches.setdefault(type(self.towers[i]), []).append(i)
+        for cls, batch in batches.items():
+            cls.attack_batch([self.towers[i] for i in batch], enemies, tick)
+            for i in batch:
+                self._reschedule(i, tick)
+
+    def _reschedule(self, i: int, tick: int):
+        """Sort tower i, just updated on tick, into its state."""
+        tw = self.towers[i]
+        if getattr(tw, 'attacked', False):
+            self._attacked.append(tw)
+        if tw.ready_tick > tick:
+            self._awake.discard(i)
+            heapq.heappush(self._heap, (max(tick + 1, tw.ready_tick - 1), i))
+        elif not any(self.grid.buckets[cell] for cell in tw.cells):
+            self._awake.discard(i)
+            self._sleep(i)
+
+    def _sleep(self, i: int):
+        watched = self.grid.watched
+        for cell in self.towers[i].cells:
+            self._watchers.setdefault(cell, set()).add(i)
+            watched[cell] = 1
+
+    def _wake(self, i: int):
+        watched = self.grid.watched
+        for cell in self.towers[i].cells:
+            watchers = self._watchers[cell]
+            watchers.discard(i)
+            if not watchers:
+                del self._watchers[cell]
+                watched[cell] = 0
+        self._awake.add(i)
@@ -0,0 +1,53 @@
+"""Fixed-step simulation clock, independent of the frame rate.
+
+Real time spent drawing frames is added to an accumulator, scaled by the
+speed, and every 1 / FPS seconds of it runs one Game.tick. A slow frame
+runs several ticks and a fast one may run none, so the game moves at the
+same pace however fast it is drawn. What is left in the accumulator is
+the fraction of the next tick already elapsed, used to draw enemies and
+bullets between two ticks.
+"""
+from config import FPS, MAX_TICKS_PER_FRAME, SIM_SPEEDS
+
+
+class SimClock:
+    """
+    === Public Attributes ===
+    tick_ms: real milliseconds per tick at speed 1
+    speed: ticks run per tick_ms of real time
+    max_ticks: ticks a frame may run at most, a longer backlog is dropped
+        so that a stall does not make every later frame slower
+    dropped: ticks dropped so far
+    """
+    tick_ms: float
+    speed: int
+    max_ticks: int
+    dropped: int
+
+    def __init__(self, hz=FPS, speed=1, max_ticks=MAX_TICKS_PER_FRAME):
+        self.tick_ms = 1000 / hz
+        self.speed = speed
+        self.max_ticks = max_ticks
+        self.dropped = 0
+        self._acc = 0.0
+
+    def advance(self, ms: float) -> int:
+        """ms of real time passed: return the number of ticks to run."""
+        self._acc += ms * self.speed
+        ticks = int(self._acc // self.tick_ms)
+        self._acc -= ticks * self.tick_ms
+        if ticks > self.max_ticks:
+            self.dropped += ticks - self.max_ticks
+            ticks = self.max_ticks
+        return ticks
+
+    @property
+    def alpha(self) -> float:
+        """Fraction of the next tick elapsed, from 0 to 1."""
+        return self._acc / self.tick_ms
+
+    def next_speed(self) -> int:
+        """Switch to the speed after this one in SIM_SPEEDS."""
+        i = SIM_SPEEDS.index(self.speed) if self.speed in SIM_SPEEDS else -1
+        self.speed = SIM_SPEEDS[(i + 1) % len(SIM_SPEEDS)]
+        return self.speed
@@ -0,0 +1,122 @@
+"""Enemies bucketed by the board cell they stand on.
+
+Towers never move, so each tower keeps the list of cells its attack range
+touches and a range query only looks at the enemies in those cells.
+"""
+from config import BOARD_SIZE, grid_size
+from enemy_store import EnemyStore
+from typing import Dict, Iterator, List, Tuple
+
+
+class EnemyGrid:
+    """
+    === Public Attributes ===
+    size: number of rows (and columns) of the board
+    store: positions of the enemies, by slot
+    buckets: enemies standing on each cell, by flat index (row * size + col)
+    watched: 1 for every cell a sleeping tower waits on (see scheduler.py)
+    entered: watched cells an enemy entered since the towers were updated
+    """
+    size: int
+    store: EnemyStore
+    buckets: List[Dict]
+    watched: bytearray
+    entered: List[int]
+    _cell_of: Dict
+
+    def __init__(self, store: EnemyStore, size=BOARD_SIZE):
+        self.size = size
+        self.store = store
+        self.buckets = [{} for _ in range(size * size)]
+        self.watched = bytearray(size * size)
+        self.entered = []
+        self._cell_of = {}
+
+    def __len__(self):
+        return len(self._cell_of)
+
+    def __iter__(self):
+        return iter(list(self._cell_of))
+
+    def cell_at(self, pos) -> int:
+        col = min(max(int(pos[0]) // grid_size, 0), self.size - 1)
+        row = min(max(int(pos[1]) // grid_size, 0), self.size - 1)
+        return row * self.size + col
+
+    def add(self, e):
+        cell = self.cell_at(e.pos)
+        self._cell_of[e] = cell
+        self.buckets[cell][e] = None
+        if self.watched[cell]:
+            self.entered.append(cell)
+
+    def remove(self, e):
+        cell = self._cell_of.pop(e, None)
+        if cell is not None:
+            del self.buckets[cell][e]
+
+    def snapshot(self) -> tuple:
+        return (self._cell_of.copy(),
+                [(cell, list(self.buckets[cell]))
+                 for cell in set(self._cell_of.values())])
+
+    def restore(self, state: tuple):
+        for cell in set(self._cell_of.values()):
+            self.buckets[cell].clear()
+        cell_of, buckets = state
+        self._cell_of = cell_of.copy()
+        for cell, enemies in buckets:
+            self.buckets[cell] = dict.fromkeys(enemies)
+
+    def update_all(self):
+        """Move every enemy that crossed into another cell to its bucket."""
+        xs, ys = self.store.lists()
+        cell_of = self._cell_of
+        watched = self.watched
+        for e, cell in cell_of.items():
+            new_cell = self.cell_at((xs[e.slot], ys[e.slot]))
+            if new_cell != cell:
+                del self.buckets[cell][e]
+                self.buckets[new_cell][e] = None
+                cell_of[e] = new_cell
+                if watched[new_cell]:
+                    self.entered.append(new_cell)
+
+    def in_range(self, pos: Tuple[int, int], atk_range: int,
+                 cells: List[int]) -> Iterator:
+        """Enemies within atk_range of pos, looking only at cells."""
+        px, py = pos
+        r2 = atk_range * atk_range
+        xs, ys = self.store.lists()
+        if len(self._cell_of) < len(cells):
+            # fewer enemies than cells, checking them all is cheaper
+            candidates = self._cell_of
+        else:
+            buckets = self.buckets
+            candidates = (e for cell in cells for e in buckets[cell])
+        for e in candidates:
+            dx = xs[e.slot] - px
+            dy = ys[e.slot] - py
+            if dx * dx + dy * dy <= r2:
+                yield e
+
+
+def covered_cells(pos: Tuple[int, int], atk_range: int,
+                  size=BOARD_SIZE) -> List[int]:
+    """Cells that a circle of radius atk_range around pos touches."""
+    px, py = pos
+    r2 = atk_range * atk_range
+    col_lo = max(0, (px - atk_range) // grid_size)
+    col_hi = min(size - 1, (px + atk_range) // grid_size)
+    row_lo = max(0, (py - atk_range) // grid_size)
+    row_hi = min(size - 1, (py + atk_range) // grid_size)
+    cells = []
+    for row in range(row_lo, row_hi + 1):
+        top = row * grid_size
+        dy = max(top - py, 0, py - (top + grid_size))
+        for col in range(col_lo, col_hi + 1):
+            left = col * grid_size
+            dx = max(left - px, 0, px - (left + grid_size))
+            if dx * dx + dy * dy <= r2:
+                cells.append(row * size + col)
+    return cells
@@ -0,0 +1,50 @@
+"""Sprite images shared by every enemy and bullet.
+
+Each image is drawn once per key (enemy type, bullet colour) and, when a
+display exists, converted to the display's pixel format so drawing can
+blit it without converting on every frame. Without a display (headless
+runs) images are kept as drawn, and nothing is drawn unless asked for.
+"""
+import pygame
+from typing import Callable, Dict, Hashable
+
+
+class SpriteAtlas:
+    """
+    === Public Attributes ===
+    images: shared image by key
+    """
+    images: Dict[Hashable, pygame.Surface]
+
+    def __init__(self):
+        self.images = {}
+
+    def __len__(self):
+        return len(self.images)
+
+    def get(self, key: Hashable,
+            draw: Callable[[], pygame.Surface]) -> pygame.Surface:
+        """Image stored under key, drawn with draw the first time. The
+        surface is shared, do not draw on it.
+        """
+        image = self.images.get(key)
+        if image is None:
+            image = self.images[key] = convert(draw())
+        return image
+
+    def clear(self):
+        self.images.clear()
+
+
+def convert(image: pygame.Surface) -> pygame.Surface:
+    """image in the display's pixel format, keeping per-pixel alpha if it
+    has any. Unchanged if there is no display yet.
+    """
+    if pygame.display.get_surface() is None:
+        return image
+    if image.get_flags() & pygame.SRCALPHA:
+        return image.convert_alpha()
+    return image.convert()
+
+
+ATLAS = SpriteAtlas()
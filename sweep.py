@@ -0,0 +1,204 @@
+"""Balance sweeps: many seeded headless games over a grid of settings.
+
+Every combination of the --set values is played on every seed by a
+scripted placement policy, across a process pool. The results are
+aggregated per combination and written one column per field, as CSV or,
+for a .npz name, as NumPy arrays. Usage:
+
+    python sweep.py --set ENEMY_ATTR_DICT.Circle.0=150,170,190 \\
+                    --set SCORE_MULTIPLIER_ADD=0.2,0.25 --seeds 8
+
+A setting is a config constant, NAME, a dict entry, NAME.key, or an item
+of a tuple in a dict, NAME.key.index. --sample N plays N random
+combinations instead of all of them.
+"""
+import headless  # before tower_defence, for headless mode
+import argparse
+import itertools
+import json
+import multiprocessing
+import random
+import sys
+import time
+import numpy as np
+import config
+import tower_defence
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+from config import BOARD_SIZE
+from tower_defence import Game, AVAIL_TOWER_LST
+
+Settings = Dict[str, float]
+
+
+def parse_value(text: str):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def parse_set(arg: str) -> Tuple[str, list]:
+    """'NAME.key.index=v1,v2' to ('NAME.key.index', [v1, v2])."""
+    name, _, values = arg.partition('=')
+    if not values:
+        raise argparse.ArgumentTypeError(f'expected NAME=v1,v2,...: {arg}')
+    return name, [parse_value(v) for v in values.split(',')]
+
+
+def split_name(name: str) -> Tuple[str, list]:
+    const, *path = name.split('.')
+    if not hasattr(config, const):
+        raise KeyError(f'{const} is not in config')
+    return const, [int(p) if p.isdigit() else p for p in path]
+
+
+def replaced(container, path: list, value):
+    """A copy of container with the item at path set to value."""
+    key = path[0]
+    if len(path) > 1:
+        value = replaced(container[key], path[1:], value)
+    if isinstance(container, tuple):
+        return container[:key] + (value,) + container[key + 1:]
+    container = dict(container)
+    container[key] = value
+    return container
+
+
+@contextmanager
+def override(settings: Settings) -> Iterator[None]:
+    """Apply settings to config and to the modules that imported config's
+    names, restoring them afterwards.
+    """
+    modules = [config, tower_defence]
+    saved = {}
+    try:
+        for name, value in settings.items():
+            const, path = split_name(name)
+            current = getattr(config, const)
+            saved.setdefault(const, current)
+            new = replaced(current, path, value) if path else value
+            for module in modules:
+                if hasattr(module, const):
+                    setattr(module, const, new)
+        yield
+    finally:
+        for const, value in saved.items():
+            for module in modules:
+                if hasattr(module, const):
+                    setattr(module, const, value)
+
+
+def place_randomly(rng: random.Random, every: int):
+    """Policy: every `every` ticks, offer-drawn tower on a random cell."""
+    def policy(g: Game):
+        if g.countdown > 0:
+            g.skip_countdown()
+        if g.ticks % every or g.remaining_tower_to_place <= 0:
+            return
+        tower = g.offer_rng.choice(AVAIL_TOWER_LST)()
+        pos = (rng.randrange(BOARD_SIZE), rng.randrange(BOARD_SIZE))
+        if g.place_tower(tower, pos):
+            g.game_update_enemy_path()
+    return policy
+
+
+def play(task: Tuple[int, Settings, int, int, int]) -> Tuple[int, list]:
+    """Play one seeded game with the settings of combination index."""
+    index, settings, seed, max_wave, every = task
+    with override(settings):
+        g = Game(seed)
+        g = headless.run_headless(g, max_wave=max_wave,
+                                  on_tick=place_randomly(
+                                      random.Random(seed), every))
+        hp_lost = tower_defence.INIT_PORT_HP - max(g.port_hp, 0)
+    return index, [g.enemy_wave, g.score, hp_lost, g.ticks]
+
+
+RESULT_FIELDS = ['waves', 'score', 'hp_lost', 'ticks']
+
+
+def combinations(grid: List[Tuple[str, list]], sample: int,
+                 seed: int) -> List[Settings]:
+    names = [name for name, _ in grid]
+    combos = [dict(zip(names, values)) for values in
+              itertools.product(*(values for _, values in grid))]
+    if sample and sample < len(combos):
+        combos = random.Random(seed).sample(combos, sample)
+    return combos
+
+
+def sweep(combos: List[Settings], seeds: List[int], max_wave: int,
+          every: int, processes=None) -> List[np.ndarray]:
+    """Results of every game, one (seeds, fields) array per combination."""
+    tasks = [(i, combo, seed, max_wave, every)
+             for i, combo in enumerate(combos) for seed in seeds]
+    results = [[] for _ in combos]
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        for done, (i, row) in enumerate(
+                pool.imap_unordered(play, tasks), 1):
+            results[i].append(row)
+            elapsed = time.perf_counter() - start
+            eta = elapsed / done * (len(tasks) - done)
+            print(f'\r{done}/{len(tasks)} games, {elapsed:.0f}s, '
+                  f'{eta:.0f}s left', end='', file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+    return [np.array(rows, dtype=np.float64) for rows in results]
+
+
+def aggregate(combos: List[Settings],
+              results: List[np.ndarray]) -> Dict[str, np.ndarray]:
+    """Columns: one per setting, then games and mean/min/max of every
+    result field.
+    """
+    columns = {name: np.array([combo[name] for combo in combos])
+               for name in combos[0]} if combos else {}
+    columns['games'] = np.array([len(r) for r in results])
+    for j, field in enumerate(RESULT_FIELDS):
+        for stat in ('mean', 'min', 'max'):
+            columns[f'{field}_{stat}'] = np.array(
+                [getattr(r[:, j], stat)() for r in results])
+    return columns
+
+
+def write_columns(path: str, columns: Dict[str, np.ndarray]):
+    if path.endswith('.npz'):
+        np.savez(path, **columns)
+        return
+    names = list(columns)
+    with open(path, 'w') as f:
+        f.write(','.join(names) + '\n')
+        for row in zip(*(columns[name] for name in names)):
+            f.write(','.join(str(v) for v in row) + '\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a balance sweep.')
+    parser.add_argument('--set', dest='grid', action='append', default=[],
+                        type=parse_set, metavar='NAME=v1,v2,...',
+                        help='values to try for a setting, can be repeated')
+    parser.add_argument('--sample', type=int, default=0,
+                        help='play this many random combinations only')
+    parser.add_argument('--seeds', type=int, default=8,
+                        help='games per combination, seeds 0 to N - 1')
+    parser.add_argument('--waves', type=int, default=50,
+                        help='stop a game that reaches this wave')
+    parser.add_argument('--place-every', type=int, default=60,
+                        help='ticks between two placement attempts')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='worker processes (default: all cores)')
+    parser.add_argument('--out', default='sweep.csv')
+    args = parser.parse_args()
+
+    for name, _ in args.grid:
+        split_name(name)  # fail early on a typo
+    combos = combinations(args.grid, args.sample, 0)
+    results = sweep(combos, list(range(args.seeds)), args.waves,
+                    args.place_every, args.processes)
+    columns = aggregate(combos, results)
+    write_columns(args.out, columns)
+    best = int(np.argmax(columns['waves_mean']))
+    print(f'{len(combos)} combinations, results written to {args.out}')
+    print(f'most waves survived ({columns["waves_mean"][best]:.1f} on '
+          f'average): {combos[best]}')
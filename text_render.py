@@ -0,0 +1,49 @@
+"""Cached text rendering.
+
+pygame.font.SysFont looks the font up and loads it on every call, and most
+text on screen (tower labels, path dots, the HUD) is the same from frame to
+frame. TextRenderer keeps one Font per size and remembers rendered
+surfaces by (text, size, fg, bg).
+"""
+import pygame
+from cache import LRUCache
+from config import TEXT_CACHE_SIZE
+from typing import Dict, Tuple
+
+Color = Tuple[int, int, int]
+
+
+class TextRenderer:
+    """
+    === Public Attributes ===
+    font_name: system font used for all text
+    surfaces: rendered text surfaces by (text, size, fg, bg)
+    """
+    font_name: str
+    surfaces: LRUCache
+    _fonts: Dict[int, pygame.font.Font]
+
+    def __init__(self, font_name='calibri', maxsize=TEXT_CACHE_SIZE):
+        self.font_name = font_name
+        self.surfaces = LRUCache(maxsize)
+        self._fonts = {}
+
+    def __str__(self):
+        return f'{len(self._fonts)} fonts, surfaces: {self.surfaces}'
+
+    def font(self, size: int) -> pygame.font.Font:
+        if size not in self._fonts:
+            self._fonts[size] = pygame.font.SysFont(self.font_name, size)
+        return self._fonts[size]
+
+    def render(self, text: str, size: int, fg: Color,
+               bg: Color) -> pygame.Surface:
+        """Antialiased text, rendered only if it is not cached. The surface
+        is shared, do not draw on it.
+        """
+        key = (text, size, fg, bg)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.font(size).render(text, True, fg, bg)
+            self.surfaces.put(key, surface)
+        return surface
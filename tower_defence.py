@@ -1,909 +1,1210 @@
-from config import *
-from typing import Tuple, List, Union, Optional, Dict
-import pygame
-from pygame.math import Vector2
-import pygame.gfxdraw
-import random
-from math import sqrt
-
-
-def get_grid(pos) -> Tuple[int, int]:
-    """Get pos on lst from mouse position.
-    """
-    x, y = pos[0], pos[1]
-    row, col = y // grid_size, x // grid_size  # row and col in lst
-
-    return row, col
-
-
-def get_coord(path: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
-    """Get coord of center of a square on pygame from a nested list.
-    """
-    lst = []
-    for pos in path:
-        x, y = pos[1] + 1, pos[0] + 1
-        coord_x = grid_size * x - (grid_size - margin) // 2
-        coord_y = grid_size * y - (grid_size + margin) // 2
-        lst.append((coord_x, coord_y))
-
-    return lst
-
-
-class Enemy(pygame.sprite.Sprite):
-    """
-    Enemy class
-
-    === Public Attributes ===
-    hp: hp of an enemy
-    ms: Movement speed of an enemy
-    defence: percentage of damage taken from an attack (normally)
-    pos: position
-    travelled: distance travelled by the enemy object
-    """
-    max_hp: int
-    hp: int
-    ms: int
-    defence: float
-    pos: Vector2
-    path: List[Tuple[int, int]]
-    path_index: int
-
-    def __init__(self, hp, ms, board):
-        """Enemy_attr: attributes of enemy."""
-        super().__init__()
-        # self.image = pygame.Surface((24, 24))
-        # self.image.fill(pygame.Color(green))
-        # self.rect = self.image.get_rect(center=(0, (grid_size + margin) // 2))
-        self.pos = Vector2((grid_size + margin) // 2,
-                           (grid_size + margin) // 2)
-        pos = round(self.pos.x), round(self.pos.y)
-        e_path = enemy_path(board, (0, 0))
-        self.path = get_coord(e_path)
-        self.path_index = 0
-        self.target = self.path[self.path_index]
-        self.max_hp = hp
-        self.hp = hp
-        self.ms = ms
-        self.remove = False
-        self.defeated = False
-
-    def __str__(self):
-        raise NotImplementedError
-
-    def update_target(self):
-        self.target = self.path[self.path_index]
-
-    def update_path(self, board):
-        pos = round(self.pos.x), round(self.pos.y)
-        (row, col) = get_grid(pos)
-        e_path = enemy_path(board, (row, col))
-        self.path = get_coord(e_path)
-
-    def update(self):
-        # A vector pointing from self to the target.
-        heading = self.target - self.pos
-        distance = heading.length()  # Distance to the target.
-        try:
-            heading.normalize_ip()  # length 1 vec
-        except ValueError:
-            pass
-        if distance < self.ms:
-            if self.path_index < len(self.path) - 1:
-                # print(self.path_index, len(self.path))
-                self.path_index += 1
-                self.target = self.path[self.path_index]
-            # otherwise enemy reach dest
-            else:
-                self.remove = True
-
-        self.pos += heading * self.ms
-        # self.pos.x, self.pos.y = round(self.pos.x), round(self.pos.y)
-        self.rect.center = self.pos
-
-    def lose_hp(self, i: Union[int, float]):
-        self.hp -= i
-        if self.hp <= 0:
-            self.defeated = True
-
-    def flag_defeat(self):
-        self.defeated = True
-
-    def distance_to_port(self):
-        i = self.path_index
-        d = (self.pos - self.target).length()
-        while i < len(self.path) - 1:
-            d += (Vector2(self.path[i]) - Vector2(self.path[i + 1])).length()
-            i += 1
-        return d
-
-
-class Circle(Enemy):
-
-    def __init__(self, hp, ms, board):
-        super().__init__(hp, ms, board)
-        self.image = pygame.Surface((ENEMY_IMG_SIZE, ENEMY_IMG_SIZE),
-                                    pygame.SRCALPHA)
-        pygame.gfxdraw.aacircle(self.image,
-                                ENEMY_IMG_SIZE // 2,
-                                ENEMY_IMG_SIZE // 2,
-                                ENEMY_IMG_SIZE // 2 - 1, CIRCLE_COLOR)
-        pygame.gfxdraw.filled_circle(self.image,
-                                     ENEMY_IMG_SIZE // 2,
-                                     ENEMY_IMG_SIZE // 2,
-                                     ENEMY_IMG_SIZE // 2 - 1, CIRCLE_COLOR)
-        self.rect = self.image.get_rect(center=((grid_size + margin) // 2,
-                                                (grid_size + margin) // 2))
-
-    def __str__(self):
-        return 'Circle'
-
-
-class Square(Enemy):
-
-    def __init__(self, hp, ms, board):
-        super().__init__(hp, ms, board)
-        self.image = pygame.Surface((ENEMY_IMG_SIZE, ENEMY_IMG_SIZE))
-        self.image.fill(pygame.Color(SQUARE_COLOR))
-        self.rect = self.image.get_rect(center=((grid_size + margin) // 2,
-                                                (grid_size + margin) // 2))
-
-    def __str__(self):
-        return 'Square'
-
-
-class Triangle(Enemy):
-
-    def __init__(self, hp, ms, board):
-        super().__init__(hp, ms, board)
-        self.image = pygame.Surface((ENEMY_IMG_SIZE, ENEMY_IMG_SIZE),
-                                    pygame.SRCALPHA)
-        bot = round(ENEMY_IMG_SIZE / 2 * sqrt(3))
-        pygame.gfxdraw.aatrigon(self.image,
-                                ENEMY_IMG_SIZE // 2, 0,
-                                0, bot,
-                                ENEMY_IMG_SIZE, bot, TRIANGLE_COLOR)
-        pygame.gfxdraw.filled_trigon(self.image,
-                                     ENEMY_IMG_SIZE // 2, 0,
-                                     0, bot,
-                                     ENEMY_IMG_SIZE, bot, TRIANGLE_COLOR)
-        self.rect = self.image.get_rect(center=((grid_size + margin) // 2,
-                                                (grid_size + margin) // 2))
-
-    def __str__(self):
-        return 'Triangle'
-
-
-class Bullet(pygame.sprite.Sprite):
-    """
-    Bullet class
-
-    === Public Attributes ===
-    pos: position of the bullet
-    bs: bullet speed
-    target: target the bullet is targeting on
-    """
-    pos: Vector2
-    dmg: int
-    bs: int
-    color: Tuple[int, int, int]
-    target: Enemy
-    remove: bool
-
-    def __init__(self, pos, dmg, bs, color, target):
-        super().__init__()
-        self.image = pygame.Surface((BULLET_SIZE, BULLET_SIZE),
-                                    pygame.SRCALPHA)
-        pygame.gfxdraw.aacircle(self.image,
-                                BULLET_SIZE // 2,
-                                BULLET_SIZE // 2,
-                                BULLET_SIZE // 2 - 1, color)
-        pygame.gfxdraw.filled_circle(self.image,
-                                     BULLET_SIZE // 2,
-                                     BULLET_SIZE // 2,
-                                     BULLET_SIZE // 2 - 2, color)
-        self.rect = self.image.get_rect(center=pos)
-        self.pos = Vector2(pos)
-        self.dmg = dmg
-        self.bs = bs
-        self.target = target
-        self.remove = False
-
-    def update(self):
-        if self.target.remove:
-            self.remove = True
-            return
-
-        heading = self.target.pos - self.pos
-        distance = heading.length()  # Distance to the target.
-        if distance < self.bs:
-            self.target.lose_hp(self.dmg)
-            self.remove = True
-        else:
-            heading.normalize_ip()
-            self.pos += heading * self.bs
-            self.rect.center = self.pos
-
-
-class Tower:
-    """
-    Tower class
-
-    === Public Attributes ===
-    atk: attack of the tower
-    atk_range: attack range of the tower
-    atk_interval: the time period between towers two attacks
-    level: level of the tower
-    pos: position
-    """
-    atk: int
-    atk_range: int
-    atk_interval: float
-    pos: Tuple[int, int]
-    level: int
-    cool_down: int
-    target: Union[Optional[Enemy], bool]
-    bullets: pygame.sprite.Group
-
-    def __init__(self):
-        """Tower_attr: attributes of tower."""
-        self.pos = (0, 0)
-        self.level = 1
-        self.cool_down = 0
-        self.target = None
-        self.bullets = pygame.sprite.Group()
-
-    def __str__(self):
-        raise NotImplementedError
-
-    def upgrade_tower(self):
-        if self.level < TOWER_MAX_LVL:
-            self.level += 1
-        self.atk, self.atk_range = TOWER_ATTR_DICT[str(self)]
-
-    def set_target(self, e_list: pygame.sprite.Group) -> bool:
-        enemy_in_range = []
-        for e in e_list:
-            heading = e.pos - self.pos
-            distance = heading.length()
-            if distance <= self.atk_range:
-                enemy_in_range.append(e)
-
-        if not enemy_in_range:
-            return False
-
-        shortest = None
-        enemy_ = None
-        for i in enemy_in_range:
-            dist = i.distance_to_port()
-            if shortest is None:
-                shortest = dist
-                enemy_ = i
-            elif dist < shortest:  # new find
-                shortest = dist
-                enemy_ = i
-
-        self.target = enemy_
-        return True
-
-    def update_bullets(self):
-        raise NotImplementedError
-
-    def attack_enemy(self, e_list: pygame.sprite.Group):
-        raise NotImplementedError
-
-    def draw_aim_line(self):
-        raise NotImplementedError
-
-    def on_cool_down(self):
-        if self.cool_down > 0:
-            self.cool_down -= 1
-
-    def target_out_of_range(self):
-        if self.target:
-            heading = self.target.pos - Vector2(self.pos)
-            distance = heading.length()  # Distance to the target.
-            if distance > self.atk_range:
-                self.target = None
-
-
-class Cannon(Tower):
-
-    def __init__(self):
-        super().__init__()
-        self.atk, self.atk_range = TOWER_ATTR_DICT[str(self)]
-        self.atk_interval = CANNON_ATK_INT
-
-    def __str__(self):
-        return f'Cannon{self.level}'
-
-    def update_bullets(self):
-        self.bullets.update()
-        for b in self.bullets:
-            if b.remove:
-                self.bullets.remove(b)
-        self.bullets.draw(screen)
-
-    def attack_enemy(self, e_list: pygame.sprite.Group):
-        if self.cool_down > 0:
-            if SHOW_AIM_LINE:
-                self.set_target(e_list)
-            return
-
-        if not self.target:  # self target is None
-            if not self.set_target(e_list):  # not new target
-                return
-        # has a target
-        if self.target.remove or self.target.defeated:
-            # self.bullets.remove(self.target)
-            self.target = None
-            if not self.set_target(e_list):
-                return
-
-        bullet = Bullet(self.pos, self.atk, CANNON_BS,
-                        get_tower_color(self), self.target)
-        self.bullets.add(bullet)
-        self.cool_down = round(FPS * CANNON_ATK_INT)
-
-    def draw_aim_line(self):
-        if self.target:
-            if self.target.remove or self.target.defeated:
-                return
-            pygame.gfxdraw.line(screen, self.pos[0], self.pos[1],
-                                round(self.target.pos[0]),
-                                round(self.target.pos[1]), AIMING_LINE_COLOR)
-
-
-class Sniper(Tower):
-
-    def __init__(self):
-        super().__init__()
-        self.atk, self.atk_range = TOWER_ATTR_DICT[str(self)]
-        self.atk_interval = SNIPER_ATK_INT
-
-    def __str__(self):
-        return f'Sniper{self.level}'
-
-    def update_bullets(self):
-        self.bullets.update()
-        for b in self.bullets:
-            if b.remove:
-                self.bullets.remove(b)
-        self.bullets.draw(screen)
-
-    def attack_enemy(self, e_list: pygame.sprite.Group):
-        if self.cool_down > 0:
-            if SHOW_AIM_LINE:
-                self.set_target(e_list)
-            return
-
-        if not self.target:  # self target is None
-            if not self.set_target(e_list):  # not new target
-                return
-        # has a target
-        if self.target.remove or self.target.defeated:
-            # self.bullets.remove(self.target)
-            self.target = None
-            if not self.set_target(e_list):
-                return
-
-        atk = self.atk
-        if isinstance(self.target, Square):
-            atk = self.atk * 1.5
-        bullet = Bullet(self.pos, atk, SNIPER_BS,
-                        get_tower_color(self), self.target)
-        self.bullets.add(bullet)
-        self.cool_down = round(FPS * SNIPER_ATK_INT)
-
-    def draw_aim_line(self):
-        if self.target:
-            if self.target.remove or self.target.defeated:
-                return
-            pygame.gfxdraw.line(screen, self.pos[0], self.pos[1],
-                                round(self.target.pos[0]),
-                                round(self.target.pos[1]), AIMING_LINE_COLOR)
-
-
-class Crusher(Tower):
-
-    def __init__(self):
-        super().__init__()
-        self.atk, self.atk_range = TOWER_ATTR_DICT[str(self)]
-        self.atk_interval = CRUSHER_ATK_INT
-
-    def __str__(self):
-        return f'Crusher{self.level}'
-
-    def set_target(self, e_list: pygame.sprite.Group):
-        pass
-
-    def update_bullets(self):
-        pass
-
-    def attack_enemy(self, e_list: pygame.sprite.Group):
-        attacked = False
-        if self.cool_down == 0:
-            for e in e_list:
-                heading = e.pos - self.pos
-                distance = heading.length()
-                if distance <= self.atk_range:
-                    attacked = True
-                    if isinstance(e, Triangle):
-                        e.lose_hp(self.atk * 1.5)
-                    else:
-                        e.lose_hp(self.atk)
-
-        if attacked:
-            pygame.gfxdraw.aacircle(screen, self.pos[0], self.pos[1],
-                                    self.atk_range, get_tower_color(self))
-            self.cool_down = round(FPS * CRUSHER_ATK_INT)
-
-    def draw_aim_line(self):
-        pass
-
-    def target_out_of_range(self):
-        pass
-
-
-AVAIL_TOWER_LST = [Cannon, Sniper, Crusher]
-AVAIL_SLOTS_NUM = 2
-AVAIL_ENEMY_STR_LST = ['Circle', 'Square', 'Triangle']
-
-
-class Game:
-    """
-    === Public Attributes ===
-    board: board in list form, show positions of towers
-    path: path of enemy
-    enemy_list: list of enemies, sorted in the order of distance travelled
-    score: score gained in this game
-    """
-    board: List[List[Union[Tower, None]]]
-    path: List[Tuple[int, int]]
-    enemy_list: pygame.sprite.Group()
-    new_enemy_list: List[str]
-    port_hp: int
-    score: float
-    score_multiplier: float
-    enemy_wave: int
-    enemy_types: int
-    enemy_num: int
-    remaining_tower_to_place: int
-    wave_info: Dict[str, int]
-    tower_list: List[Tower]
-
-    def __init__(self):
-        self.board = list_deep_copy()
-        self.path = enemy_path(self.board)
-        self.enemy_list = pygame.sprite.Group()
-        self.new_enemy_list = []
-        self.port_hp = INIT_PORT_HP
-        self.score = 0.0
-        self.score_multiplier = 1.00
-        self.enemy_wave = 1
-        self.enemy_types = 1
-        self.enemy_num = INIT_ENEMY_NUM
-        self.remaining_tower_to_place = INIT_TOWER_TO_PLACE
-        self.wave_info = {}
-        self.tower_list = []
-        for e in AVAIL_ENEMY_STR_LST:
-            self.wave_info[e] = 0
-
-    def __str__(self):
-        s = ''
-        for row in self.board:
-            row_str = ''
-            for col in row:
-                if isinstance(col, Tower):
-                    row_str += f'{col.level} '
-                else:
-                    row_str += '  '
-            s += row_str + '\n'
-        return s
-
-    def refresh_tower_list(self):
-        """Refresh tower list whenever merge happens"""
-        lst = []
-        for row in self.board:
-            for tw in row:
-                if isinstance(tw, Tower):
-                    lst.append(tw)
-        self.tower_list = lst
-
-    def update_all_towers(self):
-        """Enemy list will be updated first"""
-        for tw in self.tower_list:
-            tw.target_out_of_range()
-            tw.attack_enemy(self.enemy_list)
-            tw.update_bullets()
-            tw.on_cool_down()
-
-    def display_aim_line_pygame(self, show_aim_line=SHOW_AIM_LINE):
-        if show_aim_line:
-            for tw in self.tower_list:
-                tw.draw_aim_line()
-
-    def gen_random_enemies(self):
-        if self.enemy_wave < 3:
-            self.wave_info['Circle'] = self.enemy_num
-            self.new_enemy_list = \
-                ['Circle' for _ in range(self.enemy_num)]
-        elif self.enemy_types == 1:  # wave >= 3
-            enemy_lst_copy = AVAIL_ENEMY_STR_LST[:]
-            random_type = random.choice(enemy_lst_copy)  # str
-            self.wave_info[random_type] = self.enemy_num
-            self.new_enemy_list = [random_type for _ in range(self.enemy_num)]
-        else:  # wave >= 3 and enemy type > 1
-            enemy_lst_copy = AVAIL_ENEMY_STR_LST[:]
-            enemies_gen = 0
-            sep_lst = []
-            for _ in range(self.enemy_types - 1):
-                group_num = random.randint(1,
-                                           (self.enemy_num - enemies_gen) // 2)
-                sep_lst.append(group_num)
-                enemies_gen += group_num
-
-            sep_lst.append(self.enemy_num - enemies_gen)
-
-            for i in range(self.enemy_types):
-                random_type = random.choice(enemy_lst_copy)
-                enemy_lst_copy.remove(random_type)
-                self.new_enemy_list += [random_type for _ in range(sep_lst[i])]
-                self.wave_info[random_type] = sep_lst[i]
-
-    def spawn_time_based(self) -> bool:
-        if self.new_enemy_list:
-            type_str = self.new_enemy_list.pop()
-            hp = round(ENEMY_ATTR_DICT[type_str][0] * self.score_multiplier, 1)
-            ms = ENEMY_ATTR_DICT[type_str][1]
-            if type_str == 'Circle':
-                new_enemy = Circle(hp, ms, self.board)
-                self.add_enemy(new_enemy)
-            if type_str == 'Square':
-                new_enemy = Square(hp, ms, self.board)
-                self.add_enemy(new_enemy)
-            if type_str == 'Triangle':
-                new_enemy = Triangle(hp, ms, self.board)
-                self.add_enemy(new_enemy)
-            return True
-
-        return False
-
-    def add_enemy(self, e: Enemy):
-        self.enemy_list.add(e)
-
-    def remove_enemy(self):
-        for e in self.enemy_list:
-            if e.defeated:
-                self.score += DEFEAT_ENEMY_SCORE * self.score_multiplier
-                self.enemy_list.remove(e)
-            elif e.remove:
-                self.port_hp -= 1
-                self.enemy_list.remove(e)
-
-    def draw_enemy_hp_bar(self):
-        for e in self.enemy_list:
-            ex, ey = e.pos.x, e.pos.y
-            ex -= ENEMY_IMG_SIZE // 2
-            ey -= HP_BAR_ABOVE_ENEMY_CENTER
-            pygame.draw.rect(screen, red,
-                             pygame.Rect(ex, ey, ENEMY_IMG_SIZE,
-                                         HP_BAR_THICKNESS))
-
-            # display losed hp bar
-            if e.max_hp != e.hp:
-                hp_bar_deducted_percentage = (e.max_hp - e.hp) / e.max_hp
-                hp_bar_deducted_length = \
-                    round(hp_bar_deducted_percentage * ENEMY_IMG_SIZE)
-
-                ex += HP_BAR_BORDER + ENEMY_IMG_SIZE - hp_bar_deducted_length
-                ey += HP_BAR_BORDER
-                width = hp_bar_deducted_length - HP_BAR_BORDER * 2
-                height = HP_BAR_THICKNESS - HP_BAR_BORDER * 2
-                pygame.draw.rect(screen, white,
-                                 pygame.Rect(ex, ey, width, height))
-
-    def update_enemy_pygame(self):
-        self.enemy_list.update()
-        self.remove_enemy()
-        self.draw_enemy_hp_bar()
-        self.enemy_list.draw(screen)
-
-    def next_wave(self):
-        self.enemy_wave += 1
-        self.score += WAVE_CLEAR_SCORE * self.score_multiplier
-        self.score_multiplier = self.score_multiplier + SCORE_MULTIPLIER_ADD
-        self.enemy_types = min(MAX_ENEMY_TYPE, 1 + self.enemy_wave // 4)
-        self.enemy_num = min(MAX_ENEMY_NUM,
-                             INIT_ENEMY_NUM + self.enemy_wave // 5 * 4)
-        self.remaining_tower_to_place += WAVE_CLEAR_TOWER_ADD
-        self.wave_info = {}
-        self.gen_random_enemies()
-
-    def game_update_enemy_path(self):
-        for e in self.enemy_list:
-            e.path_index = 1
-            e.update_path(self.board)
-            e.update_target()
-
-    def add_score(self, s: int):
-        self.score += s
-
-    def _remove_tower(self, pos: Tuple[int, int]) -> bool:
-        """Return True if a tower is removed at position, replaced with None
-        if tower does not exist on pos, return False.
-        """
-        if self.board[pos[0]][pos[1]] is None:
-            return False
-        if isinstance(self.board[pos[0]][pos[1]], Tower):
-            self.board[pos[0]][pos[1]] = None
-            return True
-
-    def place_tower(self, tower: Tower, pos: Tuple[int, int]) -> bool:
-        """Place a tower at pos.
-        Return False if:
-        - pos is not valid
-        - a tower is already placed on pos
-        - cannot find the path if the tower was placed (check if towers
-        merge first)
-        - (an enemy is on the curr pos, NEED TO IMPLEMENT FOR PYGAME)
-
-        Upon returning True, update self.path if the tower is placed on current
-        path
-        -
-        """
-        if self.remaining_tower_to_place <= 0:
-            return False
-        if pos == (0, 0) or pos == (BOARD_SIZE - 1, BOARD_SIZE - 1):
-            return False
-        if isinstance(self.board[pos[0]][pos[1]], Tower):
-            # a tower already placed here
-            return False
-
-        # need to find another path
-        # create a deep copy of self.board
-        board_copy = list_deep_copy(self.board)
-        can_be_merged = check_merge_tower(board_copy, tower, pos)
-        # print(can_be_merged)
-        if can_be_merged:
-            path = enemy_path(board_copy)
-            if path:  # path available after merge
-                self.path = path
-                # Mutate self.board
-                self.board = board_copy
-                tower.pos = get_coord([pos])[0]
-                self.refresh_tower_list()
-                self.remaining_tower_to_place -= 1
-                return True
-
-        # can not be merged
-        # do not change path if tower isn't placed on current path,
-        # return immediately
-        if pos not in self.path:
-            self.board[pos[0]][pos[1]] = tower
-            tower.pos = get_coord([pos])[0]
-            self.tower_list.append(tower)
-            self.remaining_tower_to_place -= 1
-            return True
-
-        # need a new copy in case mutated
-        board_copy1 = list_deep_copy(self.board)
-        board_copy1[pos[0]][pos[1]] = tower
-        path = enemy_path(board_copy1)
-        if path:  # return value is not an empty list
-            self.path = path
-            self.board[pos[0]][pos[1]] = tower
-            tower.pos = get_coord([pos])[0]
-            self.tower_list.append(tower)
-            self.remaining_tower_to_place -= 1
-            return True
-        else:
-            return False
-
-    def print_path(self) -> str:
-        lst = list_deep_copy(self.board)
-        for p in self.path:
-            lst[p[0]][p[1]] = '.'
-
-        s = ''
-        for row in lst:
-            row_str = ''
-            for col in row:
-                if isinstance(col, Tower):
-                    row_str += f'{col.level} '
-                elif col == '.':
-                    row_str += '. '
-                else:
-                    row_str += '  '
-            s += row_str + '\n'
-        return s
-
-
-def get_tower_color(tower: Optional[Tower]) -> Tuple[int, int, int]:
-    if tower is None:
-        return 255, 255, 255
-    elif isinstance(tower, Cannon):
-        return 45, 179, 98
-    elif isinstance(tower, Sniper):
-        return 210, 240, 79
-    elif isinstance(tower, Crusher):
-        return 168, 101, 201
-
-
-def enemy_path(board, pos=(0, 0), visited=None) -> List[Tuple[int, int]]:
-    """Find an enemy path starting at pos using BFS method
-    """
-    if visited is None:
-        visited = set()
-    if pos == (BOARD_SIZE - 1, BOARD_SIZE - 1):
-        return [pos]
-
-    queue = []
-    queue.append([pos])
-    visited.add(pos)
-    while queue:  # queue not empty
-        path = queue.pop(0)
-        last_pos = path[-1]
-        for ext in next_move_extensions(last_pos, board):
-            # print(path, last_pos, ext)
-            if ext == (BOARD_SIZE - 1, BOARD_SIZE - 1):
-                return path + [ext]
-            if ext not in visited:
-                queue.append(path + [ext])
-                visited.add(ext)
-
-    return []
-
-
-def enemy_path_dfs(board, pos=(0, 0), visited=None) -> List[Tuple[int, int]]:
-    """Find an enemy path using DFS method
-    """
-    if visited is None:
-        visited = set()
-    if pos in visited:
-        return []
-    if pos == (BOARD_SIZE - 1, BOARD_SIZE - 1):
-        return [pos]
-
-    visited.add(pos)
-    extensions = next_move_extensions(pos, board)
-    # print(pos, extensions, visited)
-    for ext in extensions:  # ext is a position
-        if ext not in visited:
-            temp = enemy_path_dfs(board, ext, visited)
-            if temp:
-                return [pos] + temp
-            visited.add(ext)
-
-    return []
-
-
-def next_move_extensions(pos: Tuple[int, int], board) -> List[Tuple[int, int]]:
-    """ Return a list containing all possible move extensions
-    """
-    row = pos[0]
-    col = pos[1]
-    assert 0 <= row < BOARD_SIZE
-    assert 0 <= col < BOARD_SIZE
-
-    lst = []
-    # priority: right, down, left, up;
-    # if the extension is a tower, do not append
-    if col < BOARD_SIZE - 1 and not isinstance(board[row][col + 1], Tower):
-        lst.append((row, col + 1))
-    if row < BOARD_SIZE - 1 and not isinstance(board[row + 1][col], Tower):
-        lst.append((row + 1, col))
-    if col > 0 and not isinstance(board[row][col - 1], Tower):
-        lst.append((row, col - 1))
-    if row > 0 and not isinstance(board[row - 1][col], Tower):
-        lst.append((row - 1, col))
-
-    return lst
-
-
-def check_merge_tower(board: List[list], tower: Tower,
-                      pos: Tuple[int, int], merged=False) -> bool:
-    """Return True if tower can be merged to given location.
-    Done recursively to upgrade the tower as high as possible
-    """
-    if tower.level == TOWER_MAX_LVL:
-        return True
-    row, col = pos[0], pos[1]
-    left_most = max(0, col - 2)
-    right_most = min(BOARD_SIZE - 1, col + 2)
-    upper_most = max(0, row - 2)
-    lower_most = min(BOARD_SIZE - 1, row + 2)
-
-    tower_type = type(tower)
-    tower_lvl = tower.level
-    count = 0
-    for tower_same_row in range(left_most, right_most + 1):
-        curr_tower = board[row][tower_same_row]
-        if tower_same_row == col:  # pass for pos
-            count += 1
-        elif type(curr_tower) == tower_type and \
-                curr_tower.level == tower_lvl:
-            count += 1
-        else:
-            count = 0
-        if count == 3:
-            merged = True
-            board[row][tower_same_row] = None
-            board[row][tower_same_row - 1] = None
-            board[row][tower_same_row - 2] = None
-            tower.upgrade_tower()
-            board[row][col] = tower
-            return check_merge_tower(board, tower, pos, merged)
-
-    for tower_same_col in range(upper_most, lower_most + 1):
-        curr_tower = board[tower_same_col][col]
-        if tower_same_col == row:  # pass for pos
-            count += 1
-        elif type(curr_tower) == tower_type and \
-                curr_tower.level == tower_lvl:
-            count += 1
-        else:
-            count = 0
-        if count == 3:
-            merged = True
-            board[tower_same_col][col] = None
-            board[tower_same_col - 1][col] = None
-            board[tower_same_col - 2][col] = None
-            tower.upgrade_tower()
-            board[row][col] = tower
-            return check_merge_tower(board, tower, pos, merged)
-
-    return merged
-
-
-def list_deep_copy(lst=None) -> List[List]:
-    """If no arg passed in, create a empty list of size BOARD_SIZE"""
-    board = []
-    if not lst:
-        for row in range(BOARD_SIZE):
-            board.append([None for col in range(BOARD_SIZE)])
-    else:
-        for row in lst:
-            board.append([col for col in row])
-
-    return board
-
-
-# if __name__ == '__main__':
-#     print(1)
-#     BOARD_SIZE = 6
-#     g = Game()
-#     print(g.print_path())
-#
-#     g.place_tower(Sniper(), (0, 5))
-#     g.place_tower(Sniper(), (1, 3))
-#     g.place_tower(Sniper(), (1, 4))
-#     g.place_tower(Sniper(), (1, 5))
-#     print(g.print_path())
-#
-#     pygame.init()
-#
-#     c1 = Circle(g.board)
-#     enemy_group = pygame.sprite.Group()
-#     enemy_group.add(c1)
-#
-#     screen = pygame.display.set_mode([WIDTH, HEIGHT])
-#     screen.fill((0, 75, 100))
-#
-#     running = True
-#     while running:
-#         for event in pygame.event.get():
-#             if event.type == pygame.QUIT:
-#                 running = False
-#
-#         screen.fill((0, 75, 100))
-#         enemy_group.update()
-#         enemy_group.draw(screen)
-#         print(c1.pos)
-#
-#         pygame.display.update()
-#         fpsClock.tick(FPS)
-#
-#     pygame.quit()
-
-
-
+from config import *
+from board import Board, CANNON, SNIPER, CRUSHER
+from pathfinding import (FlowField, UNREACHABLE, bfs_path, cut_map,
+                         flow_field)
+from spatial import EnemyGrid, covered_cells
+from enemy_store import EnemyStore
+from scheduler import TowerScheduler
+from sprites import ATLAS
+from projectiles import Bullet, Projectiles, gen_bullet_image
+from typing import Tuple, List, Union, Optional, Dict
+import pygame
+from pygame.math import Vector2
+import pygame.gfxdraw
+import random
+import numpy as np
+from math import sqrt
+
+
+def get_grid(pos) -> Tuple[int, int]:
+    """Get pos on lst from mouse position.
+    """
+    x, y = pos[0], pos[1]
+    row, col = y // grid_size, x // grid_size  # row and col in lst
+
+    return row, col
+
+
+def get_coord(path: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Get coord of center of a square on pygame from a nested list.
+    """
+    lst = []
+    for pos in path:
+        x, y = pos[1] + 1, pos[0] + 1
+        coord_x = grid_size * x - (grid_size - margin) // 2
+        coord_y = grid_size * y - (grid_size + margin) // 2
+        lst.append((coord_x, coord_y))
+
+    return lst
+
+
+def cell_coords(size: int) -> np.ndarray:
+    """get_coord of every cell of a size x size board, indexed like
+    FlowField cells.
+    """
+    row, col = np.divmod(np.arange(size * size), size)
+    return np.stack([grid_size * (col + 1) - (grid_size - margin) // 2,
+                     grid_size * (row + 1) - (grid_size + margin) // 2],
+                    axis=1)
+
+
+# pixel center of every cell, indexed like FlowField cells
+CELL_COORD = cell_coords(BOARD_SIZE)
+
+
+class Enemy(pygame.sprite.Sprite):
+    """
+    Enemy class
+
+    Movement state lives in a slot of the game's EnemyStore, and the
+    attributes below read from it. Once the enemy leaves the game the slot
+    is released and the sprite keeps its final state.
+
+    === Public Attributes ===
+    hp: hp of an enemy
+    ms: Movement speed of an enemy
+    defence: percentage of damage taken from an attack (normally)
+    pos: position
+    travelled: distance travelled by the enemy object
+    field: flow field the enemy follows to the port
+    target_cell: cell of the field the enemy is walking to
+    remaining: distance left to the port, kept current by moves and repaths
+    store: arrays holding the enemy's movement state
+    slot: row of the enemy in store, None once released
+    kind: index of the enemy type in AVAIL_ENEMY_STR_LST
+    """
+    max_hp: int
+    hp: float
+    ms: int
+    defence: float
+    pos: Vector2
+    field: FlowField
+    target_cell: int
+    remaining: float
+    store: EnemyStore
+    slot: Optional[int]
+    kind: int
+
+    def __init__(self, hp, ms, field: FlowField, store: EnemyStore):
+        """Enemy_attr: attributes of enemy."""
+        slot = store.add(self, ((grid_size + margin) // 2,
+                                (grid_size + margin) // 2), hp, ms,
+                         self.kind)
+        self._setup(store, slot, field, hp, ms)
+        store.set_target(self.slot, field, field.index(0, 0))
+
+    def _setup(self, store: EnemyStore, slot: int, field: FlowField,
+               max_hp: float, ms: float):
+        super().__init__()
+        self._rect = pygame.Rect(0, 0, ENEMY_IMG_SIZE, ENEMY_IMG_SIZE)
+        self._image = None
+        self.store = store
+        self.slot = slot
+        self.field = field
+        self.max_hp = max_hp
+        self.ms = ms
+        self.defeated = False
+
+    @classmethod
+    def in_slot(cls, store: EnemyStore, slot: int, field: FlowField,
+                max_hp: float, ms: float) -> 'Enemy':
+        """An enemy for a slot of store whose row is filled in by the
+        caller, e.g. when loading a saved game.
+        """
+        e = cls.__new__(cls)
+        e._setup(store, slot, field, max_hp, ms)
+        return e
+
+    def __str__(self):
+        raise NotImplementedError
+
+    @property
+    def image(self) -> pygame.Surface:
+        """Sprite image, shared by all enemies of this type and only
+        looked up the first time the enemy is drawn, so a headless game
+        never creates a Surface."""
+        if self._image is None:
+            self._image = ATLAS.get(type(self).__name__, self.gen_image)
+        return self._image
+
+    @staticmethod
+    def gen_image() -> pygame.Surface:
+        raise NotImplementedError
+
+    @property
+    def rect(self) -> pygame.Rect:
+        self._rect.center = self.pos
+        return self._rect
+
+    @property
+    def pos(self) -> Vector2:
+        if self.slot is None:
+            return Vector2(self._pos)
+        return Vector2(self.store.pos[self.slot].tolist())
+
+    @property
+    def target(self) -> Vector2:
+        if self.slot is None:
+            return Vector2(self._target)
+        return Vector2(self.store.target[self.slot].tolist())
+
+    @property
+    def target_cell(self) -> int:
+        if self.slot is None:
+            return self._target_cell
+        return int(self.store.target_cell[self.slot])
+
+    @property
+    def remaining(self) -> float:
+        if self.slot is None:
+            return self._remaining
+        return float(self.store.remaining[self.slot])
+
+    @property
+    def remove(self) -> bool:
+        if self.slot is None:
+            return self._remove
+        return bool(self.store.remove[self.slot])
+
+    @property
+    def hp(self) -> float:
+        if self.slot is None:
+            return self._hp
+        return float(self.store.hp[self.slot])
+
+    @hp.setter
+    def hp(self, value: float):
+        if self.slot is None:
+            self._hp = value
+        else:
+            self.store.hp[self.slot] = value
+
+    def release(self):
+        """Give the slot back to the store, keeping the final state."""
+        self._pos = self.pos
+        self._target = self.target
+        self._target_cell = self.target_cell
+        self._remaining = self.remaining
+        self._remove = self.remove
+        self._hp = self.hp
+        self.store.free(self.slot)
+        self.slot = None
+
+    def update_path(self, field: FlowField):
+        """Follow field from the current cell. An enemy walled off from
+        the port keeps following its old field.
+        """
+        pos = self.pos
+        (row, col) = get_grid((round(pos.x), round(pos.y)))
+        cell = field.index(row, col)
+        if field.steps(cell) == UNREACHABLE:
+            return
+        self.field = field
+        next_cell = field.next_cell[cell]
+        self.store.set_target(self.slot, field,
+                              cell if next_cell == UNREACHABLE else next_cell)
+
+    def lose_hp(self, i: Union[int, float]):
+        self.hp -= i
+        if self.hp <= 0:
+            self.defeated = True
+
+    def flag_defeat(self):
+        self.defeated = True
+
+    def distance_to_port(self) -> float:
+        return self.remaining
+
+
+class Circle(Enemy):
+    kind = 0
+
+    @staticmethod
+    def gen_image() -> pygame.Surface:
+        image = pygame.Surface((ENEMY_IMG_SIZE, ENEMY_IMG_SIZE),
+                               pygame.SRCALPHA)
+        pygame.gfxdraw.aacircle(image,
+                                ENEMY_IMG_SIZE // 2,
+                                ENEMY_IMG_SIZE // 2,
+                                ENEMY_IMG_SIZE // 2 - 1, CIRCLE_COLOR)
+        pygame.gfxdraw.filled_circle(image,
+                                     ENEMY_IMG_SIZE // 2,
+                                     ENEMY_IMG_SIZE // 2,
+                                     ENEMY_IMG_SIZE // 2 - 1, CIRCLE_COLOR)
+        return image
+
+    def __str__(self):
+        return 'Circle'
+
+
+class Square(Enemy):
+    kind = 1
+
+    @staticmethod
+    def gen_image() -> pygame.Surface:
+        image = pygame.Surface((ENEMY_IMG_SIZE, ENEMY_IMG_SIZE))
+        image.fill(pygame.Color(SQUARE_COLOR))
+        return image
+
+    def __str__(self):
+        return 'Square'
+
+
+class Triangle(Enemy):
+    kind = 2
+
+    @staticmethod
+    def gen_image() -> pygame.Surface:
+        image = pygame.Surface((ENEMY_IMG_SIZE, ENEMY_IMG_SIZE),
+                               pygame.SRCALPHA)
+        bot = round(ENEMY_IMG_SIZE / 2 * sqrt(3))
+        pygame.gfxdraw.aatrigon(image,
+                                ENEMY_IMG_SIZE // 2, 0,
+                                0, bot,
+                                ENEMY_IMG_SIZE, bot, TRIANGLE_COLOR)
+        pygame.gfxdraw.filled_trigon(image,
+                                     ENEMY_IMG_SIZE // 2, 0,
+                                     0, bot,
+                                     ENEMY_IMG_SIZE, bot, TRIANGLE_COLOR)
+        return image
+
+    def __str__(self):
+        return 'Triangle'
+
+
+class Tower:
+    """
+    Tower class
+
+    === Public Attributes ===
+    kind: type code of the tower on a Board
+    atk: attack of the tower
+    atk_range: attack range of the tower
+    atk_interval: the time period between towers two attacks
+    level: level of the tower
+    pos: position
+    cells: cells of the board the attack range covers
+    ready_tick: first game tick on which the tower can attack again
+    batched: whether towers of this type attack together, through
+        attack_batch, rather than one by one
+    """
+    kind: int
+    atk: int
+    atk_range: int
+    atk_interval: float
+    pos: Tuple[int, int]
+    cells: List[int]
+    level: int
+    ready_tick: int
+    batched = False
+    target: Union[Optional[Enemy], bool]
+
+    def __init__(self):
+        """Tower_attr: attributes of tower."""
+        self.pos = (0, 0)
+        self.cells = []
+        self.level = 1
+        self.ready_tick = 0
+        self.target = None
+
+    def __str__(self):
+        raise NotImplementedError
+
+    def upgrade_tower(self):
+        if self.level < TOWER_MAX_LVL:
+            self.level += 1
+        self.atk, self.atk_range = TOWER_ATTR_DICT[str(self)]
+        self.cells = covered_cells(self.pos, self.atk_range)
+
+    def place(self, pos: Tuple[int, int]):
+        """Move the tower to the center of grid pos."""
+        self.pos = get_coord([pos])[0]
+        self.cells = covered_cells(self.pos, self.atk_range)
+
+    def set_target(self, enemies: EnemyGrid) -> bool:
+        """Target the enemy in range closest to the port."""
+        enemy_ = None
+        for e in enemies.in_range(self.pos, self.atk_range, self.cells):
+            if enemy_ is None or e.remaining < enemy_.remaining:
+                enemy_ = e
+
+        if enemy_ is None:
+            return False
+
+        self.target = enemy_
+        return True
+
+    def attack_enemy(self, enemies: EnemyGrid, bullets: Projectiles,
+                     tick: int):
+        """Attack enemies in range on game tick tick, firing shots into
+        bullets.
+        """
+        raise NotImplementedError
+
+    def draw_attack(self, surface: pygame.Surface,
+                    offset=(0, 0)) -> List[pygame.Rect]:
+        """Draw attack effects other than bullets, shifted by offset, return
+        the rects drawn on. Bullets are drawn by the game's Projectiles.
+        """
+        return []
+
+    def draw_aim_line(self, surface: pygame.Surface,
+                      offset=(0, 0)) -> List[pygame.Rect]:
+        raise NotImplementedError
+
+    def target_out_of_range(self):
+        if self.target:
+            heading = self.target.pos - Vector2(self.pos)
+            distance = heading.length()  # Distance to the target.
+            if distance > self.atk_range:
+                self.target = None
+
+
+class Cannon(Tower):
+    kind = CANNON
+
+    def __init__(self):
+        super().__init__()
+        self.atk, self.atk_range = TOWER_ATTR_DICT[str(self)]
+        self.atk_interval = CANNON_ATK_INT
+
+    def __str__(self):
+        return f'Cannon{self.level}'
+
+    def attack_enemy(self, enemies: EnemyGrid, bullets: Projectiles,
+                     tick: int):
+        if tick < self.ready_tick:
+            if SHOW_AIM_LINE:
+                self.set_target(enemies)
+            return
+
+        if not self.target:  # self target is None
+            if not self.set_target(enemies):  # not new target
+                return
+        # has a target
+        if self.target.remove or self.target.defeated:
+            self.target = None
+            if not self.set_target(enemies):
+                return
+
+        bullets.fire(self.pos, self.atk, CANNON_BS,
+                     get_tower_color(self), self.target)
+        self.ready_tick = tick + round(FPS * CANNON_ATK_INT)
+
+    def draw_aim_line(self, surface: pygame.Surface,
+                      offset=(0, 0)) -> List[pygame.Rect]:
+        if self.target:
+            if self.target.remove or self.target.defeated:
+                return []
+            # not updated while cooling down, the target may have left
+            if self.target.pos.distance_to(self.pos) > self.atk_range:
+                return []
+            return [draw_line(surface, self.pos, self.target.pos,
+                              AIMING_LINE_COLOR, offset)]
+        return []
+
+
+class Sniper(Tower):
+    kind = SNIPER
+
+    def __init__(self):
+        super().__init__()
+        self.atk, self.atk_range = TOWER_ATTR_DICT[str(self)]
+        self.atk_interval = SNIPER_ATK_INT
+
+    def __str__(self):
+        return f'Sniper{self.level}'
+
+    def attack_enemy(self, enemies: EnemyGrid, bullets: Projectiles,
+                     tick: int):
+        if tick < self.ready_tick:
+            if SHOW_AIM_LINE:
+                self.set_target(enemies)
+            return
+
+        if not self.target:  # self target is None
+            if not self.set_target(enemies):  # not new target
+                return
+        # has a target
+        if self.target.remove or self.target.defeated:
+            self.target = None
+            if not self.set_target(enemies):
+                return
+
+        atk = self.atk
+        if isinstance(self.target, Square):
+            atk = self.atk * 1.5
+        bullets.fire(self.pos, atk, SNIPER_BS,
+                     get_tower_color(self), self.target)
+        self.ready_tick = tick + round(FPS * SNIPER_ATK_INT)
+
+    def draw_aim_line(self, surface: pygame.Surface,
+                      offset=(0, 0)) -> List[pygame.Rect]:
+        if self.target:
+            if self.target.remove or self.target.defeated:
+                return []
+            # not updated while cooling down, the target may have left
+            if self.target.pos.distance_to(self.pos) > self.atk_range:
+                return []
+            return [draw_line(surface, self.pos, self.target.pos,
+                              AIMING_LINE_COLOR, offset)]
+        return []
+
+
+class Crusher(Tower):
+    """
+    === Public Attributes ===
+    attacked: whether the crusher smashed any enemy on the last tick
+    """
+    attacked: bool
+    kind = CRUSHER
+    batched = True
+
+    def __init__(self):
+        super().__init__()
+        self.atk, self.atk_range = TOWER_ATTR_DICT[str(self)]
+        self.atk_interval = CRUSHER_ATK_INT
+        self.attacked = False
+
+    def __str__(self):
+        return f'Crusher{self.level}'
+
+    def set_target(self, enemies: EnemyGrid):
+        pass
+
+    def attack_enemy(self, enemies: EnemyGrid, bullets: Projectiles,
+                     tick: int):
+        Crusher.attack_batch([self], enemies, tick)
+
+    @staticmethod
+    def attack_batch(crushers: List['Crusher'], enemies: EnemyGrid,
+                     tick: int):
+        """Smash every enemy in range of each ready crusher, in the order
+        of crushers. Many crushers and enemies are resolved in one pass
+        over the enemy arrays.
+        """
+        ready = []
+        for tw in crushers:
+            tw.attacked = False
+            if tick >= tw.ready_tick:
+                ready.append(tw)
+        store = enemies.store
+        if not ready or store.n == 0:
+            return
+        multiplier = [CRUSHER_TYPE_MULTIPLIER[name]
+                      for name in AVAIL_ENEMY_STR_LST]
+        if len(ready) * store.n < SPLASH_MIN_PAIRS:
+            attacked = []
+            for tw in ready:
+                hit = False
+                for e in enemies.in_range(tw.pos, tw.atk_range, tw.cells):
+                    hit = True
+                    e.lose_hp(tw.atk * multiplier[e.kind])
+                attacked.append(hit)
+        else:
+            atk = np.array([tw.atk for tw in ready], dtype=np.float64)
+            attacked, defeated = store.splash(
+                np.array([tw.pos for tw in ready], dtype=np.float64),
+                np.array([tw.atk_range for tw in ready], dtype=np.float64),
+                atk[:, None] * np.array(multiplier)[None, :])
+            for slot in defeated:
+                store.owners[slot].defeated = True
+            attacked = attacked.tolist()
+        cool_down = round(FPS * CRUSHER_ATK_INT)
+        for tw, hit in zip(ready, attacked):
+            if hit:
+                tw.attacked = True
+                tw.ready_tick = tick + cool_down
+
+    def draw_attack(self, surface: pygame.Surface,
+                    offset=(0, 0)) -> List[pygame.Rect]:
+        if self.attacked:
+            x, y = self.pos[0] + offset[0], self.pos[1] + offset[1]
+            pygame.gfxdraw.aacircle(surface, x, y, self.atk_range,
+                                    get_tower_color(self))
+            # one pixel of slack for the antialiasing
+            return [pygame.Rect(x - self.atk_range - 1,
+                                y - self.atk_range - 1,
+                                self.atk_range * 2 + 3,
+                                self.atk_range * 2 + 3)]
+        return []
+
+    def draw_aim_line(self, surface: pygame.Surface,
+                      offset=(0, 0)) -> List[pygame.Rect]:
+        return []
+
+    def target_out_of_range(self):
+        pass
+
+
+AVAIL_TOWER_LST = [Cannon, Sniper, Crusher]
+AVAIL_SLOTS_NUM = 2
+AVAIL_ENEMY_STR_LST = ['Circle', 'Square', 'Triangle']
+
+
+def random_towers(lst, rng: random.Random,
+                  num_tower=AVAIL_SLOTS_NUM) -> List[Tower]:
+    """num_tower new towers of different classes from lst, drawn with rng.
+    """
+    r_lst = []  # return lst
+    lst_copy = lst[:]
+    len_ = len(lst) - 1
+    for t in range(num_tower):
+        index_ = rng.randint(0, len_)
+        tower = lst_copy.pop(index_)()  # Tower obj
+        r_lst.append(tower)
+        len_ -= 1
+
+    return r_lst
+
+
+# Game attributes a snapshot keeps as they are: numbers, strings and objects
+# the game replaces instead of changing (flow field, path)
+SNAPSHOT_VALUES = ['flow_field', 'path', 'port_hp', 'score',
+                   'score_multiplier', 'enemy_wave', 'enemy_types',
+                   'enemy_num', 'remaining_tower_to_place', 'board_version',
+                   'ticks', 'countdown', 'spawning']
+
+
+class GameSnapshot:
+    """State of a game at one tick, made by Game.snapshot.
+
+    The board is shared with the game, which copies it before changing it
+    in place. Towers, enemies and bullets keep their identity, only their
+    changing attributes are copied.
+
+    === Public Attributes ===
+    values: SNAPSHOT_VALUES of the game
+    board: the game's board, not to be changed
+    towers: every tower on board with a copy of its attributes
+    enemies: every live enemy in draw order, with its field and defeated
+    store: rows of the enemy store
+    index: enemy buckets of the enemy index
+    bullets: bullets in flight
+    lists: copies of new_enemy_list, wave_info and tower_list
+    rng_state: states of rng and offer_rng
+    """
+    values: Dict[str, object]
+    board: Board
+    towers: List[Tuple[Tower, dict]]
+    enemies: List[Tuple[Enemy, FlowField, bool]]
+    store: tuple
+    index: tuple
+    bullets: list
+    lists: tuple
+    rng_state: tuple
+
+    def __init__(self, game: 'Game'):
+        self.values = {name: getattr(game, name) for name in SNAPSHOT_VALUES}
+        self.board = game.board
+        self.towers = [(tw, tw.__dict__.copy())
+                       for tw in game.board.towers.values()]
+        self.enemies = [(e, e.field, e.defeated) for e in game.enemy_list]
+        self.store = game.enemy_store.snapshot()
+        self.index = game.enemy_index.snapshot()
+        self.bullets = game.projectiles.snapshot()
+        self.lists = (game.new_enemy_list[:], game.wave_info.copy(),
+                      game.tower_list[:])
+        self.rng_state = (game.rng.getstate(), game.offer_rng.getstate())
+
+
+class Game:
+    """
+    === Public Attributes ===
+    board: positions, types and levels of towers
+    flow_field: flow field of the current board, shared by all enemies
+    path: path of enemy
+    enemy_list: list of enemies, sorted in the order of distance travelled
+    enemy_store: movement state of all live enemies as arrays
+    enemy_index: enemies bucketed by cell for tower range queries
+    tower_schedule: ticks on which each tower is updated
+    projectiles: bullets fired by all towers
+    score: score gained in this game
+    board_version: bumped whenever a tower is placed or removed
+    seed: seed of rng and offer_rng, the same seed and inputs on the same
+        ticks replay the same game
+    rng: random numbers of the simulation (wave composition)
+    offer_rng: random numbers of the towers offered to the player, kept
+        apart so that the offers shown do not change the waves
+    ticks: number of simulation ticks run so far, FPS per simulated
+        second
+    countdown: seconds left before the next wave starts spawning
+    spawning: whether enemies of the current wave are still being spawned
+    """
+    board: Board
+    flow_field: FlowField
+    path: List[Tuple[int, int]]
+    enemy_list: pygame.sprite.Group()
+    enemy_store: EnemyStore
+    enemy_index: EnemyGrid
+    tower_schedule: TowerScheduler
+    projectiles: Projectiles
+    new_enemy_list: List[str]
+    port_hp: int
+    score: float
+    score_multiplier: float
+    enemy_wave: int
+    enemy_types: int
+    enemy_num: int
+    remaining_tower_to_place: int
+    wave_info: Dict[str, int]
+    tower_list: List[Tower]
+    board_version: int
+    _board_shared: bool
+    seed: int
+    rng: random.Random
+    offer_rng: random.Random
+    ticks: int
+    countdown: int
+    spawning: bool
+
+    def __init__(self, seed: Optional[int] = None):
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.offer_rng = random.Random(f'offers-{seed}')
+        self.board = Board()
+        self.flow_field = flow_field(self.board)
+        self.path = self.flow_field.path_from((0, 0))
+        self.enemy_list = pygame.sprite.Group()
+        self.enemy_store = EnemyStore(CELL_COORD)
+        self.enemy_index = EnemyGrid(self.enemy_store)
+        self.tower_schedule = TowerScheduler(self.enemy_index)
+        self.projectiles = Projectiles()
+        self.new_enemy_list = []
+        self.port_hp = INIT_PORT_HP
+        self.score = 0.0
+        self.score_multiplier = 1.00
+        self.enemy_wave = 1
+        self.enemy_types = 1
+        self.enemy_num = INIT_ENEMY_NUM
+        self.remaining_tower_to_place = INIT_TOWER_TO_PLACE
+        self.wave_info = {}
+        self.tower_list = []
+        for e in AVAIL_ENEMY_STR_LST:
+            self.wave_info[e] = 0
+        self.board_version = 0
+        self._board_shared = False
+        self.ticks = 0
+        self.countdown = FIRST_WAVE_DELAY // 1000
+        self.spawning = False
+        self.gen_random_enemies()  # generate for the first wave
+
+    def __str__(self):
+        s = ''
+        for row in self.board.rows():
+            row_str = ''
+            for col in row:
+                if col is not None:
+                    row_str += f'{col.level} '
+                else:
+                    row_str += '  '
+            s += row_str + '\n'
+        return s
+
+    def snapshot(self) -> GameSnapshot:
+        """Everything that changes while the game runs, to restore later.
+        Taking and restoring one copies a few arrays and one small dict per
+        tower, enemies and bullets are not cloned.
+        """
+        self._board_shared = True
+        return GameSnapshot(self)
+
+    def restore(self, snap: GameSnapshot):
+        """Go back to snap. A snapshot can be restored any number of
+        times, and only into the game it was taken from.
+        """
+        for name, value in snap.values.items():
+            setattr(self, name, value)
+        self.board = snap.board
+        self._board_shared = True
+        for tw, attrs in snap.towers:
+            tw.__dict__.update(attrs)
+        self.enemy_store.restore(snap.store)
+        self.enemy_list.empty()
+        for e, field, defeated in snap.enemies:
+            e.field = field
+            e.defeated = defeated
+            self.enemy_list.add(e)
+        self.enemy_index.restore(snap.index)
+        self.projectiles.restore(snap.bullets)
+        new_enemy_list, wave_info, tower_list = snap.lists
+        self.new_enemy_list = new_enemy_list[:]
+        self.wave_info = wave_info.copy()
+        self.tower_list = tower_list[:]
+        self.reschedule_towers()
+        self.rng.setstate(snap.rng_state[0])
+        self.offer_rng.setstate(snap.rng_state[1])
+
+    def _own_board(self):
+        """Copy the board before changing it in place if a snapshot
+        shares it."""
+        if self._board_shared:
+            self.board = self.board.copy()
+            self._board_shared = False
+
+    def refresh_tower_list(self):
+        """Refresh tower list whenever merge happens"""
+        self.tower_list = self.board.tower_list()
+        self.reschedule_towers()
+
+    def reschedule_towers(self):
+        """Call after changing tower_list or the towers' ready_tick other
+        than through place_tower or restore."""
+        self.tower_schedule.reset(self.tower_list)
+
+    def update_all_towers(self):
+        """Enemy list will be updated first, bullets fired this tick move
+        right away. Only towers that can act this tick are visited, see
+        TowerScheduler."""
+        self.tower_schedule.update(self.ticks, self.enemy_index,
+                                   self.projectiles)
+        self.projectiles.update()
+
+    def tick(self):
+        """Advance the game by one frame: wave countdown, spawns, enemies
+        and towers. Nothing is drawn, so this runs without a display.
+        """
+        self.ticks += 1
+        if self.countdown > 0 and self.ticks % FPS == 0:
+            self.countdown -= 1
+            if self.countdown == 0:
+                self.spawning = True
+
+        if self.spawning and self.ticks % SPAWN_INTERVAL_TICKS == 0:
+            if not self.spawn_time_based():
+                self.spawning = False
+
+        self.update_enemies()
+        self.update_all_towers()
+
+        if self.countdown == 0 and not self.spawning \
+                and len(self.enemy_list) == 0 and not self.is_over():
+            self.next_wave()
+
+    def skip_countdown(self):
+        """Start spawning the next wave right away."""
+        if self.countdown > 0:
+            self.countdown = 0
+            self.spawning = True
+
+    def is_over(self) -> bool:
+        return self.port_hp <= 0
+
+    def draw(self, surface: pygame.Surface, show_aim_line=SHOW_AIM_LINE,
+             alpha=1.0, offset=(0, 0)) -> List[pygame.Rect]:
+        """Draw enemies, bullets and tower attacks onto surface, shifted by
+        offset (see Camera). Enemies and bullets are drawn alpha of the way
+        through the last tick, so frames drawn between two ticks move
+        smoothly. Return the rects drawn on, so only those need to be
+        updated or erased.
+        """
+        xs, ys = self.enemy_store.lerp_lists(alpha)
+        if offset != (0, 0):
+            xs = [x + offset[0] for x in xs]
+            ys = [y + offset[1] for y in ys]
+        dirty = self.draw_enemy_hp_bar(surface, xs, ys)
+        blits = []
+        for e in self.enemy_list:
+            rect = e._rect
+            rect.center = (xs[e.slot], ys[e.slot])
+            blits.append((e.image, rect))
+        dirty += surface.blits(blits)
+        dirty += self.projectiles.draw(surface, alpha, offset)
+        for tw in self.tower_list:
+            dirty += tw.draw_attack(surface, offset)
+        if show_aim_line:
+            for tw in self.tower_list:
+                dirty += tw.draw_aim_line(surface, offset)
+        return dirty
+
+    def gen_random_enemies(self):
+        if self.enemy_wave < 3:
+            self.wave_info['Circle'] = self.enemy_num
+            self.new_enemy_list = \
+                ['Circle' for _ in range(self.enemy_num)]
+        elif self.enemy_types == 1:  # wave >= 3
+            enemy_lst_copy = AVAIL_ENEMY_STR_LST[:]
+            random_type = self.rng.choice(enemy_lst_copy)  # str
+            self.wave_info[random_type] = self.enemy_num
+            self.new_enemy_list = [random_type for _ in range(self.enemy_num)]
+        else:  # wave >= 3 and enemy type > 1
+            enemy_lst_copy = AVAIL_ENEMY_STR_LST[:]
+            enemies_gen = 0
+            sep_lst = []
+            for _ in range(self.enemy_types - 1):
+                group_num = self.rng.randint(
+                    1, (self.enemy_num - enemies_gen) // 2)
+                sep_lst.append(group_num)
+                enemies_gen += group_num
+
+            sep_lst.append(self.enemy_num - enemies_gen)
+
+            for i in range(self.enemy_types):
+                random_type = self.rng.choice(enemy_lst_copy)
+                enemy_lst_copy.remove(random_type)
+                self.new_enemy_list += [random_type for _ in range(sep_lst[i])]
+                self.wave_info[random_type] = sep_lst[i]
+
+    def spawn_time_based(self) -> bool:
+        if self.new_enemy_list:
+            type_str = self.new_enemy_list.pop()
+            hp = round(ENEMY_ATTR_DICT[type_str][0] * self.score_multiplier, 1)
+            ms = ENEMY_ATTR_DICT[type_str][1]
+            if type_str == 'Circle':
+                new_enemy = Circle(hp, ms, self.flow_field,
+                                   self.enemy_store)
+                self.add_enemy(new_enemy)
+            if type_str == 'Square':
+                new_enemy = Square(hp, ms, self.flow_field,
+                                   self.enemy_store)
+                self.add_enemy(new_enemy)
+            if type_str == 'Triangle':
+                new_enemy = Triangle(hp, ms, self.flow_field,
+                                     self.enemy_store)
+                self.add_enemy(new_enemy)
+            return True
+
+        return False
+
+    def add_enemy(self, e: Enemy):
+        self.enemy_list.add(e)
+        self.enemy_index.add(e)
+
+    def remove_enemy(self):
+        for e in self.enemy_list:
+            if e.defeated:
+                self.score += DEFEAT_ENEMY_SCORE * self.score_multiplier
+                self.enemy_list.remove(e)
+                self.enemy_index.remove(e)
+                e.release()
+            elif e.remove:
+                self.port_hp -= 1
+                self.enemy_list.remove(e)
+                self.enemy_index.remove(e)
+                e.release()
+
+    def draw_enemy_hp_bar(self, surface: pygame.Surface, xs: List[float],
+                          ys: List[float]) -> List[pygame.Rect]:
+        """Draw the hp bar of every enemy, centred above (xs, ys) of its
+        slot.
+        """
+        dirty = []
+        for e in self.enemy_list:
+            ex, ey = xs[e.slot], ys[e.slot]
+            ex -= ENEMY_IMG_SIZE // 2
+            ey -= HP_BAR_ABOVE_ENEMY_CENTER
+            dirty.append(pygame.draw.rect(surface, red,
+                                          pygame.Rect(ex, ey, ENEMY_IMG_SIZE,
+                                                      HP_BAR_THICKNESS)))
+
+            # display losed hp bar
+            if e.max_hp != e.hp:
+                hp_bar_deducted_percentage = (e.max_hp - e.hp) / e.max_hp
+                hp_bar_deducted_length = \
+                    round(hp_bar_deducted_percentage * ENEMY_IMG_SIZE)
+
+                ex += HP_BAR_BORDER + ENEMY_IMG_SIZE - hp_bar_deducted_length
+                ey += HP_BAR_BORDER
+                width = hp_bar_deducted_length - HP_BAR_BORDER * 2
+                height = HP_BAR_THICKNESS - HP_BAR_BORDER * 2
+                pygame.draw.rect(surface, white,
+                                 pygame.Rect(ex, ey, width, height))
+        return dirty
+
+    def update_enemies(self):
+        self.enemy_store.step()
+        self.remove_enemy()
+        self.enemy_index.update_all()
+
+    def next_wave(self):
+        self.enemy_wave += 1
+        self.score += WAVE_CLEAR_SCORE * self.score_multiplier
+        self.score_multiplier = self.score_multiplier + SCORE_MULTIPLIER_ADD
+        self.enemy_types = min(MAX_ENEMY_TYPE, 1 + self.enemy_wave // 4)
+        self.enemy_num = min(MAX_ENEMY_NUM,
+                             INIT_ENEMY_NUM + self.enemy_wave // 5 * 4)
+        self.remaining_tower_to_place += WAVE_CLEAR_TOWER_ADD
+        self.wave_info = {}
+        self.countdown = WAVE_DELAY // 1000
+        self.gen_random_enemies()
+
+    def game_update_enemy_path(self):
+        for e in self.enemy_list:
+            e.update_path(self.flow_field)
+        self.enemy_store.prune_fields()
+
+    def add_score(self, s: int):
+        self.score += s
+
+    def _remove_tower(self, pos: Tuple[int, int]) -> bool:
+        """Return True if a tower is removed at position, replaced with None
+        if tower does not exist on pos, return False.
+        """
+        if not self.board.is_blocked(pos):
+            return False
+        self._own_board()
+        self.board.clear(pos)
+        self.board_version += 1
+        return True
+
+    def blocks_path(self, tower: Tower, pos: Tuple[int, int]) -> bool:
+        """Whether place_tower turns tower down on free cell pos because
+        the enemies would have no path left, merges included. Cells off
+        the enemy path never cut it, the others are looked up in the cut
+        map of the board, built once per occupancy.
+        """
+        if tower.level == TOWER_MAX_LVL or pos not in self.path:
+            return False  # placed without a path check, see place_tower
+        board = self.board
+        if board.size * board.size <= CUT_MAP_MAX_CELLS:
+            return cut_map(board).blocks(board, pos, tower.kind, tower.level)
+        board = board.copy()
+        for pair in board.merge_plan(pos, tower.kind, tower.level):
+            for i in pair:
+                board.clear(divmod(i, board.size))
+        board.set(pos, tower)
+        return not flow_field(board, self.flow_field).reachable((0, 0))
+
+    def place_tower(self, tower: Tower, pos: Tuple[int, int]) -> bool:
+        """Place a tower at pos.
+        Return False if:
+        - pos is not valid
+        - a tower is already placed on pos
+        - cannot find the path if the tower was placed (check if towers
+        merge first)
+        - (an enemy is on the curr pos, NEED TO IMPLEMENT FOR PYGAME)
+
+        Upon returning True, update self.path if the tower is placed on current
+        path
+        -
+        """
+        if self.remaining_tower_to_place <= 0:
+            return False
+        if pos == (0, 0) or pos == (BOARD_SIZE - 1, BOARD_SIZE - 1):
+            return False
+        if self.board.is_blocked(pos):
+            # a tower already placed here
+            return False
+
+        # need to find another path
+        # the board's merge index says whether the tower merges, only then
+        # merge on a copy of self.board
+        if tower.level == TOWER_MAX_LVL or \
+                self.board.will_merge(pos, tower.kind, tower.level):
+            board_copy = self.board.copy()
+            check_merge_tower(board_copy, tower, pos)
+            field = flow_field(board_copy, self.flow_field)
+            if field.reachable((0, 0)):  # path available after merge
+                self.flow_field = field
+                self.path = field.path_from((0, 0))
+                # Mutate self.board
+                self.board = board_copy
+                self._board_shared = False
+                tower.place(pos)
+                self.refresh_tower_list()
+                self.remaining_tower_to_place -= 1
+                self.board_version += 1
+                return True
+
+        # can not be merged
+        # do not change path if tower isn't placed on current path,
+        # return immediately
+        if pos not in self.path:
+            self._own_board()
+            self.board.set(pos, tower)
+            self.flow_field = flow_field(self.board, self.flow_field)
+            tower.place(pos)
+            self.tower_list.append(tower)
+            self.reschedule_towers()
+            self.remaining_tower_to_place -= 1
+            self.board_version += 1
+            return True
+
+        # need a new copy in case mutated
+        board_copy1 = self.board.copy()
+        board_copy1.set(pos, tower)
+        field = flow_field(board_copy1, self.flow_field)
+        if field.reachable((0, 0)):
+            self.flow_field = field
+            self.path = field.path_from((0, 0))
+            self.board = board_copy1
+            self._board_shared = False
+            tower.place(pos)
+            self.tower_list.append(tower)
+            self.reschedule_towers()
+            self.remaining_tower_to_place -= 1
+            self.board_version += 1
+            return True
+        else:
+            return False
+
+    def print_path(self) -> str:
+        lst = self.board.rows()
+        for p in self.path:
+            lst[p[0]][p[1]] = '.'
+
+        s = ''
+        for row in lst:
+            row_str = ''
+            for col in row:
+                if isinstance(col, Tower):
+                    row_str += f'{col.level} '
+                elif col == '.':
+                    row_str += '. '
+                else:
+                    row_str += '  '
+            s += row_str + '\n'
+        return s
+
+
+def draw_line(surface: pygame.Surface, start, end,
+              color: Tuple[int, int, int], offset=(0, 0)) -> pygame.Rect:
+    """Draw a line shifted by offset and return the rect it covers."""
+    x0, y0 = round(start[0]) + offset[0], round(start[1]) + offset[1]
+    x1, y1 = round(end[0]) + offset[0], round(end[1]) + offset[1]
+    pygame.gfxdraw.line(surface, x0, y0, x1, y1, color)
+    return pygame.Rect(min(x0, x1), min(y0, y1),
+                       abs(x1 - x0) + 1, abs(y1 - y0) + 1)
+
+
+TOWER_COLOR = {
+    CANNON: (45, 179, 98),
+    SNIPER: (210, 240, 79),
+    CRUSHER: (168, 101, 201)
+}
+
+
+def get_tower_color(tower: Optional[Tower]) -> Tuple[int, int, int]:
+    if tower is None:
+        return 255, 255, 255
+    return TOWER_COLOR[tower.kind]
+
+
+def build_sprite_atlas():
+    """Draw every enemy and bullet image into ATLAS up front, in the
+    display's format. Call once the display is set up.
+    """
+    ATLAS.clear()
+    for enemy in (Circle, Square, Triangle):
+        ATLAS.get(enemy.__name__, enemy.gen_image)
+    for kind in (CANNON, SNIPER):
+        color = TOWER_COLOR[kind]
+        ATLAS.get(('Bullet', color), lambda: gen_bullet_image(color))
+
+
+def enemy_path(board: Board, pos=(0, 0), visited=None
+               ) -> List[Tuple[int, int]]:
+    """Find an enemy path starting at pos using BFS method
+    """
+    if visited is not None:
+        visited = {board.index(p) for p in visited}
+    return bfs_path(board.passable(), board.index(pos), board.size, visited)
+
+
+def enemy_path_dfs(board: Board, pos=(0, 0), visited=None
+                   ) -> List[Tuple[int, int]]:
+    """Find an enemy path using DFS method
+    """
+    if visited is None:
+        visited = set()
+    if pos in visited:
+        return []
+    if pos == (board.size - 1, board.size - 1):
+        return [pos]
+
+    visited.add(pos)
+    extensions = next_move_extensions(pos, board)
+    # print(pos, extensions, visited)
+    for ext in extensions:  # ext is a position
+        if ext not in visited:
+            temp = enemy_path_dfs(board, ext, visited)
+            if temp:
+                return [pos] + temp
+            visited.add(ext)
+
+    return []
+
+
+def next_move_extensions(pos: Tuple[int, int], board: Board
+                         ) -> List[Tuple[int, int]]:
+    """ Return a list containing all possible move extensions
+    """
+    row = pos[0]
+    col = pos[1]
+    size = board.size
+    assert 0 <= row < size
+    assert 0 <= col < size
+
+    lst = []
+    # priority: right, down, left, up;
+    # if the extension is a tower, do not append
+    if col < size - 1 and not board.is_blocked((row, col + 1)):
+        lst.append((row, col + 1))
+    if row < size - 1 and not board.is_blocked((row + 1, col)):
+        lst.append((row + 1, col))
+    if col > 0 and not board.is_blocked((row, col - 1)):
+        lst.append((row, col - 1))
+    if row > 0 and not board.is_blocked((row - 1, col)):
+        lst.append((row - 1, col))
+
+    return lst
+
+
+def check_merge_tower(board: Board, tower: Tower,
+                      pos: Tuple[int, int], merged=False) -> bool:
+    """Return True if tower can be merged to given location.
+    Upgrade the tower as high as possible, merging as board.merge_plan says
+    """
+    if tower.level == TOWER_MAX_LVL:
+        return True
+    size = board.size
+    for pair in board.merge_plan(pos, tower.kind, tower.level):
+        merged = True
+        for i in pair:
+            board.clear(divmod(i, size))
+        tower.upgrade_tower()
+        board.set(pos, tower)
+    return merged
+
+
+# if __name__ == '__main__':
+#     print(1)
+#     BOARD_SIZE = 6
+#     g = Game()
+#     print(g.print_path())
+#
+#     g.place_tower(Sniper(), (0, 5))
+#     g.place_tower(Sniper(), (1, 3))
+#     g.place_tower(Sniper(), (1, 4))
+#     g.place_tower(Sniper(), (1, 5))
+#     print(g.print_path())
+#
+#     pygame.init()
+#
+#     c1 = Circle(g.board)
+#     enemy_group = pygame.sprite.Group()
+#     enemy_group.add(c1)
+#
+#     screen = pygame.display.set_mode([WIDTH, HEIGHT])
+#     screen.fill((0, 75, 100))
+#
+#     running = True
+#     while running:
+#         for event in pygame.event.get():
+#             if event.type == pygame.QUIT:
+#                 running = False
+#
+#         screen.fill((0, 75, 100))
+#         enemy_group.update()
+#         enemy_group.draw(screen)
+#         print(c1.pos)
+#
+#         pygame.display.update()
+#         fpsClock.tick(FPS)
+#
+#     pygame.quit()
+
+
+